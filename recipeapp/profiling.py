@@ -0,0 +1,156 @@
+"""Opt-in per-request query profiler.
+
+Enable with ``QUERY_PROFILER['ENABLED']`` (or ``QUERY_PROFILER=1`` in the environment).
+For every request it records the query count, total SQL time, repeated query shapes
+(the usual sign of an N+1) and template render time, then reports them as a
+``Server-Timing`` header and one structured log line on the ``recipeapp.profiling``
+logger. With ``RAISE_ON_BUDGET`` set, a view that runs more queries than its budget
+raises ``QueryBudgetExceeded``, which makes the regression fail loudly in tests.
+"""
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger('recipeapp.profiling')
+
+DEFAULTS = {
+    'ENABLED': False,
+    'QUERY_BUDGET': None,          # default budget for views without @query_budget
+    'RAISE_ON_BUDGET': False,
+    'DUPLICATE_THRESHOLD': 2,      # a query shape seen this many times is reported
+}
+
+_template_time = contextvars.ContextVar('recipeapp_template_time', default=None)
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def profiler_settings():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_PROFILER', {})}
+
+
+def query_budget(max_queries):
+    """Mark a view with the maximum number of queries it may run per request."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def fingerprint(sql):
+    """Query shape with parameters already stripped and IN lists collapsed."""
+    return IN_LIST_RE.sub('IN (...)', WHITESPACE_RE.sub(' ', sql).strip())
+
+
+def _install_template_timer():
+    if getattr(DjangoTemplate.render, '_profiled', False):
+        return
+    original = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        if _template_time.get() is None:
+            return original(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            _template_time.set(_template_time.get() + time.perf_counter() - started)
+
+    render._profiled = True
+    DjangoTemplate.render = render
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` callable collecting SQL and its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold):
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {shape: n for shape, n in counts.most_common() if n >= threshold}
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, get_response):
+        self.config = profiler_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._query_budget = self.config['QUERY_BUDGET']
+        token = _template_time.set(0.0)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            template_time = _template_time.get()
+            _template_time.reset(token)
+        total_time = time.perf_counter() - started
+
+        duplicates = recorder.duplicates(self.config['DUPLICATE_THRESHOLD'])
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.total_time * 1000:.2f};desc="{recorder.count} queries"',
+            f'tpl;dur={template_time * 1000:.2f}',
+            f'total;dur={total_time * 1000:.2f}',
+        ])
+        logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.total_time * 1000, 2),
+            'template_ms': round(template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+            'duplicate_queries': duplicates,
+        }))
+
+        budget = request._query_budget
+        if budget is not None and recorder.count > budget:
+            message = f'{request.method} {request.path} ran {recorder.count} queries (budget {budget})'
+            if self.config['RAISE_ON_BUDGET']:
+                raise QueryBudgetExceeded(f'{message}; repeated: {duplicates}')
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget is not None:
+            request._query_budget = budget
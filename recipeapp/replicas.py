@@ -0,0 +1,80 @@
+"""Read replica routing.
+
+Views marked with ``@read_replica`` read from the ``replica`` database alias. Every
+other view, every write, and session and user lookups use ``default``.
+``ReplicaRoutingMiddleware`` keeps a per-request flag that ``ReplicaRouter`` consults.
+
+Replicas lag the primary. A client that has just written (a review, a favorite)
+must see that write on its next page. So when a request writes anything,
+the middleware sets a short-lived cookie. Requests carrying that cookie read
+from the primary even in replica views, until the cookie expires after
+``REPLICA_STICKY_SECONDS``.
+
+In test runs the replica alias mirrors ``default`` (``TEST['MIRROR']``). Locally, a
+copy of the SQLite file can stand in for a real replica.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_COOKIE = 'recipeapp_primary'
+
+# Sessions and users are read on every request; a lagging replica would log people out
+PRIMARY_APPS = {'sessions', 'auth'}
+
+_state = contextvars.ContextVar('recipeapp_replica_state', default=None)
+
+
+def read_replica(view):
+    """Mark a read-only view whose queries may be served by the replica."""
+    view.read_replica = True
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state and state['replica'] and not state['wrote'] and model._meta.app_label not in PRIMARY_APPS:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so objects read from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication, never from migrate
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+    def __call__(self, request):
+        state = {'replica': False, 'wrote': False}
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state['wrote']:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None:
+            state['replica'] = getattr(view_func, 'read_replica', False) and STICKY_COOKIE not in request.COOKIES
@@ -3,11 +3,13 @@ import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'django-insecure-your-secret-key-change-in-production'
+# Deployments set DJANGO_SECRET_KEY and DJANGO_ALLOWED_HOSTS; local development sets DJANGO_DEBUG=1
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-your-secret-key-change-in-production')
 
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG') == '1'
 
-ALLOWED_HOSTS = ['*']
+# Empty unless configured: DEBUG still accepts localhost, anything else is refused
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -20,15 +22,45 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recipeapp.profiling.QueryProfilerMiddleware',
+    'recipeapp.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'recipeapp.traffic.TrafficRecorderMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query profiling (see recipeapp/profiling.py); off unless QUERY_PROFILER=1
+QUERY_PROFILER = {
+    'ENABLED': os.environ.get('QUERY_PROFILER') == '1',
+    'QUERY_BUDGET': None,
+    'RAISE_ON_BUDGET': False,
+    'DUPLICATE_THRESHOLD': 2,
+}
+
+# Sanitized request shapes for replay_load (see recipeapp/traffic.py); off unless TRAFFIC_RECORDER=1
+TRAFFIC_RECORDER = {
+    'ENABLED': os.environ.get('TRAFFIC_RECORDER') == '1',
+    'PATH': os.environ.get('TRAFFIC_RECORDER_PATH', os.path.join(BASE_DIR, 'traffic.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRAFFIC_RECORDER_SAMPLE_RATE', '1.0')),
+    'USER_BUCKETS': 50,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'recipeapp.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'recipeapp.urls'
 
 TEMPLATES = [
@@ -48,12 +80,98 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'recipeapp.wsgi.application'
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+ASGI_APPLICATION = 'recipeapp.asgi.application'
+
+# Serve the api/ routes from recipes/async_api_views.py (for ASGI deployments)
+ASYNC_API_VIEWS = os.environ.get('ASYNC_API_VIEWS') == '1'
+
+# SQLite by default. DB_ENGINE=postgresql switches to PostgreSQL (DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST, DB_PORT). DB_REPLICA_HOST, or DB_REPLICA_NAME for a second
+# SQLite file, adds a 'replica' alias that @read_replica views read from
+# (see recipeapp/replicas.py).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'recipeapp'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # Persistent connections are the in-process pool; PgBouncer pools across processes
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            # PgBouncer in transaction mode cannot keep the server-side cursors iterator() opens
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_PGBOUNCER') == '1',
+        }
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            # A file rather than the shared-cache in-memory database, so threads in the
+            # concurrency tests see SQLite's real file locking and busy timeout
+            'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+        }
+    }
+    if os.environ.get('DB_REPLICA_NAME'):
+        DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['DB_REPLICA_NAME']}
+
+# 'production' turns on WAL, synchronous=NORMAL, a larger page cache, mmap and a busy
+# timeout on every connection, starts transactions with BEGIN IMMEDIATE and keeps
+# connections open between requests (see recipeapp/sqlite/). SQLITE_PRAGMAS adds or
+# overrides individual pragmas.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+SQLITE_PRAGMAS = {}
+if DB_ENGINE == 'sqlite' and SQLITE_PROFILE == 'production':
+    for database in DATABASES.values():
+        database.update({
+            'ENGINE': 'recipeapp.sqlite',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+        })
+
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['recipeapp.replicas.ReplicaRouter']
+
+# Seconds after a write during which that client reads from the primary only
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '15'))
+
+# Local memory by default; set CACHE_REDIS_URL to share the cache between processes
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'recipeapp',
+        }
     }
+
+# Seconds a per-user stats bundle may live in the cache (signals invalidate it on change)
+USER_STATS_CACHE_TIMEOUT = 3600
+
+# Seconds an anonymous home/shared_recipes page may live in the cache (bumped on catalogue changes)
+CATALOGUE_PAGE_CACHE_TIMEOUT = 600
+
+# Recommendation feature index, written by build_recommendation_index (see recipes/recommendations.py)
+RECOMMENDATIONS = {
+    'INDEX_PATH': os.environ.get('RECOMMENDATIONS_INDEX_PATH', os.path.join(BASE_DIR, 'recommendations.npz')),
+    'RELOAD_SECONDS': int(os.environ.get('RECOMMENDATIONS_RELOAD_SECONDS', '60')),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
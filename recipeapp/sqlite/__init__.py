@@ -0,0 +1,53 @@
+"""SQLite connection profiles.
+
+``SQLITE_PROFILE`` picks a set of pragmas that ``apply_pragmas`` runs on every new
+SQLite connection (it is connected to ``connection_created``). The ``default`` profile
+leaves SQLite alone. ``production`` switches the file to WAL so readers no longer block
+the writer, relaxes fsync to ``synchronous=NORMAL`` (safe under WAL: a power cut can lose
+the last commits but not corrupt the file), enlarges the page cache, memory-maps the file
+and waits for a busy writer instead of failing with ``database is locked``. Settings
+pair it with the ``recipeapp.sqlite`` backend, whose transactions take the write lock
+up front (see ``base.py``), and with persistent connections (``CONN_MAX_AGE``) so the
+pragmas are paid once per connection rather than once per request.
+
+Extra pragmas, or overrides of the profile ones, go in ``SQLITE_PRAGMAS``.
+"""
+from django.conf import settings
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,        # KiB when negative: 64 MiB per connection
+        'mmap_size': 268435456,      # 256 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,        # ms
+    },
+}
+
+
+def sqlite_pragmas():
+    profile = getattr(settings, 'SQLITE_PROFILE', 'default')
+    return {**PROFILES[profile], **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection):
+    """Values the connection actually runs with, for reports and benchmarks."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in PROFILES['production']:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
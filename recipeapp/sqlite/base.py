@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The stock sqlite3 backend, except that transactions start with BEGIN IMMEDIATE.
+
+    A deferred BEGIN takes the write lock at the first write, and if another connection
+    committed in the meantime SQLite fails at once with ``database is locked`` instead of
+    waiting out the busy timeout. ``update_or_create`` and the rating signals read before
+    they write inside ``atomic()``, so under concurrent writers they hit exactly that.
+    Taking the lock up front makes them queue on the busy timeout instead. (Django 5.1
+    offers this as ``OPTIONS['transaction_mode']``.)
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,276 @@
+"""Opt-in traffic recording and in-process load replay.
+
+``TrafficRecorderMiddleware`` appends one JSON line per request describing its shape:
+URL name, method, route kwargs, query and body parameters, and a user bucket. Free-text
+values (search terms, titles, comments, names) are replaced by ``REDACTED`` and
+credentials are dropped, so a recording can be shared without leaking user data. Users
+are hashed into a fixed number of buckets so replay can spread load over the same
+number of distinct sessions without knowing who made each request.
+
+``replay`` feeds such a recording straight into the WSGI application, from a thread
+pool and optionally several processes, and ``summarize`` turns the timings into
+per-URL-name latency percentiles and throughput.
+"""
+import json
+import random
+import string
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from itertools import cycle
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.exceptions import MiddlewareNotUsed
+from django.http.request import RawPostDataException
+from django.test.client import RequestFactory
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+
+from recipes.macros import RANGE_FIELDS
+
+DEFAULTS = {
+    'ENABLED': False,
+    'PATH': 'traffic.jsonl',
+    'SAMPLE_RATE': 1.0,
+    'USER_BUCKETS': 50,
+}
+
+REDACTED = '<redacted>'
+
+# Parameters whose values are enumerations, numbers, dates or opaque cursors and are
+# kept as recorded. Facet parameters (rating, reviews, calories, protein) share the
+# names of the numeric form fields; the macro ranges are <field>_min and <field>_max.
+SAFE_PARAMS = {
+    'dietary_type', 'sort', 'page_size', 'cursor', 'limit', 'format',
+    'meal_type', 'meal_date', 'meal_types', 'start_date', 'end_date', 'rating', 'reviews', 'recipe_id',
+    'calories', 'protein', 'fat', 'carbs', 'is_shared',
+    'vegan', 'vegetarian', 'gluten_free', 'nut_allergy', 'dairy_free', 'low_carb',
+    *(f'{prefix}_{suffix}' for prefix in RANGE_FIELDS for suffix in ('min', 'max')),
+}
+DROPPED_PARAMS = {'password', 'password1', 'password2', 'csrfmiddlewaretoken'}
+
+# Stand-ins for redacted values on replay, so searches still hit the index
+PLACEHOLDERS = {
+    'q': ['paneer', 'dal', 'masala', 'rice', 'chicken curry', 'spinach'],
+    'search': ['paneer', 'dal', 'masala', 'rice', 'chicken curry', 'spinach'],
+    'ingredient': ['onion', 'garlic', 'rice', 'ghee', 'tomato'],
+}
+
+
+def recorder_settings():
+    return {**DEFAULTS, **getattr(settings, 'TRAFFIC_RECORDER', {})}
+
+
+def sanitize(params):
+    """Keep enumerable values, redact free text and drop credentials.
+
+    Multi-valued parameters are lists; a redacted list keeps its length.
+    """
+    clean = {}
+    for key, value in params.items():
+        if key in DROPPED_PARAMS:
+            continue
+        if key in SAFE_PARAMS:
+            clean[key] = value
+        else:
+            clean[key] = [REDACTED] * len(value) if isinstance(value, list) else REDACTED
+    return clean
+
+
+def _values(querydict):
+    """``{key: value}``, or ``{key: [values]}`` for keys given more than once."""
+    return {key: values[0] if len(values) == 1 else values for key, values in querydict.lists()}
+
+
+def user_bucket(user, buckets):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        return 'staff'
+    digest = salted_hmac('recipeapp.traffic.user_bucket', str(user.pk)).hexdigest()
+    return f'member-{int(digest[:8], 16) % buckets}'
+
+
+class TrafficRecorderMiddleware:
+    def __init__(self, get_response):
+        self.config = recorder_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = request.resolver_match
+        if match is None or not match.url_name or random.random() >= self.config['SAMPLE_RATE']:
+            return response
+
+        entry = {
+            'ts': round(time.time(), 3),
+            'url_name': match.url_name,
+            'method': request.method,
+            'kwargs': match.kwargs,
+            'query': sanitize(_values(request.GET)),
+            'user': user_bucket(request.user, self.config['USER_BUCKETS']),
+            'status': response.status_code,
+        }
+        if request.method == 'POST':
+            if request.content_type == 'application/json':
+                try:
+                    payload = json.loads(request.body or b'{}')
+                except (RawPostDataException, ValueError):
+                    payload = {}
+                entry['json'] = sanitize(payload) if isinstance(payload, dict) else {}
+            else:
+                entry['data'] = sanitize(_values(request.POST))
+
+        with self.lock, open(self.config['PATH'], 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        return response
+
+
+def load_recording(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _fill_value(key, value, placeholders):
+    if value != REDACTED:
+        return value
+    return next(placeholders[key]) if key in placeholders else 'replay'
+
+
+def _fill(params, placeholders):
+    return {key: [_fill_value(key, item, placeholders) for item in value] if isinstance(value, list)
+            else _fill_value(key, value, placeholders)
+            for key, value in params.items()}
+
+
+def build_environs(entries, cookies, host='localhost'):
+    """Turn recorded entries into WSGI environs, with sessions picked by user bucket.
+
+    ``cookies`` maps a user bucket to the Cookie header of a logged-in session; entries
+    whose bucket has none are replayed anonymously. Every request carries a matching
+    CSRF cookie and header so POSTs pass CsrfViewMiddleware.
+    """
+    factory = RequestFactory()
+    placeholders = {key: cycle(values) for key, values in PLACEHOLDERS.items()}
+    csrf_token = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
+    environs = []
+    for entry in entries:
+        path = reverse(entry['url_name'], kwargs=entry.get('kwargs') or {})
+        cookie = '; '.join(filter(None, [f'{settings.CSRF_COOKIE_NAME}={csrf_token}', cookies.get(entry['user'])]))
+        extra = {'HTTP_HOST': host, 'HTTP_COOKIE': cookie, 'HTTP_X_CSRFTOKEN': csrf_token}
+        query = _fill(entry.get('query') or {}, placeholders)
+        if query:
+            path = f'{path}?{urlencode(query, doseq=True)}'
+        if 'json' in entry:
+            body, content_type = json.dumps(_fill(entry['json'], placeholders)), 'application/json'
+        else:
+            body = urlencode(_fill(entry.get('data') or {}, placeholders), doseq=True)
+            content_type = 'application/x-www-form-urlencoded'
+        request = factory.generic(entry['method'], path, body, content_type, **extra)
+        environs.append((entry['url_name'], request.environ))
+    return environs
+
+
+def login_cookies(buckets):
+    """Session cookies for a replay user per bucket, from ``{bucket: user}``."""
+    store_class = import_module(settings.SESSION_ENGINE).SessionStore
+    cookies = {}
+    for bucket, user in buckets.items():
+        session = store_class()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        cookies[bucket] = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+    return cookies
+
+
+def _call(application, url_name, environ):
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+        return lambda data: None
+
+    started = time.perf_counter()
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return url_name, status[0], time.perf_counter() - started
+
+
+def replay_shard(environs, threads):
+    """Replay ``environs`` through the WSGI app on a thread pool; return per-request results."""
+    from recipeapp.wsgi import application
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda item: _call(application, *item), environs))
+
+
+def replay(environs, threads=4, processes=1):
+    """Replay across ``processes`` worker processes of ``threads`` threads each.
+
+    Returns ``(results, wall_seconds)`` with one ``(url_name, status, seconds)`` per request.
+    """
+    started = time.perf_counter()
+    if processes <= 1:
+        results = replay_shard(environs, threads)
+    else:
+        from django.db import connections
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        shards = [environs[i::processes] for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = [row for shard in pool.map(replay_shard, shards, [threads] * processes) for row in shard]
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _stats(timings, statuses, wall_seconds):
+    timings = sorted(timings)
+    return {
+        'requests': len(timings),
+        'errors': sum(n for status, n in statuses.items() if int(status) >= 500),
+        'statuses': dict(sorted(statuses.items())),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+        'throughput_rps': round(len(timings) / wall_seconds, 1) if wall_seconds else None,
+    }
+
+
+def summarize(results, wall_seconds):
+    """Per-URL-name and overall latency percentiles; throughput is over the whole run."""
+    timings = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    for url_name, status, seconds in results:
+        timings[url_name].append(seconds)
+        statuses[url_name][str(status)] += 1
+    overall = defaultdict(int)
+    for counts in statuses.values():
+        for status, n in counts.items():
+            overall[status] += n
+    return {
+        'total': _stats([seconds for _, _, seconds in results], overall, wall_seconds),
+        'routes': {name: _stats(timings[name], statuses[name], wall_seconds) for name in sorted(timings)},
+    }
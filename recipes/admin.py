@@ -1,12 +1,23 @@
 from django.contrib import admin
-from .models import Recipe, MealPlan, MealPlanItem, ShoppingList, ShoppingListItem, FavoriteRecipe, DietaryPreference, RecipeReview
+from .models import Recipe, MealPlan, MealPlanItem, ShoppingList, ShoppingListItem, FavoriteRecipe, DietaryPreference, RecipeReview, Ingredient, RecipeIngredient
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'dietary_type', 'is_shared', 'created_at')
+    list_display = ('title', 'user', 'dietary_type', 'is_shared', 'avg_rating', 'review_count', 'created_at')
     list_filter = ('dietary_type', 'is_shared', 'created_at')
     search_fields = ('title', 'user__username')
 
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('raw_text', 'ingredient', 'quantity', 'unit', 'recipe')
+    search_fields = ('ingredient__name', 'recipe__title')
+    raw_id_fields = ('recipe', 'ingredient')
+
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe', 'created_at')
@@ -0,0 +1,179 @@
+"""Allergen and restriction tags stored on each recipe as a bitmask.
+
+``Recipe.allergens`` has one bit per entry of ``ALLERGENS``, set when a word of the
+recipe's ingredient text matches one of the entry's keywords ("2 tbsp ghee" sets
+DAIRY). ``Recipe.save`` classifies on every save, bulk writers set the field
+themselves, and ``reclassify_allergens`` backfills existing rows in batches after the
+keyword lists change.
+
+A user's ``DietaryPreference`` becomes a mask the same way: nut allergy, dairy-free,
+gluten-free and every recognised term of ``custom_restrictions`` ("shellfish, pork,
+onion"). Excluding unsafe recipes is then a single ``allergens & mask = 0`` predicate,
+with no scan of ingredient text. A custom term that names no known allergen falls back
+to a substring match on the ingredient text, so an unusual restriction is still
+honoured, just more slowly.
+"""
+import re
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
+
+# name: keywords. Bits follow this order, so only ever append.
+ALLERGENS = {
+    'peanut': ('peanut', 'groundnut', 'moongphali'),
+    'tree_nut': ('nut', 'almond', 'cashew', 'walnut', 'pistachio', 'pecan', 'hazelnut', 'macadamia',
+                 'badam', 'kaju', 'pine nut', 'brazil nut'),
+    'dairy': ('milk', 'cream', 'butter', 'buttermilk', 'ghee', 'cheese', 'paneer', 'yogurt', 'yoghurt', 'curd',
+              'dahi', 'khoya', 'khoa', 'malai', 'whey', 'lassi', 'raita', 'casein'),
+    'gluten': ('wheat', 'flour', 'maida', 'atta', 'semolina', 'sooji', 'suji', 'rava', 'bread', 'breadcrumb',
+               'pasta', 'spaghetti', 'macaroni', 'noodle', 'barley', 'rye', 'couscous', 'seitan', 'naan', 'roti',
+               'chapati', 'paratha', 'bulgur', 'vermicelli', 'soy sauce'),
+    'egg': ('egg', 'mayonnaise', 'mayo', 'meringue'),
+    'soy': ('soy', 'soya', 'tofu', 'edamame', 'tempeh', 'miso'),
+    'fish': ('fish', 'salmon', 'tuna', 'cod', 'anchovy', 'anchovies', 'sardine', 'mackerel', 'tilapia', 'pomfret',
+             'rohu', 'hilsa', 'trout', 'basa'),
+    'shellfish': ('shellfish', 'shrimp', 'prawn', 'crab', 'lobster', 'oyster', 'mussel', 'clam', 'scallop', 'squid',
+                  'octopus', 'crayfish'),
+    'sesame': ('sesame', 'tahini', 'til', 'gingelly'),
+    'mustard': ('mustard', 'rai', 'sarson'),
+    'beef': ('beef', 'steak', 'veal'),
+    'pork': ('pork', 'bacon', 'ham', 'lard', 'prosciutto', 'pepperoni'),
+    'poultry': ('chicken', 'turkey', 'duck'),
+    'lamb': ('lamb', 'mutton', 'goat'),
+    'onion': ('onion', 'shallot', 'scallion', 'leek'),
+    'garlic': ('garlic',),
+    'mushroom': ('mushroom',),
+    'alcohol': ('wine', 'beer', 'rum', 'brandy', 'vodka', 'whisky', 'whiskey', 'sake', 'mirin'),
+    'gelatin': ('gelatin', 'gelatine'),
+}
+BITS = {name: 1 << position for position, name in enumerate(ALLERGENS)}
+LABELS = {name: name.replace('_', ' ') for name in ALLERGENS}
+
+# Phrases removed before matching, so they do not set the allergen named in their words
+NOT_ALLERGEN = {
+    'tree_nut': ('nutmeg', 'butternut', 'coconut', 'water chestnut'),
+    'dairy': ('coconut milk', 'coconut cream', 'almond milk', 'soy milk', 'soya milk', 'oat milk', 'rice milk',
+              'peanut butter', 'nut butter', 'almond butter', 'cocoa butter', 'cream of tartar',
+              'vegan butter', 'vegan cheese', 'dairy-free', 'dairy free'),
+    'gluten': ('rice flour', 'chickpea flour', 'gram flour', 'corn flour', 'almond flour', 'coconut flour',
+               'tapioca flour', 'rice noodle', 'rice pasta', 'gluten-free', 'gluten free'),
+    'egg': ('eggless', 'egg-free', 'egg free', 'vegan mayo', 'vegan mayonnaise'),
+    # Goat's milk products are dairy, not meat
+    'lamb': ('goat cheese', "goat's cheese", 'goats cheese', 'goat milk', "goat's milk", 'goats milk',
+             'goat yogurt', "goat's yogurt", 'goat yoghurt', "goat's yoghurt", 'goat butter', 'goat curd'),
+}
+
+# Umbrella terms accepted in custom restrictions
+GROUPS = {
+    'nuts': ('peanut', 'tree_nut'),
+    'tree nuts': ('tree_nut',),
+    'lactose': ('dairy',),
+    'meat': ('beef', 'pork', 'poultry', 'lamb'),
+    'red meat': ('beef', 'pork', 'lamb'),
+    'seafood': ('fish', 'shellfish'),
+    'eggs': ('egg',),
+    'alliums': ('onion', 'garlic'),
+    'onion and garlic': ('onion', 'garlic'),
+}
+
+RESTRICTION_SPLIT_RE = re.compile(r'[,;\n]+')
+
+
+def _pattern(words):
+    # Whole words with an optional plural, so 'cashews' matches but 'eggplant' does not
+    alternatives = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternatives})(?:e?s)?\b')
+
+
+_PATTERNS = {name: _pattern(words) for name, words in ALLERGENS.items()}
+_EXCEPTIONS = {name: _pattern(phrases) for name, phrases in NOT_ALLERGEN.items()}
+
+
+def classify_allergens(text):
+    """Bitmask of the allergens named in ingredient ``text``."""
+    text = (text or '').lower()
+    mask = 0
+    for name, pattern in _PATTERNS.items():
+        exceptions = _EXCEPTIONS.get(name)
+        if pattern.search(exceptions.sub(' ', text) if exceptions else text):
+            mask |= BITS[name]
+    return mask
+
+
+def allergen_names(mask):
+    return [LABELS[name] for name, bit in BITS.items() if mask & bit]
+
+
+def restriction_mask(text):
+    """``(mask, unmatched_terms)`` for a free-text list of restrictions."""
+    mask, unmatched = 0, []
+    for term in RESTRICTION_SPLIT_RE.split(text or ''):
+        term = ' '.join(term.lower().split())
+        if not term:
+            continue
+        names = GROUPS.get(term) or [name for name, label in LABELS.items() if term in (label, f'{label}s')]
+        bits = sum(BITS[name] for name in names) or classify_allergens(term)
+        if bits:
+            mask |= bits
+        else:
+            unmatched.append(term)
+    return mask, unmatched
+
+
+def preference_mask(preference):
+    """``(mask, unmatched_terms)`` of the allergens a DietaryPreference excludes."""
+    if preference is None:
+        return 0, []
+    mask, unmatched = restriction_mask(preference.custom_restrictions)
+    if preference.nut_allergy:
+        mask |= BITS['peanut'] | BITS['tree_nut']
+    if preference.dairy_free:
+        mask |= BITS['dairy']
+    if preference.gluten_free:
+        mask |= BITS['gluten']
+    return mask, unmatched
+
+
+def preference_allergens(preference):
+    """Readable names of everything ``preference`` excludes, for telling users what is hidden."""
+    mask, unmatched = preference_mask(preference)
+    return [*allergen_names(mask), *unmatched]
+
+
+def user_preference(user):
+    """The user's DietaryPreference, or None (anonymous users and users who never set one)."""
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.dietary_preference
+    except ObjectDoesNotExist:
+        return None
+
+
+def exclude_unsafe(queryset, preference):
+    """Drop the recipes of ``queryset`` that contain anything ``preference`` excludes."""
+    mask, unmatched = preference_mask(preference)
+    if mask:
+        queryset = queryset.alias(unsafe_allergens=F('allergens').bitand(mask)).filter(unsafe_allergens=0)
+    for term in unmatched:
+        queryset = queryset.exclude(ingredients__icontains=term)
+    return queryset
+
+
+def reclassify_allergens(queryset, batch_size=1000):
+    """Recompute ``allergens`` for every recipe in ``queryset`` in batches; returns the number changed."""
+    changed = 0
+    batch = []
+    for recipe in queryset.only('id', 'ingredients', 'allergens').order_by('id').iterator(chunk_size=batch_size):
+        allergens = classify_allergens(recipe.ingredients)
+        if allergens != recipe.allergens:
+            recipe.allergens = allergens
+            batch.append(recipe)
+        if len(batch) == batch_size:
+            queryset.model.objects.bulk_update(batch, ['allergens'])
+            changed += len(batch)
+            batch = []
+    if batch:
+        queryset.model.objects.bulk_update(batch, ['allergens'])
+        changed += len(batch)
+    return changed
@@ -1,15 +1,38 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
+from recipeapp.profiling import query_budget
+from recipeapp.replicas import read_replica
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count
-from .models import Recipe, FavoriteRecipe, MealPlan, ShoppingList, RecipeReview
+from django.contrib.admin.views.decorators import staff_member_required
+from .models import Recipe, FavoriteRecipe, MealPlan, RecipeReview
+from .search import search_recipes, SEARCH_ORDERING
+from .allergens import exclude_unsafe, user_preference
+from .macros import macro_ranges, FILTER_FIELDS, SORTS
+from .facets import facet_counts, selected_facets, MACRO_FACETS
+from .ingredients import with_ingredient
+from .stats import get_user_stats, cache_counters
+from .favorites import toggle_favorite_state
+from .popularity import trending_recipes, TRENDING_FIELDS, MAX_TRENDING
+from .recommendations import recommend, RECOMMENDATION_FIELDS, MAX_RECOMMENDATIONS
+from .nutrition import meal_plan_totals, meal_plan_daily_totals, meal_plan_meal_type_totals
+from .pagination import paginate_request, DEFAULT_KEYS
+from .streaming import stream_format, streaming_json_response
 import json
 
+@query_budget(3)
 @login_required
 @require_http_methods(["GET"])
 def api_favorite_recipes(request):
     """Get user's favorite recipes"""
+    fmt = stream_format(request)
+    if fmt:
+        recipes = Recipe.objects.filter(favorited_by__user=request.user).order_by(
+            '-favorited_by__created_at', '-favorited_by__id'
+        ).values('id', 'title', 'description', 'calories', 'protein', 'fat', 'carbs', 'dietary_type', 'created_at')
+        return streaming_json_response(recipes, fmt, 'favorites')
+    
     favorites = FavoriteRecipe.objects.filter(user=request.user).select_related('recipe')
+    page = paginate_request(request, favorites)
     recipes = [
         {
             'id': fav.recipe.id,
@@ -22,11 +45,12 @@ def api_favorite_recipes(request):
             'dietary_type': fav.recipe.dietary_type,
             'created_at': fav.recipe.created_at.isoformat(),
         }
-        for fav in favorites
+        for fav in page
     ]
-    return JsonResponse({'favorites': recipes})
+    return JsonResponse({'favorites': recipes, 'next': page.next_cursor, 'prev': page.prev_cursor})
 
 
+@query_budget(6)
 @login_required
 @require_http_methods(["GET"])
 def api_recipe_details(request, recipe_id):
@@ -36,7 +60,7 @@ def api_recipe_details(request, recipe_id):
         return JsonResponse({'error': 'Not found'}, status=404)
     
     reviews = RecipeReview.objects.filter(recipe=recipe).select_related('reviewer')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+    ingredient_rows = recipe.recipe_ingredients.select_related('ingredient')
     
     is_favorite = FavoriteRecipe.objects.filter(user=request.user, recipe=recipe).exists()
     
@@ -45,6 +69,15 @@ def api_recipe_details(request, recipe_id):
         'title': recipe.title,
         'description': recipe.description,
         'ingredients': recipe.ingredients.split('\n'),
+        'ingredient_items': [
+            {
+                'name': row.ingredient.name,
+                'quantity': float(row.quantity) if row.quantity is not None else None,
+                'unit': row.unit,
+                'text': row.raw_text,
+            }
+            for row in ingredient_rows
+        ],
         'instructions': recipe.instructions,
         'calories': recipe.calories,
         'protein': recipe.protein,
@@ -53,8 +86,8 @@ def api_recipe_details(request, recipe_id):
         'dietary_type': recipe.dietary_type,
         'is_shared': recipe.is_shared,
         'is_favorite': is_favorite,
-        'avg_rating': avg_rating,
-        'review_count': reviews.count(),
+        'avg_rating': recipe.avg_rating,
+        'review_count': recipe.review_count,
         'reviews': [
             {
                 'reviewer': review.reviewer.username,
@@ -68,47 +101,113 @@ def api_recipe_details(request, recipe_id):
     return JsonResponse(data)
 
 
+@query_budget(3)
 @login_required
 @require_http_methods(["GET"])
 def api_user_stats(request):
     """Get user statistics"""
-    total_recipes = Recipe.objects.filter(user=request.user).count()
-    favorite_count = FavoriteRecipe.objects.filter(user=request.user).count()
-    total_meal_plans = MealPlan.objects.filter(user=request.user).count()
-    total_shopping_lists = ShoppingList.objects.filter(user=request.user).count()
-    
-    data = {
-        'total_recipes': total_recipes,
-        'favorite_count': favorite_count,
-        'total_meal_plans': total_meal_plans,
-        'total_shopping_lists': total_shopping_lists,
-    }
+    data = get_user_stats(request.user.id)
     return JsonResponse(data)
 
 
+@query_budget(2)
+@staff_member_required
+@require_http_methods(["GET"])
+def api_cache_stats(request):
+    """Hit/miss counters of the user stats cache, for monitoring"""
+    return JsonResponse({'user_stats': cache_counters()})
+
+
+@query_budget(4)
+@read_replica
 @login_required
 @require_http_methods(["GET"])
 def api_search_recipes(request):
     """Search shared recipes"""
     query = request.GET.get('q', '')
     dietary_filter = request.GET.get('dietary_type', '')
+    ingredient = request.GET.get('ingredient', '')
     
     recipes = Recipe.objects.filter(is_shared=True)
+    fields = ['id', 'title', 'description', 'calories', 'dietary_type', 'avg_rating', 'created_at']
+    keys = DEFAULT_KEYS
     
     if query:
-        from django.db.models import Q
-        recipes = recipes.filter(Q(title__icontains=query) | Q(description__icontains=query))
+        recipes = search_recipes(recipes, query)
+        fields.append('search_rank')
+        keys = SEARCH_ORDERING
     
     if dietary_filter:
         recipes = recipes.filter(dietary_type=dietary_filter)
     
-    recipes = recipes.annotate(avg_rating=Avg('reviews__rating')).values(
-        'id', 'title', 'description', 'calories', 'dietary_type', 'avg_rating'
-    )[:20]
+    if ingredient:
+        recipes = with_ingredient(recipes, ingredient)
     
-    return JsonResponse({'results': list(recipes)})
+    # Leave out recipes with anything the user's dietary preferences exclude
+    recipes = exclude_unsafe(recipes, user_preference(request.user))
+    
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response(recipes.order_by(*keys).values(*fields), fmt, 'results')
+    
+    page = paginate_request(request, recipes.values(*fields), keys)
+    
+    return JsonResponse({'results': page.object_list, 'next': page.next_cursor, 'prev': page.prev_cursor})
 
 
+@query_budget(5)
+@read_replica
+@login_required
+@require_http_methods(["GET"])
+def api_filter_recipes(request):
+    """Shared recipes within macro and energy-share ranges, with facet counts"""
+    try:
+        ranges = macro_ranges(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    keys = SORTS.get(request.GET.get('sort', ''), DEFAULT_KEYS)
+    
+    recipes = exclude_unsafe(Recipe.objects.filter(ranges, is_shared=True), user_preference(request.user))
+    selected = selected_facets(request.GET, MACRO_FACETS)
+    facets, count = facet_counts(recipes, MACRO_FACETS, selected)
+    
+    page = paginate_request(request, recipes.filter(*selected.values()).values(*FILTER_FIELDS), keys)
+    
+    return JsonResponse({
+        'results': page.object_list, 'next': page.next_cursor, 'prev': page.prev_cursor,
+        'count': count, 'facets': facets,
+    })
+
+
+@query_budget(3)
+@read_replica
+@login_required
+@require_http_methods(["GET"])
+def api_trending_recipes(request):
+    """Most favorited and reviewed shared recipes of the last days, by trending score"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_TRENDING))
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': list(trending_recipes(limit).values(*TRENDING_FIELDS))})
+
+
+@query_budget(6)
+@read_replica
+@login_required
+@require_http_methods(["GET"])
+def api_recommendations(request):
+    """Shared recipes picked for the user from their dietary preferences, favorites and reviews"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_RECOMMENDATIONS))
+    except ValueError:
+        limit = 10
+    results = [{**{field: getattr(recipe, field) for field in RECOMMENDATION_FIELDS}, 'score': round(score, 4)}
+               for recipe, score in recommend(request.user, limit)]
+    return JsonResponse({'results': results})
+
+
+@query_budget(8)
 @login_required
 @require_http_methods(["POST"])
 def api_toggle_favorite(request, recipe_id):
@@ -117,16 +216,12 @@ def api_toggle_favorite(request, recipe_id):
     if not recipe.is_shared and recipe.user != request.user:
         return JsonResponse({'error': 'Not found'}, status=404)
     
-    favorite, created = FavoriteRecipe.objects.get_or_create(user=request.user, recipe=recipe)
-    if not created:
-        favorite.delete()
-        is_favorite = False
-    else:
-        is_favorite = True
+    is_favorite, favorite_count = toggle_favorite_state(request.user.id, recipe.pk)
     
-    return JsonResponse({'is_favorite': is_favorite})
+    return JsonResponse({'is_favorite': is_favorite, 'favorite_count': favorite_count})
 
 
+@query_budget(13)
 @login_required
 @require_http_methods(["POST"])
 def api_add_review(request, recipe_id):
@@ -146,37 +241,36 @@ def api_add_review(request, recipe_id):
             defaults={'rating': rating, 'comment': comment}
         )
         
-        avg_rating = recipe.reviews.aggregate(Avg('rating'))['rating__avg']
+        recipe.refresh_from_db(fields=['avg_rating', 'review_count'])
         
         return JsonResponse({
             'success': True,
-            'avg_rating': avg_rating,
-            'review_count': recipe.reviews.count(),
+            'avg_rating': recipe.avg_rating,
+            'review_count': recipe.review_count,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
 
+@query_budget(6)
 @login_required
 @require_http_methods(["GET"])
 def api_meal_plan_nutrition(request, meal_plan_id):
     """Get meal plan nutritional summary"""
-    from .models import MealPlanItem
-    
     meal_plan = MealPlan.objects.get(pk=meal_plan_id, user=request.user)
-    items = MealPlanItem.objects.filter(meal_plan=meal_plan)
-    
-    total_calories = sum(item.recipe.calories for item in items)
-    total_protein = sum(item.recipe.protein for item in items)
-    total_fat = sum(item.recipe.fat for item in items)
-    total_carbs = sum(item.recipe.carbs for item in items)
+    totals = meal_plan_totals(meal_plan)
     
     return JsonResponse({
         'meal_plan_id': meal_plan.id,
         'name': meal_plan.name,
-        'total_calories': total_calories,
-        'total_protein': total_protein,
-        'total_fat': total_fat,
-        'total_carbs': total_carbs,
-        'item_count': items.count(),
+        'total_calories': totals['calories'],
+        'total_protein': totals['protein'],
+        'total_fat': totals['fat'],
+        'total_carbs': totals['carbs'],
+        'item_count': totals['item_count'],
+        'by_day': [
+            {**day, 'meal_date': day['meal_date'].isoformat()}
+            for day in meal_plan_daily_totals(meal_plan)
+        ],
+        'by_meal_type': meal_plan_meal_type_totals(meal_plan),
     })
@@ -0,0 +1,310 @@
+"""Async versions of the JSON API views, served when ``ASYNC_API_VIEWS`` is on.
+
+They use the async ORM and run independent queries with ``asyncio.gather``, so under
+ASGI a request waiting on the database does not hold a worker thread. Responses match
+``api_views`` field for field.
+
+Note that on Django 4.2 the async ORM still runs each query through
+``sync_to_async(thread_sensitive=True)``, so gathered queries share one database thread
+and overlap only with other work on the event loop, not with each other.
+"""
+import asyncio
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from recipeapp.profiling import query_budget
+from recipeapp.replicas import read_replica
+from .models import Recipe, FavoriteRecipe, MealPlan, RecipeReview, RecipeIngredient
+from .search import search_recipes, SEARCH_ORDERING
+from .allergens import exclude_unsafe, user_preference
+from .macros import macro_ranges, FILTER_FIELDS, SORTS
+from .facets import facet_counts, selected_facets, MACRO_FACETS
+from .ingredients import with_ingredient
+from .stats import get_user_stats, cache_counters
+from .favorites import toggle_favorite_state
+from .popularity import trending_recipes, TRENDING_FIELDS, MAX_TRENDING
+from .recommendations import recommend, RECOMMENDATION_FIELDS, MAX_RECOMMENDATIONS
+from .nutrition import meal_plan_totals, meal_plan_daily_totals, meal_plan_meal_type_totals
+from .pagination import paginate_request, DEFAULT_KEYS
+from .streaming import stream_format, streaming_json_response
+
+
+def _async_view(methods, staff=False):
+    """login_required (or staff_member_required) plus require_http_methods for async views.
+
+    The session and user are loaded in a worker thread; after that ``request.user`` is a
+    plain object the view can read without touching the database.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+            if user is None or (staff and not (user.is_active and user.is_staff)):
+                login_url = 'admin:login' if staff else None
+                return redirect_to_login(request.get_full_path(), login_url)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _recipe_visible(recipe, user):
+    return recipe.is_shared or recipe.user_id == user.id
+
+
+@query_budget(3)
+@_async_view(['GET'])
+async def api_favorite_recipes(request):
+    """Get user's favorite recipes"""
+    fmt = stream_format(request)
+    if fmt:
+        recipes = Recipe.objects.filter(favorited_by__user=request.user).order_by(
+            '-favorited_by__created_at', '-favorited_by__id'
+        ).values('id', 'title', 'description', 'calories', 'protein', 'fat', 'carbs', 'dietary_type', 'created_at')
+        return streaming_json_response(recipes, fmt, 'favorites', asynchronous=True)
+
+    favorites = FavoriteRecipe.objects.filter(user=request.user).select_related('recipe')
+    page = await sync_to_async(paginate_request)(request, favorites)
+    recipes = [
+        {
+            'id': fav.recipe.id,
+            'title': fav.recipe.title,
+            'description': fav.recipe.description,
+            'calories': fav.recipe.calories,
+            'protein': fav.recipe.protein,
+            'fat': fav.recipe.fat,
+            'carbs': fav.recipe.carbs,
+            'dietary_type': fav.recipe.dietary_type,
+            'created_at': fav.recipe.created_at.isoformat(),
+        }
+        for fav in page
+    ]
+    return JsonResponse({'favorites': recipes, 'next': page.next_cursor, 'prev': page.prev_cursor})
+
+
+@query_budget(6)
+@_async_view(['GET'])
+async def api_recipe_details(request, recipe_id):
+    """Get detailed recipe information with reviews"""
+    recipe = await Recipe.objects.aget(pk=recipe_id)
+    if not _recipe_visible(recipe, request.user):
+        return JsonResponse({'error': 'Not found'}, status=404)
+
+    reviews_qs = RecipeReview.objects.filter(recipe=recipe).select_related('reviewer')
+    ingredients_qs = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient')
+    reviews, ingredient_rows, is_favorite = await asyncio.gather(
+        _alist(reviews_qs),
+        _alist(ingredients_qs),
+        FavoriteRecipe.objects.filter(user=request.user, recipe=recipe).aexists(),
+    )
+
+    data = {
+        'id': recipe.id,
+        'title': recipe.title,
+        'description': recipe.description,
+        'ingredients': recipe.ingredients.split('\n'),
+        'ingredient_items': [
+            {
+                'name': row.ingredient.name,
+                'quantity': float(row.quantity) if row.quantity is not None else None,
+                'unit': row.unit,
+                'text': row.raw_text,
+            }
+            for row in ingredient_rows
+        ],
+        'instructions': recipe.instructions,
+        'calories': recipe.calories,
+        'protein': recipe.protein,
+        'fat': recipe.fat,
+        'carbs': recipe.carbs,
+        'dietary_type': recipe.dietary_type,
+        'is_shared': recipe.is_shared,
+        'is_favorite': is_favorite,
+        'avg_rating': recipe.avg_rating,
+        'review_count': recipe.review_count,
+        'reviews': [
+            {
+                'reviewer': review.reviewer.username,
+                'rating': review.rating,
+                'comment': review.comment,
+                'created_at': review.created_at.isoformat(),
+            }
+            for review in reviews
+        ],
+    }
+    return JsonResponse(data)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+@query_budget(3)
+@_async_view(['GET'])
+async def api_user_stats(request):
+    """Get user statistics"""
+    # The counts are one cached SELECT (see recipes.stats), so there is nothing to gather
+    data = await sync_to_async(get_user_stats)(request.user.id)
+    return JsonResponse(data)
+
+
+@query_budget(2)
+@_async_view(['GET'], staff=True)
+async def api_cache_stats(request):
+    """Hit/miss counters of the user stats cache, for monitoring"""
+    return JsonResponse({'user_stats': await sync_to_async(cache_counters)()})
+
+
+@query_budget(4)
+@read_replica
+@_async_view(['GET'])
+async def api_search_recipes(request):
+    """Search shared recipes"""
+    query = request.GET.get('q', '')
+    dietary_filter = request.GET.get('dietary_type', '')
+    ingredient = request.GET.get('ingredient', '')
+
+    recipes = Recipe.objects.filter(is_shared=True)
+    fields = ['id', 'title', 'description', 'calories', 'dietary_type', 'avg_rating', 'created_at']
+    keys = DEFAULT_KEYS
+
+    if query:
+        recipes = search_recipes(recipes, query)
+        fields.append('search_rank')
+        keys = SEARCH_ORDERING
+
+    if dietary_filter:
+        recipes = recipes.filter(dietary_type=dietary_filter)
+
+    if ingredient:
+        recipes = with_ingredient(recipes, ingredient)
+
+    # Leave out recipes with anything the user's dietary preferences exclude
+    recipes = exclude_unsafe(recipes, await sync_to_async(user_preference)(request.user))
+
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response(recipes.order_by(*keys).values(*fields), fmt, 'results', asynchronous=True)
+
+    page = await sync_to_async(paginate_request)(request, recipes.values(*fields), keys)
+
+    return JsonResponse({'results': page.object_list, 'next': page.next_cursor, 'prev': page.prev_cursor})
+
+
+@query_budget(5)
+@read_replica
+@_async_view(['GET'])
+async def api_filter_recipes(request):
+    """Shared recipes within macro and energy-share ranges, with facet counts"""
+    try:
+        ranges = macro_ranges(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    keys = SORTS.get(request.GET.get('sort', ''), DEFAULT_KEYS)
+
+    preference = await sync_to_async(user_preference)(request.user)
+    recipes = exclude_unsafe(Recipe.objects.filter(ranges, is_shared=True), preference)
+    selected = selected_facets(request.GET, MACRO_FACETS)
+    (facets, count), page = await asyncio.gather(
+        sync_to_async(facet_counts)(recipes, MACRO_FACETS, selected),
+        sync_to_async(paginate_request)(request, recipes.filter(*selected.values()).values(*FILTER_FIELDS), keys),
+    )
+
+    return JsonResponse({
+        'results': page.object_list, 'next': page.next_cursor, 'prev': page.prev_cursor,
+        'count': count, 'facets': facets,
+    })
+
+
+@query_budget(3)
+@read_replica
+@_async_view(['GET'])
+async def api_trending_recipes(request):
+    """Most favorited and reviewed shared recipes of the last days, by trending score"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_TRENDING))
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': await _alist(trending_recipes(limit).values(*TRENDING_FIELDS))})
+
+
+@query_budget(6)
+@read_replica
+@_async_view(['GET'])
+async def api_recommendations(request):
+    """Shared recipes picked for the user from their dietary preferences, favorites and reviews"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_RECOMMENDATIONS))
+    except ValueError:
+        limit = 10
+    ranked = await sync_to_async(recommend)(request.user, limit)
+    results = [{**{field: getattr(recipe, field) for field in RECOMMENDATION_FIELDS}, 'score': round(score, 4)}
+               for recipe, score in ranked]
+    return JsonResponse({'results': results})
+
+
+@query_budget(8)
+@_async_view(['POST'])
+async def api_toggle_favorite(request, recipe_id):
+    """Toggle recipe favorite status"""
+    recipe = await Recipe.objects.aget(pk=recipe_id)
+    if not _recipe_visible(recipe, request.user):
+        return JsonResponse({'error': 'Not found'}, status=404)
+
+    is_favorite, favorite_count = await sync_to_async(toggle_favorite_state)(request.user.id, recipe.pk)
+    return JsonResponse({'is_favorite': is_favorite, 'favorite_count': favorite_count})
+
+
+@query_budget(13)
+@_async_view(['POST'])
+async def api_add_review(request, recipe_id):
+    """Add or update recipe review"""
+    recipe = await Recipe.objects.aget(pk=recipe_id)
+    if not _recipe_visible(recipe, request.user):
+        return JsonResponse({'error': 'Not found'}, status=404)
+
+    try:
+        data = json.loads(request.body)
+        await RecipeReview.objects.aupdate_or_create(
+            recipe=recipe,
+            reviewer=request.user,
+            defaults={'rating': data.get('rating'), 'comment': data.get('comment', '')}
+        )
+        await recipe.arefresh_from_db(fields=['avg_rating', 'review_count'])
+
+        return JsonResponse({
+            'success': True,
+            'avg_rating': recipe.avg_rating,
+            'review_count': recipe.review_count,
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@query_budget(6)
+@_async_view(['GET'])
+async def api_meal_plan_nutrition(request, meal_plan_id):
+    """Get meal plan nutritional summary"""
+    meal_plan = await MealPlan.objects.aget(pk=meal_plan_id, user=request.user)
+    totals, by_day, by_meal_type = await asyncio.gather(
+        sync_to_async(meal_plan_totals)(meal_plan),
+        sync_to_async(meal_plan_daily_totals)(meal_plan),
+        sync_to_async(meal_plan_meal_type_totals)(meal_plan),
+    )
+
+    return JsonResponse({
+        'meal_plan_id': meal_plan.id,
+        'name': meal_plan.name,
+        'total_calories': totals['calories'],
+        'total_protein': totals['protein'],
+        'total_fat': totals['fat'],
+        'total_carbs': totals['carbs'],
+        'item_count': totals['item_count'],
+        'by_day': [{**day, 'meal_date': day['meal_date'].isoformat()} for day in by_day],
+        'by_meal_type': by_meal_type,
+    })
@@ -0,0 +1,9 @@
+"""Fixed-size batches over any iterable, for bulk writes that must not hold every row."""
+from itertools import islice
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``, consuming it lazily."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,97 @@
+"""Versioned page cache for the public shared-recipe catalogue.
+
+Anonymous visitors all see the same ``home`` and ``shared_recipes`` pages, so those
+responses are cached under a global catalogue version. Any change to a shared recipe
+or to a review bumps the version once the change commits, which invalidates every
+cached page at once and changes the ETag/Last-Modified validators used for
+conditional GETs.
+
+The version lives in the default cache, so processes only share it when the cache
+backend is shared (e.g. Redis, see CACHES in settings).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+VERSION_KEY = 'recipes:catalogue:version'
+PAGE_KEY_PREFIX = 'recipes:catalogue:page'
+
+
+def catalogue_state():
+    """``{'version': str, 'modified': int}``, initialised on first use or after eviction."""
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        state = {'version': str(time.time_ns()), 'modified': int(time.time())}
+        if not cache.add(VERSION_KEY, state, timeout=None):
+            state = cache.get(VERSION_KEY, state)
+    return state
+
+
+def bump_catalogue_version():
+    cache.set(VERSION_KEY, {'version': str(time.time_ns()), 'modified': int(time.time())}, timeout=None)
+
+
+def bump_after_commit(using=None):
+    # Bumping before commit lets a concurrent request cache the old rows under the new version
+    transaction.on_commit(bump_catalogue_version, using=using)
+
+
+def recipe_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if instance.is_shared or getattr(instance, '_stored_is_shared', False):
+        bump_after_commit(using)
+    instance._stored_is_shared = instance.is_shared
+
+
+def recipe_deleted(sender, instance, using=None, **kwargs):
+    if instance.is_shared:
+        bump_after_commit(using)
+
+
+def review_changed(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        bump_after_commit(using)
+
+
+def catalogue_page(view):
+    """Serve anonymous GETs from the versioned page cache, answering 304 when possible."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        state = catalogue_state()
+        path = request.get_full_path()
+        path_hash = hashlib.md5(path.encode()).hexdigest()
+        etag = quote_etag(f"{state['version']}-{path_hash}")
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=state['modified'])
+        if not_modified is not None:
+            return not_modified
+
+        key = f"{PAGE_KEY_PREFIX}:{state['version']}:{path_hash}"
+        cached = cache.get(key)
+        if cached is not None:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+            }, getattr(settings, 'CATALOGUE_PAGE_CACHE_TIMEOUT', 600))
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(state['modified'])
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
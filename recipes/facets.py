@@ -0,0 +1,113 @@
+"""Facet counts for recipe listings in a single query.
+
+A facet is a list of ``(value, label, condition)`` buckets, selected with a query
+parameter named after the facet (``?calories=300_500``). ``facet_counts`` turns every
+bucket of every facet into a ``COUNT(*) FILTER (WHERE ...)`` column of one aggregate
+over the current listing, so each facet adds a column rather than a query.
+"""
+from django.db.models import Count, Q
+
+from .models import Recipe
+
+DIETARY_FACET = [(value, label, Q(dietary_type=value)) for value, label in Recipe.DIETARY_CHOICES]
+
+CALORIE_FACET = [
+    ('under_300', 'Under 300 kcal', Q(calories__lt=300)),
+    ('300_500', '300-500 kcal', Q(calories__gte=300, calories__lt=500)),
+    ('500_800', '500-800 kcal', Q(calories__gte=500, calories__lt=800)),
+    ('800_plus', '800+ kcal', Q(calories__gte=800)),
+]
+
+PROTEIN_FACET = [
+    ('high', 'High protein (30%+ of energy)', Q(protein_pct__gte=30)),
+    ('moderate', 'Moderate protein (15-30%)', Q(protein_pct__gte=15, protein_pct__lt=30)),
+    ('low', 'Low protein (under 15%)', Q(protein_pct__lt=15)),
+]
+
+RATING_FACET = [
+    ('4_plus', '4 stars & up', Q(avg_rating__gte=4)),
+    ('3_to_4', '3 to 4 stars', Q(avg_rating__gte=3, avg_rating__lt=4)),
+    ('under_3', 'Under 3 stars', Q(avg_rating__lt=3)),
+    ('unrated', 'Not rated yet', Q(avg_rating__isnull=True)),
+]
+
+REVIEWS_FACET = [
+    ('yes', 'Has reviews', Q(review_count__gt=0)),
+    ('no', 'No reviews yet', Q(review_count=0)),
+]
+
+TITLES = {
+    'dietary_type': 'Dietary type',
+    'calories': 'Calories',
+    'protein': 'Protein',
+    'rating': 'Rating',
+    'reviews': 'Reviews',
+}
+
+# shared_recipes
+CATALOGUE_FACETS = {
+    'dietary_type': DIETARY_FACET,
+    'calories': CALORIE_FACET,
+    'rating': RATING_FACET,
+    'reviews': REVIEWS_FACET,
+}
+
+# api_filter_recipes
+MACRO_FACETS = {
+    'dietary_type': DIETARY_FACET,
+    'calories': CALORIE_FACET,
+    'protein': PROTEIN_FACET,
+}
+
+
+def selected_facets(params, facets):
+    """``{facet: condition}`` for each facet whose query parameter names one of its buckets."""
+    selected = {}
+    for name, buckets in facets.items():
+        value = params.get(name)
+        for bucket_value, _, condition in buckets:
+            if value == bucket_value:
+                selected[name] = condition
+    return selected
+
+
+def facet_counts(queryset, facets, selected=None):
+    """``({facet: [{'value', 'label', 'count'}]}, total)`` for ``queryset`` in one query.
+
+    ``selected`` maps facet names to the condition the user picked in that facet, left
+    out of ``queryset``. Each facet is counted under every selection but its own, so a
+    picked dietary type still shows how many recipes the other types would give.
+    """
+    selected = selected or {}
+    aggregates = {'total': Count('id', filter=Q(*selected.values())) if selected else Count('id')}
+    for i, (name, buckets) in enumerate(facets.items()):
+        others = Q(*(condition for facet, condition in selected.items() if facet != name))
+        for j, (_, _, condition) in enumerate(buckets):
+            aggregates[f'facet_{i}_{j}'] = Count('id', filter=condition & others)
+    row = queryset.order_by().aggregate(**aggregates)
+    counts = {
+        name: [
+            {'value': value, 'label': label, 'count': row[f'facet_{i}_{j}']}
+            for j, (value, label, _) in enumerate(buckets)
+        ]
+        for i, (name, buckets) in enumerate(facets.items())
+    }
+    return counts, row['total']
+
+
+def facet_links(request, counts):
+    """Template rows for ``counts``: each bucket gains ``selected`` and a ``url`` toggling it."""
+    facets = []
+    for name, buckets in counts.items():
+        current = request.GET.get(name)
+        for bucket in buckets:
+            params = request.GET.copy()
+            params.pop('cursor', None)
+            bucket['selected'] = bucket['value'] == current
+            if bucket['selected']:
+                params.pop(name)
+            else:
+                params[name] = bucket['value']
+            bucket['url'] = f'?{params.urlencode()}'
+        facets.append({'name': name, 'title': TITLES[name], 'buckets': buckets, 'current': current})
+    return facets
@@ -0,0 +1,252 @@
+"""Deterministic bulk data factories for benchmarks and query-budget checks.
+
+Rows are produced by seeded ``random.Random`` generators and written with chunked
+``bulk_create`` calls. Because bulk_create skips model signals, the derived data those
+signals normally maintain (structured ingredients, rating aggregates, favorite counts,
+caches) is rebuilt explicitly once the rows are in.
+"""
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .batching import chunked
+from .catalogue import bump_catalogue_version
+from .ingredients import build_recipe_ingredients
+from .models import (
+    Recipe, FavoriteRecipe, DietaryPreference, RecipeReview, MealPlan, MealPlanItem,
+    ShoppingList, ShoppingListItem, RecipeIngredient,
+)
+from .popularity import reconcile_favorite_counts
+from .ratings import reconcile_rating_stats
+from .stats import invalidate_many_user_stats
+
+ADJECTIVES = ['Spicy', 'Creamy', 'Smoky', 'Tangy', 'Crispy', 'Herbed', 'Roasted', 'Masala', 'Classic', 'Rustic']
+DISHES = ['Paneer Tikka', 'Dal Tadka', 'Chicken Curry', 'Vegetable Biryani', 'Chana Masala', 'Aloo Gobi',
+          'Litti Chokha', 'Lentil Soup', 'Quinoa Salad', 'Fish Fry', 'Rajma', 'Khichdi', 'Pulao', 'Dosa']
+INGREDIENTS = [
+    ('cup', 'rice'), ('cup', 'lentils'), ('g', 'paneer'), ('g', 'chicken'), ('tbsp', 'ghee'),
+    ('tbsp', 'oil'), ('tsp', 'turmeric'), ('tsp', 'cumin seeds'), ('tsp', 'garam masala'), ('', 'onion'),
+    ('', 'tomato'), ('clove', 'garlic'), ('g', 'ginger'), ('cup', 'spinach'), ('g', 'potato'),
+    ('cup', 'chickpeas'), ('cup', 'yogurt'), ('tbsp', 'cream'), ('g', 'cashews'), ('cup', 'flour'),
+]
+DIETARY_WEIGHTS = [('none', 50), ('vegetarian', 30), ('vegan', 12), ('gluten_free', 8)]
+MEAL_TYPES = [meal_type for meal_type, _ in MealPlanItem.MEAL_TYPES]
+
+
+@dataclass
+class SeedResult:
+    user_ids: list = field(default_factory=list)
+    recipe_ids: list = field(default_factory=list)
+    meal_plan_ids: list = field(default_factory=list)
+    shopping_list_ids: list = field(default_factory=list)
+
+
+def _ingredient_text(rng):
+    lines = []
+    for unit, name in rng.sample(INGREDIENTS, rng.randint(4, 9)):
+        amount = rng.choice([1, 2, 3, '1/2', 200, 250, 500]) if unit in ('g', '') else rng.choice([1, 2, 3, '1/2'])
+        lines.append(f'{amount} {unit} {name}'.replace('  ', ' '))
+    return '\n'.join(lines)
+
+
+def _weights(rng, n, skew):
+    """Cumulative weights for ``n`` items: uniform when ``skew`` is 0, otherwise heavy-tailed."""
+    if not skew:
+        return None
+    total, cumulative = 0.0, []
+    for _ in range(n):
+        total += rng.paretovariate(skew)
+        cumulative.append(total)
+    return cumulative
+
+
+def _pick(rng, population, cum_weights, k):
+    """Up to ``k`` distinct items, favouring heavy items when weights are given."""
+    k = min(k, len(population))
+    if cum_weights is None:
+        return rng.sample(population, k)
+    return list(dict.fromkeys(rng.choices(population, cum_weights=cum_weights, k=k)))
+
+
+def _per_user(rng, mean, skewed):
+    """How many rows one user gets: ``mean`` on average, exponentially spread when skewed."""
+    if skewed:
+        return int(rng.expovariate(1 / mean)) if mean else 0
+    return int(mean) + (rng.random() < mean % 1)
+
+
+def _backdate(model, objs, now, age, slices=20):
+    """Move ``created_at`` back by ``age(position)`` seconds, one value per slice of ``objs``.
+
+    auto_now_add ignores values given to bulk_create, so the times are set afterwards
+    with one UPDATE per slice; bulk_update's per-row CASE would cost as much as the insert.
+    """
+    size = -(-len(objs) // slices)
+    for start in range(0, len(objs), size):
+        model.objects.filter(pk__in=[obj.pk for obj in objs[start:start + size]]).update(
+            created_at=now - timedelta(seconds=age(start))
+        )
+
+
+def recipe_rows(rng, authors, shared_ratio=0.6):
+    dietary_values = [value for value, _ in DIETARY_WEIGHTS]
+    dietary_weights = [weight for _, weight in DIETARY_WEIGHTS]
+    numbers = Counter()
+    for user_id in authors:
+        numbers[user_id] += 1
+        protein = round(rng.uniform(4, 60), 1)
+        fat = round(rng.uniform(2, 45), 1)
+        carbs = round(rng.uniform(5, 110), 1)
+        recipe = Recipe(
+            user_id=user_id,
+            title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} #{user_id}-{numbers[user_id]}',
+            description=f'A {rng.choice(ADJECTIVES).lower()} take on a home-style favourite.',
+            ingredients=_ingredient_text(rng),
+            instructions='Prepare the ingredients\nCook until done\nServe hot',
+            calories=int(protein * 4 + carbs * 4 + fat * 9),
+            protein=protein, fat=fat, carbs=carbs,
+            dietary_type=rng.choices(dietary_values, dietary_weights)[0],
+            is_shared=rng.random() < shared_ratio,
+        )
+        # bulk_create skips Recipe.save, which fills in the derived columns
+        recipe.set_derived_fields()
+        yield recipe
+
+
+def _authors(rng, user_ids, recipes, skew, chunk_size):
+    """Author of every recipe: round-robin, or a few prolific users when skewed."""
+    cum_weights = _weights(rng, len(user_ids), skew)
+    if cum_weights is None:
+        for n in range(recipes):
+            yield user_ids[n % len(user_ids)]
+        return
+    for start in range(0, recipes, chunk_size):
+        yield from rng.choices(user_ids, cum_weights=cum_weights, k=min(chunk_size, recipes - start))
+
+
+def seed(users=100, recipes=None, recipes_per_user=5, reviews_per_recipe=2, favorites_per_user=5,
+         meal_plans_per_user=1, days_per_plan=7, shopping_lists_per_user=1, items_per_list=10,
+         author_skew=0.0, popularity_skew=0.0, history_days=0,
+         seed_value=0, chunk_size=2000, username_prefix='seed', progress=None):
+    """Create a deterministic dataset and return the ids of what was created.
+
+    ``recipes`` defaults to ``users * recipes_per_user``. With ``author_skew`` and
+    ``popularity_skew`` (Pareto shape, smaller is more skewed) a few users write most
+    recipes and a few recipes collect most reviews and favorites; at 0 everything is
+    spread evenly. ``history_days`` backdates ``created_at`` over that many days.
+    """
+    rng = random.Random(seed_value)
+    result = SeedResult()
+    report = progress or (lambda message: None)
+    password = make_password(None)
+    recipes = users * recipes_per_user if recipes is None else recipes
+    now = timezone.now()
+    span = history_days * 86400
+
+    with transaction.atomic():
+        first_user = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for chunk in chunked(
+            (User(username=f'{username_prefix}{first_user + i}', password=password) for i in range(users)), chunk_size
+        ):
+            User.objects.bulk_create(chunk)
+        result.user_ids = list(
+            User.objects.filter(username__startswith=username_prefix, id__gt=first_user).values_list('id', flat=True)
+        )
+        DietaryPreference.objects.bulk_create([
+            DietaryPreference(user_id=user_id, vegetarian=rng.random() < 0.3, nut_allergy=rng.random() < 0.05,
+                              dairy_free=rng.random() < 0.08, low_carb=rng.random() < 0.1)
+            for user_id in result.user_ids if rng.random() < 0.4
+        ], batch_size=chunk_size)
+        report(f'{len(result.user_ids)} users')
+
+        rows = recipe_rows(rng, _authors(rng, result.user_ids, recipes, author_skew, chunk_size))
+        for chunk in chunked(rows, chunk_size):
+            created = Recipe.objects.bulk_create(chunk)
+            if history_days:
+                # Oldest first, so ids and creation times grow together as they would in production
+                done = len(result.recipe_ids)
+                _backdate(Recipe, created, now, lambda n: span * (1 - (done + n) / recipes))
+            result.recipe_ids.extend(recipe.pk for recipe in created)
+            RecipeIngredient.objects.bulk_create(build_recipe_ingredients(created), batch_size=chunk_size)
+            report(f'{len(result.recipe_ids)}/{recipes} recipes')
+
+        # bulk_create ids are ascending, so this run's recipes are one contiguous id range
+        new_recipes = Recipe.objects.filter(pk__gte=result.recipe_ids[0], pk__lte=result.recipe_ids[-1]) \
+            if result.recipe_ids else Recipe.objects.none()
+        shared_ids = list(new_recipes.filter(is_shared=True).values_list('id', flat=True))
+        popularity = _weights(rng, len(shared_ids), popularity_skew)
+        skewed = bool(popularity_skew)
+        if shared_ids and result.user_ids:
+            reviews_per_user = reviews_per_recipe * len(shared_ids) / len(result.user_ids)
+            reviews = (
+                RecipeReview(recipe_id=recipe_id, reviewer_id=reviewer_id, rating=rng.choices([1, 2, 3, 4, 5], [1, 2, 4, 6, 5])[0],
+                             comment=rng.choice(['Loved it', 'Would cook again', 'Too salty', '', 'Family favourite']))
+                for reviewer_id in result.user_ids
+                for recipe_id in _pick(rng, shared_ids, popularity, _per_user(rng, reviews_per_user, skewed))
+            )
+            for chunk in chunked(reviews, chunk_size):
+                created = RecipeReview.objects.bulk_create(chunk)
+                if history_days:
+                    _backdate(RecipeReview, created, now, lambda n: rng.uniform(0, span))
+            reconcile_rating_stats(new_recipes)
+
+            favorites = (
+                FavoriteRecipe(user_id=user_id, recipe_id=recipe_id)
+                for user_id in result.user_ids
+                for recipe_id in _pick(rng, shared_ids, popularity, _per_user(rng, favorites_per_user, skewed))
+            )
+            for chunk in chunked(favorites, chunk_size):
+                created = FavoriteRecipe.objects.bulk_create(chunk)
+                if history_days:
+                    _backdate(FavoriteRecipe, created, now, lambda n: rng.uniform(0, span))
+            reconcile_favorite_counts(new_recipes)
+        report('reviews and favorites')
+
+        plans = MealPlan.objects.bulk_create([
+            MealPlan(user_id=user_id, name=f'Week plan {n + 1}')
+            for user_id in result.user_ids for n in range(meal_plans_per_user)
+        ], batch_size=chunk_size)
+        result.meal_plan_ids = [plan.pk for plan in plans]
+        own_recipes = {}
+        for recipe_id, user_id in new_recipes.values_list('id', 'user_id').iterator(chunk_size=chunk_size):
+            own_recipes.setdefault(user_id, []).append(recipe_id)
+        start = date.today()
+        items = (
+            # Users without recipes of their own plan meals from shared ones
+            MealPlanItem(meal_plan_id=plan.pk, recipe_id=rng.choice(own_recipes.get(plan.user_id) or shared_ids),
+                         meal_date=start + timedelta(days=day), meal_type=meal_type)
+            for plan in plans if own_recipes.get(plan.user_id) or shared_ids
+            for day in range(days_per_plan)
+            for meal_type in MEAL_TYPES
+        )
+        for chunk in chunked(items, chunk_size):
+            MealPlanItem.objects.bulk_create(chunk)
+        report('meal plans')
+
+        lists = ShoppingList.objects.bulk_create([
+            ShoppingList(user_id=user_id, name=f'Groceries {n + 1}')
+            for user_id in result.user_ids for n in range(shopping_lists_per_user)
+        ], batch_size=chunk_size)
+        result.shopping_list_ids = [shopping_list.pk for shopping_list in lists]
+        list_items = (
+            ShoppingListItem(shopping_list_id=shopping_list.pk, item_name=name.capitalize(),
+                             quantity=f'{rng.randint(1, 4)} {unit}'.strip(), is_checked=rng.random() < 0.2)
+            for shopping_list in lists
+            for unit, name in rng.sample(INGREDIENTS, min(items_per_list, len(INGREDIENTS)))
+        )
+        for chunk in chunked(list_items, chunk_size):
+            ShoppingListItem.objects.bulk_create(chunk)
+        report('shopping lists')
+
+    # Signals did not run for any of this; every row belongs to the new users, so only
+    # their stat bundles and the catalogue pages can be stale
+    invalidate_many_user_stats(result.user_ids)
+    bump_catalogue_version()
+    return result
+
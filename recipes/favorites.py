@@ -0,0 +1,57 @@
+"""Race-free favorite toggling shared by the HTML and API views.
+
+``get_or_create`` followed by ``delete`` reads before it writes: two clicks landing
+together can both miss the row and both insert, and the loser fails on the
+``(user, recipe)`` unique constraint. Here the delete is the read. One DELETE reports
+whether a favorite existed. If none did, an ``INSERT ... ON CONFLICT DO NOTHING`` adds
+it, so a concurrent insert of the same pair is a no-op instead of an IntegrityError.
+
+The recipe's ``favorite_count`` is then adjusted by whichever of the two changed a
+row, in an UPDATE that returns the new count. The statements share one transaction:
+otherwise a concurrent delete could apply its -1 before the matching insert's +1 and
+take the count below zero. A recipe deleted while it is toggled is treated as not
+favorited. Raw statements skip model signals, so the owner's cached stats are
+invalidated here.
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import FavoriteRecipe, Recipe
+from .stats import invalidate_user_stats
+
+
+def toggle_favorite_state(user_id, recipe_id):
+    """Flip the favorite for ``(user, recipe)``; returns ``(is_favorite, favorite_count)``."""
+    using = router.db_for_write(FavoriteRecipe)
+    ops = connections[using].ops
+    table = ops.quote_name(FavoriteRecipe._meta.db_table)
+    try:
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE user_id = %s AND recipe_id = %s', [user_id, recipe_id])
+            removed = cursor.rowcount > 0
+            if removed:
+                delta = -1
+            else:
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, recipe_id, created_at) VALUES (%s, %s, %s) '
+                    f'ON CONFLICT (user_id, recipe_id) DO NOTHING',
+                    [user_id, recipe_id, ops.adapt_datetimefield_value(timezone.now())],
+                )
+                delta = cursor.rowcount
+            if delta:
+                cursor.execute(
+                    f'UPDATE {ops.quote_name(Recipe._meta.db_table)} SET favorite_count = favorite_count + %s '
+                    f'WHERE id = %s RETURNING favorite_count',
+                    [delta, recipe_id],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    # Deleted since the view loaded it: roll back the insert, which would fail its foreign key
+                    raise Recipe.DoesNotExist
+                favorite_count = row[0]
+            else:
+                favorite_count = Recipe.objects.using(using).values_list('favorite_count', flat=True).get(pk=recipe_id)
+    except Recipe.DoesNotExist:
+        return False, 0
+    invalidate_user_stats(user_id)
+    return not removed, favorite_count
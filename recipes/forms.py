@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
-from .models import Recipe, MealPlan, ShoppingList, ShoppingListItem, RecipeReview, DietaryPreference
+from .models import Recipe, MealPlan, MealPlanItem, ShoppingList, ShoppingListItem, RecipeReview, DietaryPreference
+from .meal_planner import MAX_DAYS
 
 class RegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -44,6 +45,29 @@ class MealPlanForm(forms.ModelForm):
         }
 
 
+class GenerateMealPlanForm(forms.Form):
+    name = forms.CharField(max_length=255, widget=forms.TextInput(attrs={'class': 'form-input', 'placeholder': 'Meal plan name'}))
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}))
+    meal_types = forms.MultipleChoiceField(choices=MealPlanItem.MEAL_TYPES, initial=[code for code, _ in MealPlanItem.MEAL_TYPES],
+                                           widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-checkbox'}))
+    calories = forms.IntegerField(min_value=800, max_value=6000, initial=2000, label='Daily calories',
+                                  widget=forms.NumberInput(attrs={'class': 'form-input'}))
+    protein = forms.FloatField(min_value=0, required=False, label='Daily protein (g)',
+                               widget=forms.NumberInput(attrs={'class': 'form-input', 'placeholder': 'Optional', 'step': '1'}))
+    fat = forms.FloatField(min_value=0, required=False, label='Daily fat (g)',
+                           widget=forms.NumberInput(attrs={'class': 'form-input', 'placeholder': 'Optional', 'step': '1'}))
+    carbs = forms.FloatField(min_value=0, required=False, label='Daily carbs (g)',
+                             widget=forms.NumberInput(attrs={'class': 'form-input', 'placeholder': 'Optional', 'step': '1'}))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start and end and not 0 <= (end - start).days < MAX_DAYS:
+            raise forms.ValidationError(f'The end date must be on or after the start date and within {MAX_DAYS} days of it.')
+        return cleaned_data
+
+
 class ShoppingListForm(forms.ModelForm):
     class Meta:
         model = ShoppingList
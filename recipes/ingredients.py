@@ -0,0 +1,191 @@
+"""Parsing of free-text ingredient lines into structured RecipeIngredient rows.
+
+``Recipe.ingredients`` stays the editable source text; every save re-parses it into
+Ingredient/RecipeIngredient rows so recipes can be queried by ingredient through an
+indexed join instead of a LIKE over every recipe body.
+
+A line is a quantity (a number, fraction, mixed number or range such as "2-3", which
+keeps its upper bound), an optional package size in parentheses, an optional unit and
+the name. Names are normalised so the same ingredient gets one row however it is
+written: "2 large onions, chopped" and "1 onion" are both ``onion``.
+"""
+import re
+from functools import lru_cache
+from decimal import Decimal, InvalidOperation
+
+from .models import Ingredient, RecipeIngredient
+
+UNIT_ALIASES = {
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'g': 'g', 'gm': 'g', 'gms': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kgs': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'l': 'l', 'litre': 'l', 'litres': 'l', 'liter': 'l', 'liters': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch',
+    'clove': 'clove', 'cloves': 'clove',
+    'piece': 'piece', 'pieces': 'piece', 'pc': 'piece', 'pcs': 'piece',
+    'can': 'can', 'cans': 'can', 'tin': 'can', 'tins': 'can',
+    'jar': 'jar', 'jars': 'jar',
+    'packet': 'packet', 'packets': 'packet', 'pack': 'packet', 'packs': 'packet',
+    'bunch': 'bunch', 'bunches': 'bunch',
+    'sprig': 'sprig', 'sprigs': 'sprig',
+    'handful': 'handful', 'handfuls': 'handful',
+    'slice': 'slice', 'slices': 'slice',
+    'stick': 'stick', 'sticks': 'stick',
+}
+
+# Leading words that describe the size of an item rather than name it
+SIZE_WORDS = {'large', 'medium', 'small', 'big', 'jumbo', 'extra-large', 'medium-sized', 'heaped', 'heaping',
+              'level', 'generous'}
+
+# Plurals the suffix rules in singular() get wrong, and words that only look plural
+IRREGULAR_PLURALS = {'leaves': 'leaf', 'halves': 'half', 'loaves': 'loaf', 'chillies': 'chilli',
+                     'chilies': 'chili', 'cookies': 'cookie'}
+NOT_PLURAL = {'hummus', 'couscous', 'asparagus', 'molasses', 'swiss', 'citrus'}
+
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+NUMBER = r'\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?'
+QUANTITY_RE = re.compile(rf'^({NUMBER})(?:\s*(?:-|–|\bto\b)\s*({NUMBER}))?\s*')
+UNIT_RE = re.compile(r'^([a-zA-Z]+)\.?\s+(?:of\s+)?')
+PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+LEADING_PARENTHETICAL_RE = re.compile(r'^\([^)]*\)\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+
+BATCH_SIZE = 1000
+
+
+def _parse_quantity(text):
+    total = Decimal(0)
+    try:
+        for part in text.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += Decimal(numerator) / Decimal(denominator)
+            else:
+                total += Decimal(part)
+    except (InvalidOperation, ZeroDivisionError):
+        return None
+    return total.quantize(Decimal('0.001'))
+
+
+def singular(word):
+    """Best-effort singular of an English ingredient word ("tomatoes" -> "tomato")."""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in NOT_PLURAL or len(word) < 4 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize_name(text):
+    """Canonical ingredient name: lowercase and singular, without size words,
+    parenthetical notes or trailing preparation."""
+    text = PARENTHETICAL_RE.sub(' ', text)
+    text = text.split(',')[0]
+    words = WHITESPACE_RE.sub(' ', text).strip(' .-*').lower().split(' ')
+    while len(words) > 1 and words[0] in SIZE_WORDS:
+        words = words[1:]
+    words[-1] = singular(words[-1])
+    return ' '.join(words)
+
+
+@lru_cache(maxsize=4096)
+def parse_ingredient(line):
+    """Split one ingredient line into ``(name, quantity, unit)``; quantity may be None.
+
+    Cached because the same lines ("1 onion", "2 cups rice") recur across recipes.
+    """
+    text = line.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    text = text.strip()
+
+    quantity = None
+    unit = ''
+    match = QUANTITY_RE.match(text)
+    if match:
+        # A range ("2-3 cloves") keeps its upper bound, so shopping lists buy enough
+        quantity = _parse_quantity(match.group(2) or match.group(1))
+        text = LEADING_PARENTHETICAL_RE.sub('', text[match.end():])
+        unit_match = UNIT_RE.match(text)
+        if unit_match and unit_match.group(1).lower() in UNIT_ALIASES:
+            unit = UNIT_ALIASES[unit_match.group(1).lower()]
+            text = text[unit_match.end():]
+    return normalize_name(text), quantity, unit
+
+
+def parse_ingredients(text):
+    """Parse a recipe's ingredient text into ``(raw_line, name, quantity, unit)`` tuples."""
+    parsed = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        name, quantity, unit = parse_ingredient(line)
+        if name:
+            parsed.append((line[:255], name[:255], quantity, unit))
+    return parsed
+
+
+def ingredient_ids(names, ingredient_model=Ingredient):
+    """Map normalized names to Ingredient ids, inserting any that are missing in one batch."""
+    names = set(names)
+    if not names:
+        return {}
+    ingredient_model.objects.bulk_create(
+        [ingredient_model(name=name) for name in names], ignore_conflicts=True, batch_size=BATCH_SIZE
+    )
+    ordered = sorted(names)
+    ids = {}
+    for start in range(0, len(ordered), BATCH_SIZE):
+        chunk = ordered[start:start + BATCH_SIZE]
+        ids.update(ingredient_model.objects.filter(name__in=chunk).values_list('name', 'id'))
+    return ids
+
+
+def build_recipe_ingredients(recipes, ingredient_model=Ingredient, link_model=RecipeIngredient):
+    """Unsaved link rows for ``recipes``, creating the Ingredient rows they reference."""
+    parsed = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    ids = ingredient_ids(
+        (name for rows in parsed.values() for _, name, _, _ in rows), ingredient_model
+    )
+    return [
+        link_model(
+            recipe_id=recipe_id, ingredient_id=ids[name], quantity=quantity,
+            unit=unit, raw_text=raw_text, position=position,
+        )
+        for recipe_id, rows in parsed.items()
+        for position, (raw_text, name, quantity, unit) in enumerate(rows)
+    ]
+
+
+def sync_recipe_ingredients(recipes):
+    """Replace the structured ingredient rows of ``recipes`` from their text."""
+    recipes = list(recipes)
+    RecipeIngredient.objects.filter(recipe__in=[recipe.pk for recipe in recipes]).delete()
+    RecipeIngredient.objects.bulk_create(build_recipe_ingredients(recipes), batch_size=BATCH_SIZE)
+
+
+def recipe_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'ingredients' not in update_fields):
+        return
+    if not created and getattr(instance, '_stored_ingredients', None) == instance.ingredients:
+        return
+    sync_recipe_ingredients([instance])
+    instance._stored_ingredients = instance.ingredients
+
+
+def with_ingredient(queryset, name):
+    """Restrict a Recipe queryset to recipes that list ``name`` (indexed join, no duplicates)."""
+    matching = RecipeIngredient.objects.filter(ingredient__name=normalize_name(name)).values('recipe_id')
+    return queryset.filter(pk__in=matching)
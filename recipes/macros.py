@@ -0,0 +1,68 @@
+"""Macro range and energy-ratio filters for recipe listings.
+
+Each recipe stores the share of its energy that comes from protein, fat and carbs
+(``protein_pct``, ``fat_pct``, ``carbs_pct``, 0-100). Energy is 4 kcal per gram of
+protein or carbs and 9 per gram of fat. ``Recipe.save`` and the bulk writers compute the
+shares, so "protein >= 30% of energy" is a plain indexed range predicate instead of
+arithmetic over every row.
+"""
+import math
+
+from django.db.models import Q
+
+from .pagination import DEFAULT_KEYS
+
+# Query parameter prefix: model field. Each accepts <prefix>_min and <prefix>_max.
+RANGE_FIELDS = {
+    'calories': 'calories',
+    'protein': 'protein',
+    'fat': 'fat',
+    'carbs': 'carbs',
+    'protein_pct': 'protein_pct',
+    'fat_pct': 'fat_pct',
+    'carbs_pct': 'carbs_pct',
+}
+
+FILTER_FIELDS = ['id', 'title', 'description', 'calories', 'protein', 'fat', 'carbs',
+                 'protein_pct', 'fat_pct', 'carbs_pct', 'dietary_type', 'avg_rating', 'created_at']
+
+SORTS = {
+    'newest': DEFAULT_KEYS,
+    'calories': ('calories', 'id'),
+    'protein': ('-protein_pct', '-id'),
+    'carbs': ('carbs_pct', 'id'),
+}
+
+ENERGY_PER_GRAM = {'protein': 4, 'fat': 9, 'carbs': 4}
+
+
+def energy_shares(protein, fat, carbs):
+    """``(protein_pct, fat_pct, carbs_pct)`` of the energy in the given grams, 0 when there is none."""
+    energy = {
+        'protein': protein * ENERGY_PER_GRAM['protein'],
+        'fat': fat * ENERGY_PER_GRAM['fat'],
+        'carbs': carbs * ENERGY_PER_GRAM['carbs'],
+    }
+    total = sum(energy.values())
+    if not total:
+        return 0.0, 0.0, 0.0
+    return tuple(round(100 * energy[macro] / total, 1) for macro in ('protein', 'fat', 'carbs'))
+
+
+def macro_ranges(params):
+    """``Q`` of the ``<field>_min``/``<field>_max`` bounds in ``params``; raises ValueError on bad numbers."""
+    condition = Q()
+    for prefix, field in RANGE_FIELDS.items():
+        for suffix, lookup in (('min', 'gte'), ('max', 'lte')):
+            raw = params.get(f'{prefix}_{suffix}', '').strip()
+            if not raw:
+                continue
+            try:
+                value = float(raw)
+            except ValueError:
+                value = None
+            # float() also accepts 'nan' and 'inf', which no database column can compare with
+            if value is None or not math.isfinite(value):
+                raise ValueError(f'{prefix}_{suffix} must be a number')
+            condition &= Q(**{f'{field}__{lookup}': value})
+    return condition
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import RequestFactory
+
+from recipeapp.traffic import summarize
+from recipes import api_views, async_api_views
+from recipes.models import MealPlan, Recipe
+
+# URL name -> view function name, in api_views and async_api_views alike
+VIEWS = {
+    'api_favorites': 'api_favorite_recipes',
+    'api_recipe_details': 'api_recipe_details',
+    'api_user_stats': 'api_user_stats',
+    'api_search_recipes': 'api_search_recipes',
+    'api_meal_plan_nutrition': 'api_meal_plan_nutrition',
+}
+ROUTES = tuple(VIEWS)
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput and p50/p95 latency of the sync API views on a thread pool with the '
+            'async API views on one event loop, at the same concurrency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route and mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Threads (sync) or in-flight tasks (async)')
+        parser.add_argument('--route', action='append', dest='routes', choices=ROUTES,
+                            help='Only benchmark these routes')
+        parser.add_argument('--user', help='Username to make the requests as; defaults to the first user with recipes and a meal plan')
+        parser.add_argument('--query', default='chicken', help='Search term for api_search_recipes')
+
+    def handle(self, *args, **options):
+        user = self.pick_user(options['user'])
+        calls = self.build_calls(user, options['query'], options['routes'] or ROUTES)
+        factory = RequestFactory()
+        requests = []
+        for _ in range(options['requests']):
+            for name, path, kwargs in calls:
+                request = factory.get(path)
+                request.user = user
+                requests.append((name, request, kwargs))
+
+        self.stdout.write(f'{len(requests)} requests as {user.username}, concurrency {options["concurrency"]}')
+        self.stdout.write(f'{"mode":<6} {"url name":<26} {"n":>6} {"p50":>8} {"p95":>8} {"rps":>8}  statuses')
+        for mode, run in (('sync', self.run_sync), ('async', self.run_async)):
+            run(requests[:len(calls)], options['concurrency'])  # warm up caches and connections
+            started = time.perf_counter()
+            results = run(requests, options['concurrency'])
+            report = summarize(results, time.perf_counter() - started)
+            for name, stats in [*report['routes'].items(), ('TOTAL', report['total'])]:
+                self.stdout.write(
+                    f'{mode:<6} {name:<26} {stats["requests"]:>6} {stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                    f'{stats["throughput_rps"]:>8.1f}  {stats["statuses"]}'
+                )
+
+    def pick_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {username!r}')
+        user = User.objects.filter(recipes__isnull=False, meal_plans__isnull=False).order_by('id').first()
+        if user is None:
+            raise CommandError('No user with recipes and a meal plan; run generate_dataset first')
+        return user
+
+    def build_calls(self, user, query, routes):
+        recipe = Recipe.objects.filter(is_shared=True).order_by('-review_count').first()
+        meal_plan = MealPlan.objects.filter(user=user).order_by('id').first()
+        calls = {
+            'api_favorites': ('/api/favorites/', {}),
+            'api_recipe_details': (f'/api/recipes/{recipe.pk}/', {'recipe_id': recipe.pk}) if recipe else None,
+            'api_user_stats': ('/api/stats/', {}),
+            'api_search_recipes': (f'/api/search/?q={query}', {}),
+            'api_meal_plan_nutrition': (
+                (f'/api/meal-plans/{meal_plan.pk}/nutrition/', {'meal_plan_id': meal_plan.pk}) if meal_plan else None
+            ),
+        }
+        return [(name, *calls[name]) for name in routes if calls[name]]
+
+    def run_sync(self, requests, concurrency):
+        def call(item):
+            name, request, kwargs = item
+            started = time.perf_counter()
+            response = getattr(api_views, VIEWS[name])(request, **kwargs)
+            return name, response.status_code, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(call, requests))
+
+    def run_async(self, requests, concurrency):
+        async def call(semaphore, item):
+            name, request, kwargs = item
+            async with semaphore:
+                started = time.perf_counter()
+                response = await getattr(async_api_views, VIEWS[name])(request, **kwargs)
+                return name, response.status_code, time.perf_counter() - started
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(call(semaphore, item) for item in requests))
+
+        return asyncio.run(main())
+
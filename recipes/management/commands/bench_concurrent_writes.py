@@ -0,0 +1,96 @@
+import json
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.client import RequestFactory
+
+from recipeapp.sqlite import current_pragmas
+from recipeapp.traffic import percentile
+from recipes import api_views
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Hammer the database with concurrent favorite toggles and review upserts (plus optional '
+            'reads) from several threads, and report write throughput and "database is locked" '
+            'failures under the active SQLITE_PROFILE. It writes real rows: run it on a copy.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10.0, help='How long each thread keeps going')
+        parser.add_argument('--read-ratio', type=float, default=0.5, help='Share of operations that are reads')
+        parser.add_argument('--recipes', type=int, default=50, help='Size of the pool of hot recipes written to')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(is_active=True, is_staff=False).order_by('id')[:options['threads']])
+        recipe_ids = list(
+            Recipe.objects.filter(is_shared=True).order_by('id').values_list('id', flat=True)[:options['recipes']]
+        )
+        if len(users) < options['threads'] or not recipe_ids:
+            raise CommandError(f'Need {options["threads"]} users and some shared recipes; run generate_dataset first')
+
+        self.stdout.write(f'vendor {connection.vendor}, pragmas {current_pragmas(connection)}')
+        connection.close()
+
+        results = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+        threads = [
+            threading.Thread(target=self.worker, args=(
+                user, recipe_ids, options['read_ratio'], random.Random(options['seed'] + n), deadline, results, lock,
+            ))
+            for n, user in enumerate(users)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        self.stdout.write(f'{"kind":<6} {"ok":>7} {"locked":>7} {"errors":>7} {"ops/s":>8} {"p50":>8} {"p95":>8}')
+        for kind in ('write', 'read'):
+            rows = [row for row in results if row[0] == kind]
+            timings = sorted(seconds * 1000 for _, outcome, seconds in rows if outcome == 'ok')
+            counts = {outcome: sum(1 for _, o, _ in rows if o == outcome) for outcome in ('ok', 'locked', 'error')}
+            self.stdout.write(
+                f'{kind:<6} {counts["ok"]:>7} {counts["locked"]:>7} {counts["error"]:>7} {counts["ok"] / wall:>8.1f} '
+                f'{percentile(timings, 50):>8.1f} {percentile(timings, 95):>8.1f}'
+            )
+
+    def worker(self, user, recipe_ids, read_ratio, rng, deadline, results, lock):
+        factory = RequestFactory()
+        rows = []
+        try:
+            while time.perf_counter() < deadline:
+                recipe_id = rng.choice(recipe_ids)
+                if rng.random() < read_ratio:
+                    kind, view, request, kwargs = 'read', api_views.api_favorite_recipes, factory.get('/api/favorites/'), {}
+                elif rng.random() < 0.5:
+                    kind, view, kwargs = 'write', api_views.api_toggle_favorite, {'recipe_id': recipe_id}
+                    request = factory.post(f'/api/recipes/{recipe_id}/favorite/')
+                else:
+                    kind, view, kwargs = 'write', api_views.api_add_review, {'recipe_id': recipe_id}
+                    body = json.dumps({'rating': rng.randint(1, 5), 'comment': 'benchmark'})
+                    request = factory.post(f'/api/recipes/{recipe_id}/review/', body, content_type='application/json')
+                request.user = user
+                started = time.perf_counter()
+                try:
+                    response = view(request, **kwargs)
+                    # api_add_review reports database errors as a 400 with the message
+                    if response.status_code < 400:
+                        outcome = 'ok'
+                    else:
+                        outcome = 'locked' if b'locked' in response.content else 'error'
+                except OperationalError as e:
+                    outcome = 'locked' if 'locked' in str(e) else 'error'
+                rows.append((kind, outcome, time.perf_counter() - started))
+        finally:
+            connection.close()
+            with lock:
+                results.extend(rows)
@@ -0,0 +1,92 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipes.meal_planner import MEAL_TYPES, TARGETS, generate_plan, load_candidates, plan_dates, plan_meals
+from recipes.models import DietaryPreference
+
+
+def tile_candidates(candidates, times):
+    """``candidates`` repeated ``times`` over, with fresh ids, to time planning over a bigger library."""
+    if times <= 1:
+        return candidates
+    tiled = {name: np.concatenate([array] * times) for name, array in candidates.items()}
+    offset = int(candidates['ids'].max(initial=0))
+    tiled['ids'] = np.concatenate([candidates['ids'] + offset * copy for copy in range(times)])
+    return tiled
+
+
+class Command(BaseCommand):
+    help = ('Time meal plan generation (candidate query, NumPy search, bulk write) for sample users '
+            'and report how far each planned day lands from its targets (writes rolled back)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5, help='Sample users, those with dietary preferences first')
+        parser.add_argument('--days', type=int, default=28)
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Repeat each candidate library this many times for the search timing')
+        parser.add_argument('--calories', type=float, default=2000)
+        parser.add_argument('--protein', type=float, default=120)
+        parser.add_argument('--fat', type=float, default=70)
+        parser.add_argument('--carbs', type=float, default=220)
+
+    def handle(self, *args, **options):
+        targets = {name: options[name] for name in TARGETS}
+        preferences = DietaryPreference.objects.in_bulk(
+            list(DietaryPreference.objects.values_list('user_id', flat=True)[:options['users']]), field_name='user_id',
+        )
+        users = list(User.objects.filter(pk__in=preferences)) or list(User.objects.order_by('id')[:options['users']])
+        if not users:
+            raise CommandError('No users; run generate_dataset first')
+        start = date.today()
+        end = start + timedelta(days=options['days'] - 1)
+        dates = plan_dates(start, end)
+
+        loads, searches, totals, misses = [], [], [], []
+        for user in users:
+            preference = preferences.get(user.id)
+            started = time.perf_counter()
+            candidates = load_candidates(user, preference)
+            loads.append((time.perf_counter() - started) * 1000)
+            if not candidates['ids'].size:
+                continue
+            candidates = tile_candidates(candidates, options['scale'])
+            started = time.perf_counter()
+            plan = plan_meals(candidates, dates, MEAL_TYPES, targets, low_carb=preference is not None and preference.low_carb)
+            searches.append((time.perf_counter() - started) * 1000)
+            misses.append(self.daily_miss(candidates, plan, targets))
+
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    generate_plan(user, 'Bench plan', start, end, MEAL_TYPES, targets, preference)
+                    totals.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{len(users)} users, {len(dates)} days x {len(MEAL_TYPES)} meals, '
+            f"{len(candidates['ids'])} candidates in the last search"
+        )
+        self.stdout.write(f'  candidate query  median {statistics.median(loads):7.1f} ms')
+        self.stdout.write(f'  search           median {statistics.median(searches):7.1f} ms, max {max(searches):.1f} ms')
+        # generate_plan always runs over the real library, whatever --scale is
+        self.stdout.write(f'  generate_plan    median {statistics.median(totals):7.1f} ms, {len(captured)} queries')
+        miss = np.mean(misses, axis=0)
+        self.stdout.write('  mean daily miss  ' + ', '.join(f'{name} {value:.1%}' for name, value in zip(TARGETS, miss)))
+
+    def daily_miss(self, candidates, plan, targets):
+        """Mean absolute relative miss of each target over the planned days."""
+        order = np.argsort(candidates['ids'])
+        rows = order[np.searchsorted(candidates['ids'], [recipe_id for _, _, recipe_id in plan], sorter=order)]
+        days = {}
+        for (meal_date, _, _), row in zip(plan, rows):
+            days.setdefault(meal_date, []).append(row)
+        daily = np.array([targets[name] for name in TARGETS], dtype=np.float32)
+        sums = np.array([candidates['macros'][day_rows].sum(axis=0) for day_rows in days.values()])
+        return np.abs(sums - daily).mean(axis=0) / daily
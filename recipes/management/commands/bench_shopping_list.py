@@ -0,0 +1,56 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipes.ingredients import sync_recipe_ingredients
+from recipes.models import MealPlan, MealPlanItem, Recipe
+from recipes.shopping import generate_shopping_list
+
+MEAL_TYPES = [meal_type for meal_type, _ in MealPlanItem.MEAL_TYPES]
+
+INGREDIENTS = '2 cups rice\n1 tbsp ghee\n200 g paneer\n1 onion\n3 cloves garlic\nSalt\n1/2 tsp turmeric'
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and time for shopping list generation across meal plan sizes (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', nargs='+', type=int, default=[1, 7, 28])
+
+    def handle(self, *args, **options):
+        for days in options['days']:
+            with transaction.atomic():
+                queries, elapsed, items = self.measure(days)
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{days * len(MEAL_TYPES):>4} meals: {queries} queries, {elapsed * 1000:.1f} ms, {items} list items'
+            )
+
+    def measure(self, days):
+        user = User.objects.create(username=f'bench-shopping-{days}')
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Bench recipe {i}', description='', ingredients=INGREDIENTS,
+                   instructions='', calories=400, protein=20, fat=10, carbs=50)
+            for i in range(10)
+        ])
+        # bulk_create skips post_save, so build the structured rows explicitly
+        sync_recipe_ingredients(recipes)
+
+        meal_plan = MealPlan.objects.create(user=user, name='Bench plan')
+        start = date.today()
+        MealPlanItem.objects.bulk_create([
+            MealPlanItem(meal_plan=meal_plan, recipe=recipes[(day * 4 + n) % len(recipes)],
+                         meal_date=start + timedelta(days=day), meal_type=meal_type)
+            for day in range(days)
+            for n, meal_type in enumerate(MEAL_TYPES)
+        ])
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            shopping_list = generate_shopping_list(meal_plan)
+            elapsed = time.perf_counter() - started
+        return len(captured), elapsed, shopping_list.items.count()
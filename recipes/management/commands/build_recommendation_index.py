@@ -0,0 +1,71 @@
+import statistics
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import DietaryPreference, FavoriteRecipe, RecipeReview
+from recipes.recommendations import build_index, rank, recommendation_settings, save_index, user_history
+
+
+def tile_index(index, times):
+    """``index`` repeated ``times`` over, with fresh ids, to time scoring on a bigger catalogue."""
+    if times <= 1:
+        return index
+    count = len(index['ids'])
+    tiled = {name: np.tile(array, times) if array.ndim == 1 else np.tile(array, (times, 1))
+             for name, array in index.items() if name not in ('link_rows', 'link_ingredients')}
+    offset = int(index['ids'].max(initial=0))
+    tiled['ids'] = np.concatenate([index['ids'] + offset * copy for copy in range(times)])
+    tiled['link_rows'] = np.concatenate([index['link_rows'] + count * copy for copy in range(times)])
+    tiled['link_ingredients'] = np.tile(index['link_ingredients'], times)
+    return tiled
+
+
+class Command(BaseCommand):
+    help = ('Build the recommendation feature index from shared recipes and write it to '
+            "RECOMMENDATIONS['INDEX_PATH']; web processes pick it up within RELOAD_SECONDS. "
+            'Run it after bulk imports and periodically (e.g. hourly) to fold in new recipes. '
+            '--bench times top-K scoring for sample users instead of only building.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Defaults to RECOMMENDATIONS['INDEX_PATH']")
+        parser.add_argument('--bench', type=int, default=0, metavar='USERS',
+                            help='Time scoring for this many users with favorites or reviews')
+        parser.add_argument('--scale', type=int, default=1,
+                            help='With --bench, repeat the catalogue this many times (e.g. 5 for 100k -> 500k)')
+        parser.add_argument('--k', type=int, default=10)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = build_index()
+        built = time.perf_counter() - started
+        path = options['path'] or recommendation_settings()['INDEX_PATH']
+        save_index(index, path)
+        size = sum(array.nbytes for array in index.values()) / 2 ** 20
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index['ids'])} shared recipes ({size:.1f} MiB) in {built:.2f}s to {path}"
+        ))
+        if options['bench']:
+            self.bench(tile_index(index, options['scale']), options['bench'], options['k'])
+
+    def bench(self, index, users, k):
+        active = set(FavoriteRecipe.objects.values_list('user_id', flat=True).distinct()[:users])
+        active.update(RecipeReview.objects.values_list('reviewer_id', flat=True).distinct()[:users - len(active)])
+        if not active:
+            raise CommandError('No users with favorites or reviews; run generate_dataset first')
+        preferences = DietaryPreference.objects.in_bulk(list(active), field_name='user_id')
+        timings = []
+        for user in User.objects.filter(pk__in=active):
+            history = user_history(user)
+            # Time the in-memory part only: masks, taste vector and top-K over the whole catalogue
+            started = time.perf_counter()
+            rank(index, user.id, preferences.get(user.id), history, k)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"Scored {len(index['ids'])} recipes for {len(timings)} users: "
+            f'median {statistics.median(timings):.1f} ms, p95 {timings[int(len(timings) * 0.95)]:.1f} ms, '
+            f'max {timings[-1]:.1f} ms'
+        )
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.allergens import reclassify_allergens
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Recompute the allergen bitmask of every recipe from its ingredients, in batches. '
+            'Run it after changing the keyword lists in recipes/allergens.py.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changed = reclassify_allergens(Recipe.objects.all(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Reclassified allergens of {changed} recipe(s) in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.transfer import FORMATS, detect_format, export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream recipes to a JSONL or CSV file in the format import_recipes reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or '-' for stdout")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension, else jsonl')
+        parser.add_argument('--user', action='append', dest='users', help='Only recipes of these usernames')
+        parser.add_argument('--shared-only', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        recipes = Recipe.objects.all()
+        if options['users']:
+            recipes = recipes.filter(user__username__in=options['users'])
+        if options['shared_only']:
+            recipes = recipes.filter(is_shared=True)
+
+        rows = export_rows(recipes, chunk_size=options['chunk_size'])
+        if path == '-':
+            write_rows(rows, sys.stdout, fmt)
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as out:
+            count = write_rows(rows, out, fmt)
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} recipes to {path}'))
@@ -0,0 +1,49 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.transfer import FORMATS, detect_format, import_recipes, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import recipes from a JSONL or CSV file (one recipe per line/row), deduplicated on (user, title)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension, else jsonl')
+        parser.add_argument('--user', help='Owner for rows without a username column')
+        parser.add_argument('--on-duplicate', choices=['skip', 'update'], default='skip',
+                            help='What to do with rows whose (user, title) already exists')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid rows to print')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        started = time.perf_counter()
+
+        def progress(result):
+            self.stdout.write(f'[{time.perf_counter() - started:7.1f}s] {result.created} created, '
+                              f'{result.updated} updated, {result.skipped} skipped, {len(result.errors)} invalid')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            result = import_recipes(
+                read_rows(stream, fmt), default_username=options['user'], on_duplicate=options['on_duplicate'],
+                batch_size=options['batch_size'], progress=progress,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        for number, message in result.errors[:options['max_errors']]:
+            self.stderr.write(f'line {number}: {message}')
+        written = result.created + result.updated
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} created, {result.updated} updated, {result.skipped} skipped in {elapsed:.1f}s '
+            f'({written / elapsed:.0f} recipes/s)'
+        ))
+        if result.errors:
+            raise CommandError(f'{len(result.errors)} invalid row(s) were not imported')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to rebuild the index on')
+
+    def handle(self, *args, **options):
+        if rebuild_index(options['database']):
+            self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
+        else:
+            self.stdout.write('Full-text index is only used on SQLite; nothing to rebuild.')
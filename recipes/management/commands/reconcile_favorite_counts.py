@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import reconcile_favorite_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored favorite count on each recipe from the favorites table'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_favorite_counts()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled favorite counts for {fixed} recipe(s).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ratings import reconcile_rating_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored recipe rating aggregates from the reviews table'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_rating_stats()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled rating stats for {fixed} recipe(s).'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = ('Recompute the time-decayed trending score of recipes favorited or reviewed recently. '
+            'Run it periodically, e.g. every ten minutes from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=7, help='Only count activity this recent')
+        parser.add_argument('--half-life-hours', type=float, default=48,
+                            help='Age at which a favorite or review counts half')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        scored, cleared = refresh_trending_scores(options['window_days'], options['half_life_hours'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} recipes and cleared {cleared} in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,84 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipeapp.traffic import build_environs, load_recording, login_cookies, replay, summarize
+
+
+class Command(BaseCommand):
+    help = ('Replay a recorded traffic file against the WSGI application in-process and report '
+            'p50/p95/p99 latency and throughput per URL name')
+
+    def add_arguments(self, parser):
+        parser.add_argument('recording', help='JSONL file written by TrafficRecorderMiddleware')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (forked)')
+        parser.add_argument('--loops', type=int, default=1, help='Replay the recording this many times')
+        parser.add_argument('--warmup', type=int, default=0, help='Requests replayed first and not measured')
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--output', help='Write the JSON report here')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare p95 latency against')
+        parser.add_argument('--max-regression', type=float, default=20.0,
+                            help='Fail when a route p95 grows by more than this percent over the baseline')
+
+    def handle(self, *args, **options):
+        entries = load_recording(options['recording']) * options['loops']
+        if not entries:
+            raise CommandError('The recording is empty')
+
+        buckets = {entry['user'] for entry in entries} - {'anonymous'}
+        cookies = login_cookies(self.bucket_users(buckets))
+        if options['warmup']:
+            replay(build_environs(entries[:options['warmup']], cookies, host=options['host']), threads=options['threads'])
+        environs = build_environs(entries, cookies, host=options['host'])
+
+        results, wall_seconds = replay(environs, threads=options['threads'], processes=options['processes'])
+        report = {
+            'recording': options['recording'],
+            'threads': options['threads'],
+            'processes': options['processes'],
+            'wall_seconds': round(wall_seconds, 3),
+            **summarize(results, wall_seconds),
+        }
+
+        self.stdout.write(f'{"url name":<28} {"n":>6} {"p50":>8} {"p95":>8} {"p99":>8} {"rps":>8}  statuses')
+        for name, stats in [*report['routes'].items(), ('TOTAL', report['total'])]:
+            self.stdout.write(
+                f'{name:<28} {stats["requests"]:>6} {stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                f'{stats["p99_ms"]:>8.1f} {stats["throughput_rps"]:>8.1f}  {stats["statuses"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Report written to {options["output"]}')
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['max_regression'])
+
+    def bucket_users(self, buckets):
+        """Map each recorded user bucket to an existing user of the replay database."""
+        members = list(User.objects.filter(is_active=True, is_staff=False).order_by('id')[:max(len(buckets), 1)])
+        staff = User.objects.filter(is_active=True, is_staff=True).order_by('id').first()
+        users = {}
+        for n, bucket in enumerate(sorted(buckets)):
+            if bucket == 'staff':
+                if staff:
+                    users[bucket] = staff
+            elif members:
+                users[bucket] = members[n % len(members)]
+        return users
+
+    def compare(self, report, baseline_path, max_regression):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = []
+        for name, stats in report['routes'].items():
+            before = baseline.get('routes', {}).get(name)
+            if not before or not before['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            self.stdout.write(f'{name:<28} p95 {before["p95_ms"]:>8.1f} -> {stats["p95_ms"]:>8.1f} ms ({change:+.0f}%)')
+            if change > max_regression:
+                regressions.append(f'{name}: p95 {before["p95_ms"]} -> {stats["p95_ms"]} ms ({change:+.0f}%)')
+        if regressions:
+            raise CommandError('p95 regressions over baseline:\n' + '\n'.join(regressions))
@@ -0,0 +1,142 @@
+"""Automatic meal plans that hit daily calorie and macro targets, searched with NumPy.
+
+Candidates are the user's own recipes plus every shared recipe their
+``DietaryPreference`` allows, loaded in one query into a ``(recipes, 4)`` float32
+matrix of calories, protein, fat and carbs. Each meal type gets a share of the daily
+targets (``MEAL_SHARES``, renormalised over the meal types asked for).
+
+A day is planned in two vectorized passes, each step one matrix-vector product over
+every candidate:
+
+* greedy: meal by meal, pick the recipe whose macros bring the day closest to its
+  targets, assuming the meals not yet picked land exactly on their share;
+* refinement: ``REFINE_SWEEPS`` rounds of re-picking each meal against the actual
+  other meals of the day (coordinate descent on the day's error).
+
+The day's error is the squared relative miss of each target that was set, plus a
+smaller term for each meal straying from its share of calories, so a day does not
+balance a 900 kcal snack with a 100 kcal dinner. A recipe used in the last
+``REPEAT_DAYS`` days (or already that day) costs ``REPEAT_PENALTY``, which leaves
+repeats for libraries too small to avoid them, and each earlier use in the plan costs
+``REUSE_PENALTY``, so a four-week plan does not cycle through the same week.
+Well-rated recipes and the user's own get a small bonus, and a low-carb preference
+penalises the share of energy from carbs.
+The whole plan is written with one ``bulk_create``.
+"""
+import datetime
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .allergens import exclude_unsafe
+from .models import MealPlan, MealPlanItem, Recipe
+
+MEAL_TYPES = [code for code, _ in MealPlanItem.MEAL_TYPES]
+MEAL_SHARES = {'breakfast': 0.25, 'lunch': 0.35, 'dinner': 0.3, 'snack': 0.1}
+TARGETS = ['calories', 'protein', 'fat', 'carbs']
+
+MAX_DAYS = 56
+REFINE_SWEEPS = 2
+REPEAT_DAYS = 7
+REPEAT_PENALTY = 10.0
+REUSE_PENALTY = 0.05
+SLOT_WEIGHT = 0.25          # weight of each meal's own calorie miss next to the day's
+RATING_BONUS, OWN_BONUS, LOW_CARB_WEIGHT = 0.01, 0.01, 0.1
+
+
+def load_candidates(user, preference=None):
+    """Arrays of the recipes ``user`` may be planned: ``ids``, ``macros``, ``bonus`` and ``carb_share``."""
+    recipes = Recipe.objects.filter(Q(user=user) | Q(is_shared=True), calories__gt=0)
+    if preference is not None and preference.vegan:
+        recipes = recipes.filter(dietary_type='vegan')
+    elif preference is not None and preference.vegetarian:
+        recipes = recipes.filter(dietary_type__in=['vegan', 'vegetarian'])
+    rows = exclude_unsafe(recipes, preference).order_by().values_list(
+        'id', 'calories', 'protein', 'fat', 'carbs', 'avg_rating', 'user_id', 'carbs_pct',
+    )
+    columns = list(zip(*rows.iterator(chunk_size=10000))) or [()] * 8
+    ratings = np.array([rating or 0.0 for rating in columns[5]], dtype=np.float32)
+    own = np.array(columns[6], dtype=np.int64) == user.id
+    return {
+        'ids': np.array(columns[0], dtype=np.int64),
+        'macros': np.array(columns[1:5], dtype=np.float32).T.reshape(-1, 4),
+        'bonus': RATING_BONUS * ratings / 5 + OWN_BONUS * own,
+        'carb_share': np.array(columns[7], dtype=np.float32) / 100,
+    }
+
+
+def plan_meals(candidates, dates, meal_types, targets, low_carb=False):
+    """``[(date, meal_type, recipe_id)]`` for every date and meal type.
+
+    ``targets`` maps ``TARGETS`` names to daily amounts; calories is required and
+    macros left out (or None) are not aimed at.
+    """
+    if not candidates['ids'].size:
+        raise ValueError('No recipes match your dietary preferences')
+    meal_types = [meal for meal in MEAL_TYPES if meal in meal_types]
+    if not meal_types:
+        raise ValueError('Pick at least one meal type')
+    daily = np.array([targets.get(name) or 0 for name in TARGETS], dtype=np.float32)
+    weights = (daily > 0).astype(np.float32)
+    if not weights[0]:
+        raise ValueError('A daily calorie target is required')
+    daily[daily == 0] = 1
+
+    # Macros in units of the daily target: the day's error for a candidate completing it is
+    # sum(w * (scaled + others - 1) ** 2) = squares - 2 * scaled @ (w * (1 - others)) + constant
+    scaled = candidates['macros'] / daily
+    squares = (scaled ** 2) @ weights
+    total_share = sum(MEAL_SHARES[meal] for meal in meal_types)
+    shares = np.array([MEAL_SHARES[meal] / total_share for meal in meal_types], dtype=np.float32)
+    static = -candidates['bonus']
+    if low_carb:
+        static = static + LOW_CARB_WEIGHT * candidates['carb_share']
+    # Per-meal fixed cost: the meal's own calorie miss plus the bonuses
+    slot_costs = [SLOT_WEIGHT * ((scaled[:, 0] - share) / share) ** 2 + static for share in shares]
+
+    last_used = np.full(len(candidates['ids']), -REPEAT_DAYS, dtype=np.int32)
+    uses = np.zeros(len(candidates['ids']), dtype=np.float32)
+    plan = []
+    for day, date in enumerate(dates):
+        repeats = np.where(day - last_used < REPEAT_DAYS, REPEAT_PENALTY, REUSE_PENALTY * uses).astype(np.float32)
+        picks = [None] * len(meal_types)
+
+        def best(slot):
+            others = sum((scaled[pick] if pick is not None else shares[i] * np.ones(4, np.float32))
+                         for i, pick in enumerate(picks) if i != slot)
+            cost = squares - 2 * (scaled @ (weights * (1 - others))) + slot_costs[slot] + repeats
+            for i, pick in enumerate(picks):
+                if i != slot and pick is not None:
+                    cost[pick] += REPEAT_PENALTY
+            return int(np.argmin(cost))
+
+        for slot in range(len(meal_types)):
+            picks[slot] = best(slot)
+        for _ in range(REFINE_SWEEPS):
+            for slot in range(len(meal_types)):
+                picks[slot] = best(slot)
+        last_used[picks] = day
+        uses[picks] += 1
+        plan.extend((date, meal, int(candidates['ids'][pick])) for meal, pick in zip(meal_types, picks))
+    return plan
+
+
+def plan_dates(start, end):
+    return [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def generate_plan(user, name, start, end, meal_types, targets, preference=None):
+    """Create a MealPlan for ``user`` from ``start`` to ``end`` inclusive; raises ValueError when nothing fits."""
+    if end < start or (end - start).days >= MAX_DAYS:
+        raise ValueError(f'A generated plan covers 1 to {MAX_DAYS} days')
+    candidates = load_candidates(user, preference)
+    plan = plan_meals(candidates, plan_dates(start, end), meal_types, targets,
+                      low_carb=preference is not None and preference.low_carb)
+    with transaction.atomic():
+        meal_plan = MealPlan.objects.create(user=user, name=name)
+        MealPlanItem.objects.bulk_create([
+            MealPlanItem(meal_plan=meal_plan, recipe_id=recipe_id, meal_date=date, meal_type=meal)
+            for date, meal, recipe_id in plan
+        ])
+    return meal_plan
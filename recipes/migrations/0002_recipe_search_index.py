@@ -0,0 +1,68 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_SQL = [
+    """CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(
+        title, description, ingredients,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rank) VALUES('rank', 'bm25(10.0, 4.0, 2.0)')",
+    """CREATE TRIGGER recipes_recipe_fts_ai AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END""",
+    """CREATE TRIGGER recipes_recipe_fts_ad AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+    END""",
+    """CREATE TRIGGER recipes_recipe_fts_au AFTER UPDATE OF title, description, ingredients ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+        INSERT INTO recipes_recipe_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END""",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_au",
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_ad",
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_ai",
+    "DROP TABLE IF EXISTS recipes_recipe_fts",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends use the icontains fallback in recipes.search
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchIndex',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='recipes.recipe')),
+                ('document', models.TextField(db_column='recipes_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_statements(FTS_SQL), run_statements(DROP_SQL)),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeReview = apps.get_model('recipes', 'RecipeReview')
+    reviews = RecipeReview.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    Recipe.objects.filter(reviews__isnull=False).update(
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), Value(0)),
+        review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), Value(0)),
+        avg_rating=Subquery(reviews.annotate(avg=Avg('rating')).values('avg'), output_field=FloatField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='avg_rating',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriterecipe',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealplan',
+            index=models.Index(fields=['user', '-created_at'], name='mealplan_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='recipe_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'dietary_type', '-created_at', '-id'], name='recipe_user_diet_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['-created_at', '-id'], name='recipe_shared_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['dietary_type', '-created_at', '-id'], name='recipe_shared_diet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['-avg_rating', '-created_at', '-id'], name='recipe_shared_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipereview',
+            index=models.Index(fields=['recipe', '-created_at'], name='review_recipe_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', '-created_at'], name='shoplist_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,166 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# A frozen copy of the ingredient parser in recipes/ingredients.py as of this migration,
+# so later changes to the live parser do not change what this backfill produced.
+UNIT_ALIASES = {
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'g': 'g', 'gm': 'g', 'gms': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kgs': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'l': 'l', 'litre': 'l', 'litres': 'l', 'liter': 'l', 'liters': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'pinch': 'pinch', 'pinches': 'pinch',
+    'clove': 'clove', 'cloves': 'clove',
+    'piece': 'piece', 'pieces': 'piece', 'pc': 'piece', 'pcs': 'piece',
+    'can': 'can', 'cans': 'can', 'tin': 'can', 'tins': 'can',
+    'jar': 'jar', 'jars': 'jar',
+    'packet': 'packet', 'packets': 'packet', 'pack': 'packet', 'packs': 'packet',
+    'bunch': 'bunch', 'bunches': 'bunch',
+    'sprig': 'sprig', 'sprigs': 'sprig',
+    'handful': 'handful', 'handfuls': 'handful',
+    'slice': 'slice', 'slices': 'slice',
+    'stick': 'stick', 'sticks': 'stick',
+}
+
+# Leading words that describe the size of an item rather than name it
+SIZE_WORDS = {'large', 'medium', 'small', 'big', 'jumbo', 'extra-large', 'medium-sized', 'heaped', 'heaping',
+              'level', 'generous'}
+
+# Plurals the suffix rules in singular() get wrong, and words that only look plural
+IRREGULAR_PLURALS = {'leaves': 'leaf', 'halves': 'half', 'loaves': 'loaf', 'chillies': 'chilli',
+                     'chilies': 'chili', 'cookies': 'cookie'}
+NOT_PLURAL = {'hummus', 'couscous', 'asparagus', 'molasses', 'swiss', 'citrus'}
+
+UNICODE_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+NUMBER = r'\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?'
+QUANTITY_RE = re.compile(rf'^({NUMBER})(?:\s*(?:-|–|\bto\b)\s*({NUMBER}))?\s*')
+UNIT_RE = re.compile(r'^([a-zA-Z]+)\.?\s+(?:of\s+)?')
+PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+LEADING_PARENTHETICAL_RE = re.compile(r'^\([^)]*\)\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def parse_quantity(text):
+    total = Decimal(0)
+    try:
+        for part in text.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += Decimal(numerator) / Decimal(denominator)
+            else:
+                total += Decimal(part)
+    except (InvalidOperation, ZeroDivisionError):
+        return None
+    return total.quantize(Decimal('0.001'))
+
+
+def singular(word):
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in NOT_PLURAL or len(word) < 4 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize_name(text):
+    text = PARENTHETICAL_RE.sub(' ', text)
+    text = text.split(',')[0]
+    words = WHITESPACE_RE.sub(' ', text).strip(' .-*').lower().split(' ')
+    while len(words) > 1 and words[0] in SIZE_WORDS:
+        words = words[1:]
+    words[-1] = singular(words[-1])
+    return ' '.join(words)
+
+
+def parse_ingredient(line):
+    text = line.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    text = text.strip()
+
+    quantity = None
+    unit = ''
+    match = QUANTITY_RE.match(text)
+    if match:
+        # A range ("2-3 cloves") keeps its upper bound, so shopping lists buy enough
+        quantity = parse_quantity(match.group(2) or match.group(1))
+        text = LEADING_PARENTHETICAL_RE.sub('', text[match.end():])
+        unit_match = UNIT_RE.match(text)
+        if unit_match and unit_match.group(1).lower() in UNIT_ALIASES:
+            unit = UNIT_ALIASES[unit_match.group(1).lower()]
+            text = text[unit_match.end():]
+    return normalize_name(text), quantity, unit
+
+
+def parse_ingredients(text):
+    parsed = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        name, quantity, unit = parse_ingredient(line)
+        if name:
+            parsed.append((line[:255], name[:255], quantity, unit))
+    return parsed
+
+
+def build_links(recipes, Ingredient, RecipeIngredient):
+    parsed = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    names = sorted({name for rows in parsed.values() for _, name, _, _ in rows})
+    Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+    ids = {}
+    for start in range(0, len(names), BATCH_SIZE):
+        ids.update(Ingredient.objects.filter(name__in=names[start:start + BATCH_SIZE]).values_list('name', 'id'))
+    return [
+        RecipeIngredient(
+            recipe_id=recipe_id, ingredient_id=ids[name], quantity=quantity,
+            unit=unit, raw_text=raw_text, position=position,
+        )
+        for recipe_id, rows in parsed.items()
+        for position, (raw_text, name, quantity, unit) in enumerate(rows)
+    ]
+
+
+def backfill_recipe_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+
+    batch = []
+    for recipe in Recipe.objects.only('id', 'ingredients').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        batch.append(recipe)
+        if len(batch) == BATCH_SIZE:
+            RecipeIngredient.objects.bulk_create(build_links(batch, Ingredient, RecipeIngredient))
+            batch = []
+    if batch:
+        RecipeIngredient.objects.bulk_create(build_links(batch, Ingredient, RecipeIngredient))
+
+
+def clear_recipe_ingredients(apps, schema_editor):
+    apps.get_model('recipes', 'RecipeIngredient').objects.all().delete()
+    apps.get_model('recipes', 'Ingredient').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_recipe_ingredients, clear_recipe_ingredients),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_favorite_counts(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    favorites = FavoriteRecipe.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    Recipe.objects.filter(favorited_by__isnull=False).update(
+        favorite_count=Subquery(favorites.annotate(total=Count('id')).values('total')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_backfill_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='favoriterecipe',
+            index=models.Index(fields=['created_at'], name='favorite_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['-trending_score', '-id'], name='recipe_shared_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipereview',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        migrations.RunPython(backfill_favorite_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# A frozen copy of the keyword tables and classifier in recipes/allergens.py as of this
+# migration, so later keyword changes do not change what this backfill produced.
+# After a keyword change, the classify_allergens command reclassifies existing rows.
+ALLERGENS = {
+    'peanut': ('peanut', 'groundnut', 'moongphali'),
+    'tree_nut': ('nut', 'almond', 'cashew', 'walnut', 'pistachio', 'pecan', 'hazelnut', 'macadamia',
+                 'badam', 'kaju', 'pine nut', 'brazil nut'),
+    'dairy': ('milk', 'cream', 'butter', 'buttermilk', 'ghee', 'cheese', 'paneer', 'yogurt', 'yoghurt', 'curd',
+              'dahi', 'khoya', 'khoa', 'malai', 'whey', 'lassi', 'raita', 'casein'),
+    'gluten': ('wheat', 'flour', 'maida', 'atta', 'semolina', 'sooji', 'suji', 'rava', 'bread', 'breadcrumb',
+               'pasta', 'spaghetti', 'macaroni', 'noodle', 'barley', 'rye', 'couscous', 'seitan', 'naan', 'roti',
+               'chapati', 'paratha', 'bulgur', 'vermicelli', 'soy sauce'),
+    'egg': ('egg', 'mayonnaise', 'mayo', 'meringue'),
+    'soy': ('soy', 'soya', 'tofu', 'edamame', 'tempeh', 'miso'),
+    'fish': ('fish', 'salmon', 'tuna', 'cod', 'anchovy', 'anchovies', 'sardine', 'mackerel', 'tilapia', 'pomfret',
+             'rohu', 'hilsa', 'trout', 'basa'),
+    'shellfish': ('shellfish', 'shrimp', 'prawn', 'crab', 'lobster', 'oyster', 'mussel', 'clam', 'scallop', 'squid',
+                  'octopus', 'crayfish'),
+    'sesame': ('sesame', 'tahini', 'til', 'gingelly'),
+    'mustard': ('mustard', 'rai', 'sarson'),
+    'beef': ('beef', 'steak', 'veal'),
+    'pork': ('pork', 'bacon', 'ham', 'lard', 'prosciutto', 'pepperoni'),
+    'poultry': ('chicken', 'turkey', 'duck'),
+    'lamb': ('lamb', 'mutton', 'goat'),
+    'onion': ('onion', 'shallot', 'scallion', 'leek'),
+    'garlic': ('garlic',),
+    'mushroom': ('mushroom',),
+    'alcohol': ('wine', 'beer', 'rum', 'brandy', 'vodka', 'whisky', 'whiskey', 'sake', 'mirin'),
+    'gelatin': ('gelatin', 'gelatine'),
+}
+BITS = {name: 1 << position for position, name in enumerate(ALLERGENS)}
+
+NOT_ALLERGEN = {
+    'tree_nut': ('nutmeg', 'butternut', 'coconut', 'water chestnut'),
+    'dairy': ('coconut milk', 'coconut cream', 'almond milk', 'soy milk', 'soya milk', 'oat milk', 'rice milk',
+              'peanut butter', 'nut butter', 'almond butter', 'cocoa butter', 'cream of tartar',
+              'vegan butter', 'vegan cheese', 'dairy-free', 'dairy free'),
+    'gluten': ('rice flour', 'chickpea flour', 'gram flour', 'corn flour', 'almond flour', 'coconut flour',
+               'tapioca flour', 'rice noodle', 'rice pasta', 'gluten-free', 'gluten free'),
+    'egg': ('eggless', 'egg-free', 'egg free', 'vegan mayo', 'vegan mayonnaise'),
+    # Goat's milk products are dairy, not meat
+    'lamb': ('goat cheese', "goat's cheese", 'goats cheese', 'goat milk', "goat's milk", 'goats milk',
+             'goat yogurt', "goat's yogurt", 'goat yoghurt', "goat's yoghurt", 'goat butter', 'goat curd'),
+}
+
+
+def _pattern(words):
+    alternatives = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternatives})(?:e?s)?\b')
+
+
+PATTERNS = {name: _pattern(words) for name, words in ALLERGENS.items()}
+EXCEPTIONS = {name: _pattern(phrases) for name, phrases in NOT_ALLERGEN.items()}
+
+
+def classify_allergens(text):
+    text = (text or '').lower()
+    mask = 0
+    for name, pattern in PATTERNS.items():
+        exceptions = EXCEPTIONS.get(name)
+        if pattern.search(exceptions.sub(' ', text) if exceptions else text):
+            mask |= BITS[name]
+    return mask
+
+
+def backfill_allergens(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.only('id', 'ingredients').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        recipe.allergens = classify_allergens(recipe.ingredients)
+        if recipe.allergens:
+            batch.append(recipe)
+        if len(batch) == BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ['allergens'])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ['allergens'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_popularity'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_shared_recent_idx',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='allergens',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Backfill before indexing, so the index is built once instead of updated row by row
+        migrations.RunPython(backfill_allergens, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['-created_at', '-id', 'allergens'], name='recipe_shared_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+
+def backfill_macro_shares(apps, schema_editor):
+    # One UPDATE computing the same shares as recipes.macros.energy_shares
+    Recipe = apps.get_model('recipes', 'Recipe')
+    energy = F('protein') * 4 + F('fat') * 9 + F('carbs') * 4
+
+    def share(field, per_gram):
+        return Round(F(field) * (100.0 * per_gram) / energy, 1)
+
+    Recipe.objects.exclude(protein=0, fat=0, carbs=0).update(
+        protein_pct=share('protein', 4), fat_pct=share('fat', 9), carbs_pct=share('carbs', 4),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_allergens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='protein_pct',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fat_pct',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carbs_pct',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        # Backfill before indexing, so the indexes are built once instead of updated row by row
+        migrations.RunPython(backfill_macro_shares, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['calories', 'id'], name='recipe_shared_calories_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['dietary_type', 'calories', 'id'], name='recipe_shared_diet_cal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['-protein_pct', '-id'], name='recipe_shared_protein_pct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_shared', True)), fields=['carbs_pct', 'id'], name='recipe_shared_carbs_pct_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .allergens import classify_allergens
+from .macros import energy_shares
+
 class Recipe(models.Model):
     DIETARY_CHOICES = [
         ('none', 'None'),
@@ -21,14 +24,110 @@ class Recipe(models.Model):
     carbs = models.FloatField(validators=[MinValueValidator(0)])  # in grams
     dietary_type = models.CharField(max_length=20, choices=DIETARY_CHOICES, default='none')
     is_shared = models.BooleanField(default=False)
+    # Review aggregates, maintained by recipes.ratings on every RecipeReview write
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(null=True, blank=True, editable=False)
+    # Popularity, maintained by recipes.popularity: the count on every favorite write,
+    # the time-decayed score by the refresh_trending command
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+    # Derived from the fields above on every save (see set_derived_fields): the bitmask of
+    # recipes.allergens.ALLERGENS in the ingredients and the energy share of each macro
+    allergens = models.PositiveIntegerField(default=0, editable=False)
+    protein_pct = models.FloatField(default=0, editable=False)
+    fat_pct = models.FloatField(default=0, editable=False)
+    carbs_pct = models.FloatField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Owner listings: my_recipes, dashboard and nutrition counts, with and without the dietary filter
+            models.Index(fields=['user', '-created_at', '-id'], name='recipe_user_recent_idx'),
+            models.Index(fields=['user', 'dietary_type', '-created_at', '-id'], name='recipe_user_diet_recent_idx'),
+            # Public catalogue (home, shared_recipes, api_search_recipes); partial so private recipes cost nothing
+            # allergens rides along so the allergen filter is checked in the index before any row is read
+            models.Index(fields=['-created_at', '-id', 'allergens'], condition=models.Q(is_shared=True), name='recipe_shared_recent_idx'),
+            models.Index(fields=['dietary_type', '-created_at', '-id'], condition=models.Q(is_shared=True), name='recipe_shared_diet_idx'),
+            models.Index(fields=['-avg_rating', '-created_at', '-id'], condition=models.Q(is_shared=True), name='recipe_shared_rating_idx'),
+            models.Index(fields=['-trending_score', '-id'], condition=models.Q(is_shared=True), name='recipe_shared_trending_idx'),
+            # api_filter_recipes: calorie and energy-share ranges, each sortable on its own column
+            models.Index(fields=['calories', 'id'], condition=models.Q(is_shared=True), name='recipe_shared_calories_idx'),
+            models.Index(fields=['dietary_type', 'calories', 'id'], condition=models.Q(is_shared=True), name='recipe_shared_diet_cal_idx'),
+            models.Index(fields=['-protein_pct', '-id'], condition=models.Q(is_shared=True), name='recipe_shared_protein_pct_idx'),
+            models.Index(fields=['carbs_pct', 'id'], condition=models.Q(is_shared=True), name='recipe_shared_carbs_pct_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the post_save handler skip re-parsing ingredients that did not change
+        instance._stored_ingredients = instance.__dict__.get('ingredients')
+        # Un-sharing a recipe must also invalidate the public catalogue cache
+        instance._stored_is_shared = instance.__dict__.get('is_shared', True)
+        return instance
+    
+    # Stored column: the fields it is computed from
+    DERIVED_FIELDS = {
+        'allergens': {'ingredients'},
+        'protein_pct': {'protein', 'fat', 'carbs'},
+        'fat_pct': {'protein', 'fat', 'carbs'},
+        'carbs_pct': {'protein', 'fat', 'carbs'},
+    }
+    
+    def set_derived_fields(self):
+        """Compute the DERIVED_FIELDS columns; bulk writers that bypass save() call this themselves."""
+        self.allergens = classify_allergens(self.ingredients)
+        self.protein_pct, self.fat_pct, self.carbs_pct = energy_shares(self.protein, self.fat, self.carbs)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.set_derived_fields()
+        else:
+            derived = {name for name, sources in self.DERIVED_FIELDS.items() if sources & set(update_fields)}
+            if derived:
+                self.set_derived_fields()
+                kwargs['update_fields'] = {*update_fields, *derived}
+        # The post_save handler rewrites the structured ingredient rows in the same transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class Ingredient(models.Model):
+    name = models.CharField(max_length=255, unique=True)  # normalized, see recipes.ingredients.normalize_name
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    # Both FKs are covered by the composite indexes below
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients', db_index=False)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.PROTECT, related_name='recipe_ingredients', db_index=False)
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True)
+    unit = models.CharField(max_length=20, blank=True)
+    raw_text = models.CharField(max_length=255)  # the original line from Recipe.ingredients
+    position = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['recipe', 'position']
+        indexes = [
+            # "recipes containing X": Ingredient.name (unique) -> this index -> recipe ids
+            models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_lookup_idx'),
+            models.Index(fields=['recipe', 'position'], name='recipeingredient_recipe_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.raw_text} ({self.recipe.title})"
 
 
 class FavoriteRecipe(models.Model):
@@ -39,6 +138,11 @@ class FavoriteRecipe(models.Model):
     class Meta:
         unique_together = ['user', 'recipe']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_recent_idx'),
+            # Recent activity scanned by refresh_trending
+            models.Index(fields=['created_at'], name='favorite_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} favorited {self.recipe.title}"
@@ -70,9 +174,29 @@ class RecipeReview(models.Model):
     class Meta:
         unique_together = ['recipe', 'reviewer']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipe', '-created_at'], name='review_recipe_recent_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         return f"Review of {self.recipe.title} by {self.reviewer.username}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so an update can adjust Recipe.rating_sum by the difference
+        instance._stored_rating = instance.__dict__.get('rating')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # The post_save handler updates the recipe aggregates in the same transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
 
 
 class MealPlan(models.Model):
@@ -80,6 +204,11 @@ class MealPlan(models.Model):
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='mealplan_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
@@ -111,6 +240,11 @@ class ShoppingList(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='shoplist_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
@@ -123,3 +257,14 @@ class ShoppingListItem(models.Model):
     
     def __str__(self):
         return f"{self.item_name} ({self.quantity})"
+
+
+class RecipeSearchIndex(models.Model):
+    """Read-only view of the SQLite FTS5 index over recipe text (see recipes.search)"""
+    recipe = models.OneToOneField(Recipe, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_index')
+    document = models.TextField(db_column='recipes_recipe_fts')  # FTS5 hidden column named after the table, target of MATCH
+    rank = models.FloatField()  # FTS5 hidden column, bm25 score (lower is better)
+    
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
@@ -0,0 +1,66 @@
+"""Database-side nutrition aggregation for meal plans and recipe libraries.
+
+Every function here issues a single ``aggregate()`` or ``values().annotate()`` query,
+so the cost does not grow with the number of meal plan items or recipes.
+"""
+from django.db.models import Avg, Count, Sum
+
+from .models import MealPlanItem, Recipe
+
+MACROS = ('calories', 'protein', 'fat', 'carbs')
+
+
+def _totals(row, prefix='total_'):
+    return {macro: row[f'{prefix}{macro}'] or 0 for macro in MACROS}
+
+
+def _sum_recipe_macros():
+    return {f'total_{macro}': Sum(f'recipe__{macro}') for macro in MACROS}
+
+
+def meal_plan_totals(meal_plan):
+    """``{'calories', 'protein', 'fat', 'carbs', 'item_count'}`` summed over the plan's items."""
+    row = MealPlanItem.objects.filter(meal_plan=meal_plan).aggregate(
+        item_count=Count('id'), **_sum_recipe_macros()
+    )
+    totals = _totals(row)
+    totals['item_count'] = row['item_count']
+    return totals
+
+
+def _grouped_totals(meal_plan, field):
+    rows = (
+        MealPlanItem.objects.filter(meal_plan=meal_plan)
+        .order_by(field)
+        .values(field)
+        .annotate(item_count=Count('id'), **_sum_recipe_macros())
+    )
+    return [{field: row[field], 'item_count': row['item_count'], **_totals(row)} for row in rows]
+
+
+def meal_plan_daily_totals(meal_plan):
+    """Per-day macro totals, ordered by date."""
+    return _grouped_totals(meal_plan, 'meal_date')
+
+
+def meal_plan_meal_type_totals(meal_plan):
+    """Per-meal-type macro totals."""
+    return _grouped_totals(meal_plan, 'meal_type')
+
+
+def recipe_library_summary(recipes):
+    """Recipe count and average macros for a Recipe queryset."""
+    row = recipes.order_by().aggregate(
+        total_recipes=Count('id'), **{f'avg_{macro}': Avg(macro) for macro in MACROS}
+    )
+    summary = _totals(row, prefix='avg_')
+    summary['total_recipes'] = row['total_recipes']
+    return summary
+
+
+def dietary_histogram(recipes):
+    """``{label: count}`` for every dietary choice, including those with no recipes."""
+    counts = dict(
+        recipes.order_by().values_list('dietary_type').annotate(count=Count('id'))
+    )
+    return {label: counts.get(value, 0) for value, label in Recipe.DIETARY_CHOICES}
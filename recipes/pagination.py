@@ -0,0 +1,194 @@
+"""Keyset (cursor) pagination for recipe listings.
+
+Pages are fetched with a ``WHERE (created_at, id) < (last_created_at, last_id)`` style
+predicate instead of an OFFSET, so every page costs the same as the first one.
+Cursors are opaque URL-safe tokens encoding the boundary row, the direction and the
+ordering keys they were made for. A cursor made for another listing, or whose values
+do not fit the key fields, is rejected as ``InvalidCursor`` and the listing starts over.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldError, ValidationError
+from django.db.models import Q
+
+DEFAULT_KEYS = ('-created_at', '-id')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise InvalidCursor('Unknown cursor value')
+    return value
+
+
+def encode_cursor(values, direction, keys):
+    payload = json.dumps(
+        {'k': list(keys), 'v': [_encode_value(v) for v in values], 'd': direction}, separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    """``(values, direction)`` of a cursor made for a listing ordered by ``keys``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in payload['v']]
+        direction = payload['d']
+        cursor_keys = payload['k']
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor('Invalid cursor')
+    if cursor_keys != list(keys) or len(values) != len(keys):
+        raise InvalidCursor('Cursor does not match this listing')
+    return values, direction
+
+
+def _coerce_values(queryset, keys, values):
+    """Cursor values converted to the type of each key's field; raises InvalidCursor when one does not fit."""
+    query = queryset.query.clone()
+    coerced = []
+    for key, value in zip(keys, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise InvalidCursor('Invalid cursor value')
+        try:
+            field = query.resolve_ref(key.lstrip('-')).output_field
+        except FieldError:
+            coerced.append(value)
+            continue
+        try:
+            coerced.append(field.to_python(value))
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor value') from e
+    return coerced
+
+
+def _key_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    return getattr(row, field)
+
+
+def _boundary_filter(keys, values, forward):
+    """Build ``(k1, k2, ...) > (v1, v2, ...)`` in the listing's sort order as an OR of ANDs.
+
+    The redundant inclusive bound on the first key lets SQLite seek the index instead of
+    scanning it from the start.
+    """
+    condition = Q()
+    for i, key in enumerate(keys):
+        field = key.lstrip('-')
+        descending = key.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        term = Q(**{f'{field}__{lookup}': values[i]})
+        for prior_key, prior_value in zip(keys[:i], values[:i]):
+            term &= Q(**{prior_key.lstrip('-'): prior_value})
+        condition |= term
+    leading = keys[0].lstrip('-')
+    inclusive = 'lte' if keys[0].startswith('-') == forward else 'gte'
+    return Q(**{f'{leading}__{inclusive}': values[0]}) & condition
+
+
+def _reverse_key(key):
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+class KeysetPage:
+    def __init__(self, object_list, keys, has_next, has_previous):
+        self.object_list = object_list
+        self.keys = keys
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor(self, row, direction):
+        return encode_cursor([_key_value(row, key.lstrip('-')) for key in self.keys], direction, self.keys)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self._cursor(self.object_list[-1], 'next')
+
+    @property
+    def prev_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self._cursor(self.object_list[0], 'prev')
+
+
+def paginate(queryset, cursor=None, per_page=DEFAULT_PAGE_SIZE, keys=DEFAULT_KEYS):
+    """Return one KeysetPage of ``queryset`` ordered by ``keys``.
+
+    ``keys`` must end in a unique field (normally ``id``) so the order is total, and every
+    key must be readable from the returned rows (include it in ``values()`` if used).
+    """
+    keys = tuple(keys)
+    per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+    forward = True
+    if cursor:
+        values, direction = decode_cursor(cursor, keys)
+        values = _coerce_values(queryset, keys, values)
+        forward = direction == 'next'
+        try:
+            queryset = queryset.filter(_boundary_filter(keys, values, forward))
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor value') from e
+
+    ordering = keys if forward else tuple(_reverse_key(key) for key in keys)
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if forward:
+        return KeysetPage(rows, keys, has_next=has_more, has_previous=bool(cursor))
+    rows.reverse()
+    return KeysetPage(rows, keys, has_next=True, has_previous=has_more)
+
+
+def paginate_request(request, queryset, keys=DEFAULT_KEYS, per_page=DEFAULT_PAGE_SIZE):
+    """Paginate from the ``cursor`` and ``page_size`` query parameters, ignoring bad cursors."""
+    try:
+        per_page = int(request.GET.get('page_size', per_page))
+    except ValueError:
+        pass
+    try:
+        return paginate(queryset, request.GET.get('cursor'), per_page, keys)
+    except InvalidCursor:
+        return paginate(queryset, None, per_page, keys)
+
+
+def page_links(request, page):
+    """Template context with next/previous URLs that keep the current filters."""
+    links = {'page': page, 'next_page_url': None, 'prev_page_url': None}
+    for name, cursor in (('next_page_url', page.next_cursor), ('prev_page_url', page.prev_cursor)):
+        if cursor:
+            params = request.GET.copy()
+            params['cursor'] = cursor
+            links[name] = f'?{params.urlencode()}'
+    return links
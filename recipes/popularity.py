@@ -0,0 +1,96 @@
+"""Favorite counts and the trending score stored on Recipe.
+
+``favorite_count`` follows every favorite write. ``recipes.favorites`` adjusts it in the
+statement that reads it back. The signal handlers below cover ORM writes (admin,
+cascades), and bulk loaders call ``reconcile_favorite_counts``.
+
+``trending_score`` is recomputed by the ``refresh_trending`` command, to be run
+periodically (e.g. every ten minutes from cron). Each favorite and review created in
+the last ``window_days`` contributes its weight, halved for every ``half_life_hours`` of
+age. A run reads only that window's activity through the ``created_at`` indexes and
+writes only the recipes that have, or had, a score, so its cost follows recent
+activity rather than the size of the catalogue. Decayed scores change on every run,
+so the cached catalogue pages are only invalidated when the trending list they show
+(the top ``HOME_TRENDING`` recipes, in order) changes.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .catalogue import bump_catalogue_version
+from .models import FavoriteRecipe, Recipe, RecipeReview
+
+FAVORITE_WEIGHT = 1.0
+REVIEW_WEIGHT = 2.0
+
+MAX_TRENDING = 50
+# Trending recipes on the cached home page
+HOME_TRENDING = 6
+TRENDING_FIELDS = ['id', 'title', 'description', 'calories', 'dietary_type', 'avg_rating',
+                   'favorite_count', 'trending_score', 'created_at']
+
+
+def adjust_favorite_count(recipe_id, delta):
+    Recipe.objects.filter(pk=recipe_id).update(favorite_count=F('favorite_count') + delta)
+
+
+def favorite_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_favorite_count(instance.recipe_id, 1)
+
+
+def favorite_deleted(sender, instance, **kwargs):
+    adjust_favorite_count(instance.recipe_id, -1)
+
+
+def reconcile_favorite_counts(queryset=None):
+    """Recompute stored favorite counts from the favorites table, returning the number of drifted rows."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    favorites = FavoriteRecipe.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    actual_count = Coalesce(Subquery(favorites.annotate(total=Count('id')).values('total')), Value(0))
+    drifted_ids = list(
+        queryset.annotate(actual_count=actual_count).exclude(favorite_count=F('actual_count')).values_list('pk', flat=True)
+    )
+    for start in range(0, len(drifted_ids), 500):
+        Recipe.objects.filter(pk__in=drifted_ids[start:start + 500]).update(favorite_count=actual_count)
+    return len(drifted_ids)
+
+
+def trending_scores(window_days=7, half_life_hours=48, now=None, chunk_size=2000):
+    """``{recipe_id: score}`` for shared recipes favorited or reviewed within the window."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=window_days)
+    decay = math.log(2) / (half_life_hours * 3600)
+    scores = defaultdict(float)
+    for model, weight in ((FavoriteRecipe, FAVORITE_WEIGHT), (RecipeReview, REVIEW_WEIGHT)):
+        rows = model.objects.filter(created_at__gte=cutoff, recipe__is_shared=True).values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in rows.iterator(chunk_size=chunk_size):
+            scores[recipe_id] += weight * math.exp(-decay * (now - created_at).total_seconds())
+    return scores
+
+
+def refresh_trending_scores(window_days=7, half_life_hours=48, now=None, batch_size=1000):
+    """Store fresh trending scores; returns ``(scored, cleared)`` recipe counts."""
+    scores = trending_scores(window_days, half_life_hours, now)
+    shown = list(trending_recipes(HOME_TRENDING).values_list('id', flat=True))
+    # Only shared recipes are ranked, so the partial trending index finds every stale score
+    stale = sorted(set(
+        Recipe.objects.filter(is_shared=True, trending_score__gt=0).values_list('id', flat=True)
+    ) - scores.keys())
+    for start in range(0, len(stale), batch_size):
+        Recipe.objects.filter(pk__in=stale[start:start + batch_size]).update(trending_score=0)
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, trending_score=score) for pk, score in scores.items()], ['trending_score'], batch_size=batch_size,
+    )
+    if list(trending_recipes(HOME_TRENDING).values_list('id', flat=True)) != shown:
+        bump_catalogue_version()
+    return len(scores), len(stale)
+
+
+def trending_recipes(limit=10):
+    return Recipe.objects.filter(is_shared=True, trending_score__gt=0).order_by('-trending_score', '-id')[:limit]
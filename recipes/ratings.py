@@ -0,0 +1,79 @@
+"""Incremental maintenance of the review aggregates stored on Recipe."""
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Abs, Cast, Coalesce, NullIf
+
+from .models import Recipe, RecipeReview
+
+# Stored averages within this of sum / count are not drift, just float rounding
+AVG_TOLERANCE = 1e-9
+
+
+def adjust_rating_stats(recipe_id, rating_delta, count_delta):
+    """Apply a review change to a recipe's aggregates in a single UPDATE.
+
+    The right-hand side expressions all read the pre-update row, so the new average
+    is derived from the same sum and count that are being written. A row that has
+    drifted below the change (e.g. after a ``QuerySet.update``) would go negative and
+    fail its CHECK constraints, so it is recomputed from its reviews instead.
+    """
+    new_sum = F('rating_sum') + rating_delta
+    new_count = F('review_count') + count_delta
+    recipe = Recipe.objects.filter(pk=recipe_id)
+    updated = recipe.filter(rating_sum__gte=-rating_delta, review_count__gte=-count_delta).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        avg_rating=Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+    )
+    if not updated:
+        reconcile_rating_stats(recipe)
+
+
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rating = int(instance.rating)
+    if created:
+        adjust_rating_stats(instance.recipe_id, rating, 1)
+    else:
+        previous = getattr(instance, '_stored_rating', None)
+        if previous is None:
+            # Instance was not loaded from the database; the row already holds the new
+            # rating, so fall back to recomputing this recipe from scratch.
+            reconcile_rating_stats(Recipe.objects.filter(pk=instance.recipe_id))
+        elif rating != previous:
+            adjust_rating_stats(instance.recipe_id, rating - int(previous), 0)
+    instance._stored_rating = rating
+
+
+def review_deleted(sender, instance, **kwargs):
+    rating = getattr(instance, '_stored_rating', None)
+    if rating is None:
+        rating = instance.rating
+    adjust_rating_stats(instance.recipe_id, -int(rating), -1)
+
+
+def reconcile_rating_stats(queryset=None):
+    """Recompute stored aggregates from the reviews table, returning the number of drifted rows."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    reviews = RecipeReview.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    actual_sum = Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), Value(0))
+    actual_count = Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), Value(0))
+    actual_avg = Cast(actual_sum, FloatField()) / NullIf(actual_count, 0)
+
+    drift = (
+        ~Q(rating_sum=F('actual_sum'))
+        | ~Q(review_count=F('actual_count'))
+        | Q(avg_rating__isnull=True, actual_count__gt=0)
+        | Q(avg_rating__isnull=False, actual_count=0)
+        | Q(avg_error__gt=AVG_TOLERANCE)
+    )
+    drifted_ids = list(queryset.annotate(
+        actual_sum=actual_sum, actual_count=actual_count,
+        avg_error=Abs(F('avg_rating') - Cast(F('actual_sum'), FloatField()) / NullIf(F('actual_count'), 0)),
+    ).filter(drift).values_list('pk', flat=True))
+    if drifted_ids:
+        Recipe.objects.filter(pk__in=drifted_ids).update(
+            rating_sum=actual_sum, review_count=actual_count, avg_rating=actual_avg,
+        )
+    return len(drifted_ids)
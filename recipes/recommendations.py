@@ -0,0 +1,248 @@
+"""Preference-aware recipe recommendations scored with NumPy.
+
+Every shared recipe is described by a fixed-length feature row:
+
+* macros: the share of energy from protein, fat and carbs, plus calories / 1000;
+* dietary type, one-hot;
+* ingredient tokens: ingredient ids hashed into ``TOKEN_BUCKETS`` counts.
+
+Each block is L2-normalised and weighted, then the whole row is normalised, so a dot
+product is a cosine similarity. Rows live in one float32 matrix built by
+``build_index``. It is saved to ``RECOMMENDATIONS['INDEX_PATH']`` by the
+``build_recommendation_index`` command, and web processes load it and reload it when
+the file changes. A 500k-recipe catalogue takes about 115 MiB. Requests never build
+the index themselves: until the command has written the file, there are no
+recommendations.
+
+A user's taste vector is the weighted sum of the rows they favorited (+1) or reviewed
+(+1 for five stars down to -1 for one star). Scoring is one matrix-vector product plus
+popularity and rating priors. ``DietaryPreference`` is applied as masks:
+* vegan and vegetarian filter on dietary type;
+* nut allergy, dairy-free, gluten-free and custom restrictions test the stored allergen
+  bitmask (see ``recipes.allergens``); a restriction it does not recognise drops
+  recipes using any ingredient whose name contains it;
+* low-carb is a penalty on the carb share rather than a filter.
+Recipes the user owns, favorited or reviewed are never recommended. The top K come from
+``argpartition``, so nothing sorts the whole catalogue.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .allergens import preference_mask
+from .models import DietaryPreference, FavoriteRecipe, Ingredient, Recipe, RecipeIngredient, RecipeReview
+
+DEFAULTS = {
+    'INDEX_PATH': 'recommendations.npz',
+    'RELOAD_SECONDS': 60,       # how often a process checks the index file for a newer build
+}
+
+DIETARY_TYPES = [code for code, _ in Recipe.DIETARY_CHOICES]
+TOKEN_BUCKETS = 32
+MACRO_WEIGHT, DIETARY_WEIGHT, TOKEN_WEIGHT = 1.0, 0.5, 1.0
+POPULARITY_WEIGHT, RATING_WEIGHT, LOW_CARB_WEIGHT = 0.15, 0.1, 0.5
+
+MAX_RECOMMENDATIONS = 50
+RECOMMENDATION_FIELDS = ['id', 'title', 'description', 'calories', 'dietary_type', 'avg_rating', 'favorite_count']
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_loaded = {'index': None, 'checked': 0.0, 'mtime': None, 'warned': False}
+
+
+def recommendation_settings():
+    return {**DEFAULTS, **getattr(settings, 'RECOMMENDATIONS', {})}
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def build_index(chunk_size=5000):
+    """Feature arrays for every shared recipe, as a dict of NumPy arrays keyed like the .npz file."""
+    rows = Recipe.objects.filter(is_shared=True).order_by('id').values_list(
+        'id', 'user_id', 'calories', 'protein', 'fat', 'carbs', 'dietary_type', 'favorite_count', 'avg_rating',
+        'allergens',
+    )
+    links = RecipeIngredient.objects.filter(recipe__is_shared=True).values_list('recipe_id', 'ingredient_id')
+    # One read transaction is one snapshot on SQLite; elsewhere a recipe shared between the
+    # two reads can still bring links, so the ones for recipes not in ``ids`` are dropped below
+    with transaction.atomic(using=rows.db):
+        columns = list(zip(*rows.iterator(chunk_size=chunk_size))) or [()] * 10
+        pairs = np.fromiter(
+            (value for pair in links.iterator(chunk_size=chunk_size * 4) for value in pair), dtype=np.int64,
+        ).reshape(-1, 2)
+    ids = np.array(columns[0], dtype=np.int64)
+    count = len(ids)
+    calories, protein, fat, carbs = (np.array(column, dtype=np.float32) for column in columns[2:6])
+    dietary = np.array([DIETARY_TYPES.index(code) for code in columns[6]], dtype=np.int8)
+    favorites = np.array(columns[7], dtype=np.float32)
+    ratings = np.array([rating or 0.0 for rating in columns[8]], dtype=np.float32)
+
+    energy = np.stack([protein * 4, fat * 9, carbs * 4], axis=1)
+    macros = np.column_stack([energy / np.maximum(energy.sum(axis=1, keepdims=True), 1), np.minimum(calories / 1000, 2)])
+    one_hot = np.zeros((count, len(DIETARY_TYPES)), dtype=np.float32)
+    one_hot[np.arange(count), dietary] = 1
+
+    link_rows = np.searchsorted(ids, pairs[:, 0])
+    known = link_rows < count
+    known[known] = ids[link_rows[known]] == pairs[known, 0]
+    pairs, link_rows = pairs[known], link_rows[known].astype(np.int32)
+    link_ingredients = pairs[:, 1].astype(np.int32)
+    tokens = np.zeros((count, TOKEN_BUCKETS), dtype=np.float32)
+    np.add.at(tokens, (link_rows, (link_ingredients.astype(np.int64) * 2654435761) % TOKEN_BUCKETS), 1)
+
+    features = np.hstack([
+        MACRO_WEIGHT * _normalize_rows(macros.astype(np.float32)),
+        DIETARY_WEIGHT * one_hot,
+        TOKEN_WEIGHT * _normalize_rows(tokens),
+    ]).astype(np.float32)
+    return {
+        'ids': ids,
+        'owners': np.array(columns[1], dtype=np.int64),
+        'features': _normalize_rows(features),
+        'dietary': dietary,
+        'allergens': np.array(columns[9], dtype=np.uint32),
+        'carb_share': (energy[:, 2] / np.maximum(energy.sum(axis=1), 1)).astype(np.float32) if count
+        else np.zeros(0, dtype=np.float32),
+        'prior': (POPULARITY_WEIGHT * np.log1p(favorites) / max(float(np.log1p(favorites.max(initial=0))), 1.0)
+                  + RATING_WEIGHT * ratings / 5).astype(np.float32),
+        'link_rows': link_rows,
+        'link_ingredients': link_ingredients,
+    }
+
+
+def save_index(index, path):
+    # Write next to the target and rename, so readers never load a half-written file
+    tmp = f'{path}.tmp.npz'
+    np.savez(tmp, **index)
+    os.replace(tmp, path)
+
+
+def load_index(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def get_index():
+    """The current process's index loaded from the index file, or None until the file exists."""
+    config = recommendation_settings()
+    now = time.monotonic()
+    with _lock:
+        if _loaded['index'] is not None and now - _loaded['checked'] < config['RELOAD_SECONDS']:
+            return _loaded['index']
+        _loaded['checked'] = now
+        try:
+            mtime = os.path.getmtime(config['INDEX_PATH'])
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != _loaded['mtime']:
+            _loaded['index'], _loaded['mtime'] = load_index(config['INDEX_PATH']), mtime
+        elif _loaded['index'] is None and not _loaded['warned']:
+            # Building the whole catalogue here would stall every request behind the lock
+            logger.warning('No recommendation index at %s; run manage.py build_recommendation_index',
+                           config['INDEX_PATH'])
+            _loaded['warned'] = True
+        return _loaded['index']
+
+
+def taste_vector(index, weighted_ids):
+    """Sum of the feature rows of ``{recipe_id: weight}``, restricted to indexed recipes."""
+    if not weighted_ids:
+        return None
+    ids = np.fromiter(weighted_ids.keys(), dtype=np.int64, count=len(weighted_ids))
+    weights = np.fromiter(weighted_ids.values(), dtype=np.float32, count=len(weighted_ids))
+    positions = np.searchsorted(index['ids'], ids)
+    found = (positions < len(index['ids'])) & (index['ids'][np.minimum(positions, len(index['ids']) - 1)] == ids)
+    if not found.any():
+        return None
+    vector = weights[found] @ index['features'][positions[found]]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def restricted_ingredient_ids(terms):
+    query = Ingredient.objects.none()
+    for term in terms:
+        query = query | Ingredient.objects.filter(name__contains=term)
+    return list(query.values_list('id', flat=True))
+
+
+def allowed_mask(index, preference):
+    """Boolean mask of the indexed recipes ``preference`` allows, and a per-recipe penalty."""
+    mask = np.ones(len(index['ids']), dtype=bool)
+    penalty = None
+    if preference is None:
+        return mask, penalty
+    if preference.vegan:
+        mask &= index['dietary'] == DIETARY_TYPES.index('vegan')
+    elif preference.vegetarian:
+        mask &= np.isin(index['dietary'], [DIETARY_TYPES.index('vegan'), DIETARY_TYPES.index('vegetarian')])
+    excluded, unmatched = preference_mask(preference)
+    if excluded:
+        mask &= (index['allergens'] & excluded) == 0
+    if unmatched:
+        banned = restricted_ingredient_ids(unmatched)
+        mask[index['link_rows'][np.isin(index['link_ingredients'], banned)]] = False
+    if preference.low_carb:
+        penalty = LOW_CARB_WEIGHT * index['carb_share']
+    return mask, penalty
+
+
+def score_recipes(index, taste, mask, penalty=None, k=10):
+    """Top ``k`` ``(recipe_id, score)`` pairs among the recipes ``mask`` allows."""
+    scores = index['prior'].copy()
+    if taste is not None:
+        scores += index['features'] @ taste
+    if penalty is not None:
+        scores -= penalty
+    scores[~mask] = -np.inf
+    allowed = int(mask.sum())
+    k = min(k, allowed)
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(index['ids'][i]), float(scores[i])) for i in top]
+
+
+def user_history(user):
+    """``{recipe_id: weight}`` from the user's favorites (+1) and reviews (-1 to +1 by rating)."""
+    history = dict.fromkeys(FavoriteRecipe.objects.filter(user=user).order_by().values_list('recipe_id', flat=True), 1.0)
+    for recipe_id, rating in RecipeReview.objects.filter(reviewer=user).order_by().values_list('recipe_id', 'rating'):
+        history[recipe_id] = history.get(recipe_id, 0.0) + (rating - 3) / 2
+    return history
+
+
+def rank(index, user_id, preference, history, k=10):
+    """Top ``k`` ``(recipe_id, score)`` pairs for a user, skipping their own and already seen recipes."""
+    mask, penalty = allowed_mask(index, preference)
+    mask &= index['owners'] != user_id
+    if history:
+        seen = np.fromiter(history.keys(), dtype=np.int64, count=len(history))
+        mask &= ~np.isin(index['ids'], seen)
+    return score_recipes(index, taste_vector(index, history), mask, penalty, k)
+
+
+def recommend(user, k=10, preference=None, load_preference=True):
+    """Up to ``k`` ``(Recipe, score)`` pairs for ``user``, best first; none without an index.
+
+    A caller that already loaded the user's DietaryPreference passes it (or None) as
+    ``preference`` with ``load_preference=False`` to save its query.
+    """
+    index = get_index()
+    if index is None:
+        return []
+    if load_preference:
+        preference = DietaryPreference.objects.filter(user=user).first()
+    # Ask for a few extra in case some were deleted or unshared since the index was built
+    ranked = rank(index, user.id, preference, user_history(user), k + 5)
+    recipes = Recipe.objects.filter(pk__in=[pk for pk, _ in ranked], is_shared=True).in_bulk()
+    return [(recipes[pk], score) for pk, score in ranked if pk in recipes][:k]
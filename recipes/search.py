@@ -0,0 +1,108 @@
+"""Full-text search over recipe title, description and ingredients.
+
+On SQLite the text is indexed in the FTS5 table ``recipes_recipe_fts`` (created in
+migration 0002), which triggers keep in sync with ``recipes_recipe`` on insert,
+update and delete. Results are ranked by bm25 with the title weighted highest.
+Other database vendors fall back to ``icontains`` filtering.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, FloatField, Lookup, Q, Value
+
+from .models import RecipeSearchIndex
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Best matches first; also the keyset for paginating search results
+SEARCH_ORDERING = ('search_rank', '-id')
+
+
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+RecipeSearchIndex._meta.get_field('document').register_lookup(Match)
+
+
+def build_fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    tokens = TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return ' '.join(terms)
+
+
+def search_recipes(queryset, text):
+    """Filter a Recipe queryset to those matching ``text``, best matches first."""
+    # The vendor of the database this queryset reads from, which a router may point at a replica
+    if connections[queryset.db].vendor == 'sqlite':
+        fts_query = build_fts_query(text)
+        if not fts_query:
+            return queryset
+        return queryset.filter(search_index__document__match=fts_query).annotate(
+            search_rank=F('search_index__rank')
+        ).order_by(*SEARCH_ORDERING)
+    return queryset.filter(
+        Q(title__icontains=text) | Q(description__icontains=text) | Q(ingredients__icontains=text)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField())).order_by(*SEARCH_ORDERING)
+
+
+TRIGGER_SQL = {
+    'recipes_recipe_fts_ai': """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ai AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END""",
+    'recipes_recipe_fts_ad': """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ad AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+    END""",
+    'recipes_recipe_fts_au': """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_au AFTER UPDATE OF title, description, ingredients ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+        INSERT INTO recipes_recipe_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END""",
+}
+
+
+def ensure_triggers(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Recreate the sync triggers if a migration dropped them.
+
+    SQLite migrations that alter recipes_recipe rebuild the table, which silently drops
+    its triggers. This runs on post_migrate and rebuilds the index if any were missing.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'recipes_recipe'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGER_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGER_SQL[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    """Repopulate the FTS5 index from the recipes table of database ``using``."""
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+    return True
@@ -0,0 +1,64 @@
+"""Shopping list generation from meal plans."""
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q, Sum
+
+from .models import RecipeIngredient, ShoppingList, ShoppingListItem
+
+UNQUANTIFIED = 'as needed'
+
+
+def format_quantity(quantity, unit):
+    text = f'{quantity.normalize():f}'
+    return f'{text} {unit}' if unit else text
+
+
+def merge_meal_plan_ingredients(meal_plan):
+    """Return ``[(item_name, quantity_text)]`` for every ingredient used by the plan's meals.
+
+    One grouped query sums like quantities per (ingredient, unit) across all meal plan
+    items, so a recipe planned three times contributes three times its quantities.
+    Lines without a parsed quantity ("salt", "onions, to taste") cannot be added to the
+    others, so they become a separate item of the same name marked ``UNQUANTIFIED``.
+    """
+    rows = (
+        RecipeIngredient.objects
+        .filter(recipe__mealplanitem__meal_plan=meal_plan)
+        .order_by()
+        # Without the flag, SUM would skip the NULL quantities of a mixed group silently
+        .values('ingredient__name', 'unit', unquantified=ExpressionWrapper(
+            Q(quantity__isnull=True), output_field=BooleanField()))
+        .annotate(total=Sum('quantity'))
+    )
+    merged = {}
+    for row in rows:
+        parts = merged.setdefault(row['ingredient__name'], {'quantities': [], 'unquantified': False})
+        if row['unquantified']:
+            parts['unquantified'] = True
+        else:
+            parts['quantities'].append(format_quantity(row['total'], row['unit']))
+
+    items = []
+    for name in sorted(merged):
+        parts = merged[name]
+        item_name = name[:1].upper() + name[1:]
+        if parts['quantities']:
+            items.append((item_name, ' + '.join(sorted(parts['quantities']))[:100]))
+        if parts['unquantified']:
+            items.append((item_name, UNQUANTIFIED))
+    return items
+
+
+def generate_shopping_list(meal_plan):
+    """Create a ShoppingList for ``meal_plan`` with a fixed number of queries."""
+    items = merge_meal_plan_ingredients(meal_plan)
+    with transaction.atomic():
+        shopping_list = ShoppingList.objects.create(
+            user_id=meal_plan.user_id,
+            name=f"Shopping List for {meal_plan.name}",
+            meal_plan=meal_plan,
+        )
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(shopping_list=shopping_list, item_name=name, quantity=quantity)
+            for name, quantity in items
+        ])
+    return shopping_list
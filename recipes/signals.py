@@ -0,0 +1,29 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+from recipeapp.sqlite import apply_pragmas
+
+from .models import Recipe, RecipeReview, FavoriteRecipe, MealPlan, ShoppingList
+from . import catalogue
+from .ingredients import recipe_saved
+from .popularity import favorite_deleted, favorite_saved
+from .ratings import review_deleted, review_saved
+from .search import ensure_triggers
+from .stats import owner_deleted, owner_saved
+
+
+def connect_signals(app_config):
+    connection_created.connect(apply_pragmas, dispatch_uid='recipes.sqlite_pragmas')
+    post_migrate.connect(ensure_triggers, sender=app_config, dispatch_uid='recipes.ensure_search_triggers')
+    post_save.connect(recipe_saved, sender=Recipe, dispatch_uid='recipes.recipe_saved')
+    post_save.connect(review_saved, sender=RecipeReview, dispatch_uid='recipes.review_saved')
+    post_delete.connect(review_deleted, sender=RecipeReview, dispatch_uid='recipes.review_deleted')
+    post_save.connect(favorite_saved, sender=FavoriteRecipe, dispatch_uid='recipes.favorite_saved')
+    post_delete.connect(favorite_deleted, sender=FavoriteRecipe, dispatch_uid='recipes.favorite_deleted')
+    for model in (Recipe, FavoriteRecipe, MealPlan, ShoppingList):
+        post_save.connect(owner_saved, sender=model, dispatch_uid=f'recipes.stats_saved.{model.__name__}')
+        post_delete.connect(owner_deleted, sender=model, dispatch_uid=f'recipes.stats_deleted.{model.__name__}')
+    post_save.connect(catalogue.recipe_saved, sender=Recipe, dispatch_uid='recipes.catalogue_recipe_saved')
+    post_delete.connect(catalogue.recipe_deleted, sender=Recipe, dispatch_uid='recipes.catalogue_recipe_deleted')
+    post_save.connect(catalogue.review_changed, sender=RecipeReview, dispatch_uid='recipes.catalogue_review_saved')
+    post_delete.connect(catalogue.review_changed, sender=RecipeReview, dispatch_uid='recipes.catalogue_review_deleted')
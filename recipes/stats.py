@@ -0,0 +1,94 @@
+"""Cached per-user stat bundles for the dashboard and the stats API.
+
+Bundles are computed with one query and stored in Django's cache. They are dropped
+by post_save/post_delete handlers whenever the owner's recipes, favorites, meal plans
+or shopping lists are created or deleted, so reads never see stale counts. The drop
+waits for the write to commit; before that, a concurrent read would recompute the old
+counts and cache them again.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Recipe, FavoriteRecipe, MealPlan, ShoppingList
+
+KEY_PREFIX = 'recipes:user-stats:v1'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+
+COUNTED_MODELS = {
+    'total_recipes': Recipe,
+    'favorite_count': FavoriteRecipe,
+    'total_meal_plans': MealPlan,
+    'total_shopping_lists': ShoppingList,
+}
+
+
+def stats_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def _count(model):
+    rows = model.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def compute_user_stats(user_id):
+    """All counts for one user as correlated subqueries in a single SELECT."""
+    return (
+        User.objects.filter(pk=user_id)
+        .annotate(**{name: _count(model) for name, model in COUNTED_MODELS.items()})
+        .values(*COUNTED_MODELS)
+        .first()
+    ) or dict.fromkeys(COUNTED_MODELS, 0)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_user_stats(user_id):
+    key = stats_key(user_id)
+    stats = cache.get(key)
+    if stats is not None:
+        _bump(HITS_KEY)
+        return stats
+    _bump(MISSES_KEY)
+    stats = compute_user_stats(user_id)
+    cache.set(key, stats, getattr(settings, 'USER_STATS_CACHE_TIMEOUT', 3600))
+    return stats
+
+
+def cache_counters():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else None}
+
+
+def invalidate_user_stats(user_id):
+    cache.delete(stats_key(user_id))
+
+
+def invalidate_many_user_stats(user_ids):
+    cache.delete_many([stats_key(user_id) for user_id in user_ids])
+
+
+def invalidate_after_commit(user_id, using=None):
+    transaction.on_commit(lambda: invalidate_user_stats(user_id), using=using)
+
+
+def owner_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    # Counts only change on insert; updates to an existing row leave the bundle valid
+    if created and not raw:
+        invalidate_after_commit(instance.user_id, using)
+
+
+def owner_deleted(sender, instance, using=None, **kwargs):
+    invalidate_after_commit(instance.user_id, using)
@@ -0,0 +1,9 @@
+"""recipes.urls with every API route served by its async twin, as under ASYNC_API_VIEWS=1."""
+from django.urls import path
+
+from recipes import async_api_views, urls
+
+urlpatterns = [
+    path(str(pattern.pattern), getattr(async_api_views, pattern.callback.__name__, pattern.callback), name=pattern.name)
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,20 @@
+"""Allergen keywords: whole-word matches, with phrases that name a different allergen excluded."""
+from django.test import SimpleTestCase
+
+from recipes.allergens import allergen_names, classify_allergens
+
+
+class ClassifyAllergensTests(SimpleTestCase):
+    def test_ingredient_lines(self):
+        cases = {
+            '100 g goat cheese': ['dairy'],
+            "1 cup goat's milk": ['dairy'],
+            '500 g goat meat': ['lamb'],
+            '250 g mutton\n2 tbsp ghee': ['dairy', 'lamb'],
+            '1 cup coconut milk\n1 tsp nutmeg': [],
+            '2 cups rice flour\n1 eggplant': [],
+            '1 tbsp peanut butter': ['peanut'],
+        }
+        for text, names in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(allergen_names(classify_allergens(text)), names)
@@ -0,0 +1,54 @@
+"""The catalogue page cache: versioned pages for anonymous visitors, bumped after commit."""
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from recipes.catalogue import catalogue_state
+from recipes.models import Recipe, RecipeReview
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'catalogue-tests'}})
+class CatalogueVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('catalogue-owner')
+        cls.recipe = Recipe.objects.create(
+            user=cls.owner, title='Catalogue Dal', description='', ingredients='1 cup lentils', instructions='',
+            calories=300, protein=15, fat=5, carbs=40, is_shared=True,
+        )
+
+    def assert_bumped_on_commit(self, write):
+        version = catalogue_state()['version']
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            write()
+            self.assertEqual(catalogue_state()['version'], version, 'bumped before commit')
+        self.assertTrue(callbacks)
+        self.assertNotEqual(catalogue_state()['version'], version)
+
+    def test_shared_recipe_and_review_writes(self):
+        def edit():
+            self.recipe.title = 'Catalogue Dal Tadka'
+            self.recipe.save()
+
+        def review():
+            RecipeReview.objects.create(recipe=self.recipe, reviewer=self.owner, rating=5)
+
+        for write in (edit, review, self.recipe.delete):
+            with self.subTest(write=write.__name__):
+                self.assert_bumped_on_commit(write)
+
+    def test_private_recipes_leave_the_catalogue_alone(self):
+        version = catalogue_state()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                user=self.owner, title='Private Dal', description='', ingredients='1 cup lentils', instructions='',
+                calories=300, protein=15, fat=5, carbs=40,
+            )
+        self.assertEqual(catalogue_state()['version'], version)
+
+    def test_anonymous_pages_are_served_from_the_cache_until_a_bump(self):
+        first = self.client.get('/shared-recipes/')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/shared-recipes/')
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(self.client.get('/shared-recipes/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
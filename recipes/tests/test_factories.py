@@ -0,0 +1,24 @@
+"""Seeding leaves the rest of the shared cache alone."""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes import factories
+from recipes.catalogue import catalogue_state
+from recipes.stats import get_user_stats
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'factory-tests'}})
+class SeedCacheTests(TestCase):
+    def test_seed_invalidates_only_what_it_made_stale(self):
+        cache.set('other-app:key', 'kept')
+        version = catalogue_state()['version']
+        with mock.patch.object(factories, 'invalidate_many_user_stats',
+                               wraps=factories.invalidate_many_user_stats) as invalidate:
+            result = factories.seed(users=3, recipes_per_user=2, username_prefix='factory-cook')
+        invalidate.assert_called_once_with(result.user_ids)
+        self.assertEqual(cache.get('other-app:key'), 'kept')
+        self.assertNotEqual(catalogue_state()['version'], version)
+        self.assertEqual(get_user_stats(result.user_ids[0])['total_meal_plans'], 1)
@@ -0,0 +1,78 @@
+"""Concurrent favorite toggles against the test database.
+
+Many threads toggle the same ``(user, recipe)`` pair at once. No toggle may fail, the
+pair may never hold more than one row, and the stored ``favorite_count`` must match
+the ``FavoriteRecipe`` rows when they are done.
+"""
+import threading
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TransactionTestCase
+
+from recipes.favorites import toggle_favorite_state
+from recipes.models import FavoriteRecipe, Recipe
+
+THREADS = 8
+TOGGLES = 25
+
+
+class FavoriteRaceTests(TransactionTestCase):
+    def setUp(self):
+        owner = User.objects.create_user('race-owner')
+        self.users = [User.objects.create_user(f'race-fan-{i}') for i in range(3)]
+        self.recipe = Recipe.objects.create(
+            user=owner, title='Race Dal', description='', ingredients='1 cup lentils', instructions='',
+            calories=300, protein=15, fat=5, carbs=40, is_shared=True,
+        )
+
+    def toggle_concurrently(self, user_ids):
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(user_ids))
+
+        def worker(user_id):
+            barrier.wait()
+            try:
+                for _ in range(TOGGLES):
+                    try:
+                        toggle_favorite_state(user_id, self.recipe.id)
+                    except DatabaseError as e:
+                        outcome = f'{type(e).__name__}: {e}'
+                    else:
+                        outcome = 'ok'
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def assert_count_matches_rows(self):
+        self.recipe.refresh_from_db(fields=['favorite_count'])
+        self.assertEqual(self.recipe.favorite_count, FavoriteRecipe.objects.filter(recipe=self.recipe).count())
+
+    def test_same_pair_from_many_threads(self):
+        user = self.users[0]
+        outcomes = self.toggle_concurrently([user.id] * THREADS)
+        self.assertEqual(dict(outcomes), {'ok': THREADS * TOGGLES})
+        self.assertLessEqual(FavoriteRecipe.objects.filter(user=user, recipe=self.recipe).count(), 1)
+        self.assert_count_matches_rows()
+
+    def test_many_users_on_one_recipe(self):
+        outcomes = self.toggle_concurrently([user.id for user in self.users for _ in range(THREADS // 2)])
+        self.assertEqual(dict(outcomes), {'ok': len(self.users) * (THREADS // 2) * TOGGLES})
+        self.assert_count_matches_rows()
+
+    def test_recipe_deleted_before_the_toggle(self):
+        # The view loaded the recipe, then someone deleted it before the toggle ran
+        recipe_id = self.recipe.id
+        self.recipe.delete()
+        self.assertEqual(toggle_favorite_state(self.users[0].id, recipe_id), (False, 0))
+        self.assertFalse(FavoriteRecipe.objects.filter(recipe_id=recipe_id).exists())
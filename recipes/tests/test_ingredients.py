@@ -0,0 +1,48 @@
+"""Ingredient line parsing and the structured rows recipes are searched by."""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from recipes.ingredients import normalize_name, parse_ingredient, with_ingredient
+from recipes.models import Recipe
+
+
+class ParseIngredientTests(SimpleTestCase):
+    def test_lines(self):
+        cases = {
+            '200 g paneer': ('paneer', Decimal('200'), 'g'),
+            '1 1/2 cups basmati rice': ('basmati rice', Decimal('1.5'), 'cup'),
+            '½ tsp turmeric': ('turmeric', Decimal('0.5'), 'tsp'),
+            '2-3 cloves garlic': ('garlic', Decimal('3'), 'clove'),
+            '2 to 3 green chillies': ('green chilli', Decimal('3'), ''),
+            '2 large onions, chopped': ('onion', Decimal('2'), ''),
+            '3 eggs': ('egg', Decimal('3'), ''),
+            '1 (14 oz) can tomatoes': ('tomato', Decimal('1'), 'can'),
+            '10 curry leaves': ('curry leaf', Decimal('10'), ''),
+            '2 medium potatoes (peeled)': ('potato', Decimal('2'), ''),
+            '1 tbsp hummus': ('hummus', Decimal('1'), 'tbsp'),
+            'onions, to taste': ('onion', None, ''),
+            'Salt': ('salt', None, ''),
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(parse_ingredient(line), expected)
+
+    def test_search_terms_normalise_like_lines(self):
+        self.assertEqual(normalize_name('Onions'), 'onion')
+        self.assertEqual(normalize_name('large eggs'), 'egg')
+        self.assertEqual(normalize_name('Tomatoes'), 'tomato')
+
+
+class WithIngredientTests(TestCase):
+    def test_finds_recipes_however_the_line_is_written(self):
+        user = User.objects.create_user('ingredient-cook')
+        recipe = Recipe.objects.create(
+            user=user, title='Shakshuka', description='', instructions='',
+            ingredients='2-3 cloves garlic\n2 large onions, chopped\n3 eggs\n1 (14 oz) can tomatoes',
+            calories=400, protein=20, fat=20, carbs=30,
+        )
+        for term in ('garlic', 'onion', 'onions', 'egg', 'tomato'):
+            with self.subTest(term=term):
+                self.assertEqual(list(with_ingredient(Recipe.objects.all(), term)), [recipe])
@@ -0,0 +1,21 @@
+"""Macro range parameters: numbers become range predicates, anything else a 400."""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from recipes.macros import macro_ranges
+
+
+class MacroRangeTests(TestCase):
+    def test_bounds_must_be_finite_numbers(self):
+        self.assertEqual(len(macro_ranges({'calories_min': '200', 'protein_pct_max': '35.5'})), 2)
+        for raw in ('abc', 'nan', 'inf', '-inf', 'Infinity'):
+            with self.subTest(raw=raw), self.assertRaisesMessage(ValueError, 'calories_max must be a number'):
+                macro_ranges({'calories_max': raw})
+
+    def test_filter_endpoint_rejects_them(self):
+        self.client.force_login(User.objects.create_user('macro-cook'))
+        for raw in ('nan', 'inf'):
+            with self.subTest(raw=raw):
+                response = self.client.get('/api/recipes/filter/', {'calories_max': raw})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'calories_max must be a number')
@@ -0,0 +1,87 @@
+"""Generated meal plans: daily targets, dietary preferences and the 100k-candidate time budget."""
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.meal_planner import MEAL_TYPES, TARGETS, generate_plan, plan_dates, plan_meals
+from recipes.models import DietaryPreference, MealPlanItem, Recipe
+
+DAILY = {'calories': 2000, 'protein': 120, 'fat': 70, 'carbs': 220}
+FOUR_WEEKS = plan_dates(date(2024, 1, 1), date(2024, 1, 28))
+
+
+def synthetic_candidates(count, seed=7):
+    rng = np.random.default_rng(seed)
+    protein, fat, carbs = rng.uniform(2, 60, count), rng.uniform(1, 40, count), rng.uniform(5, 120, count)
+    calories = protein * 4 + fat * 9 + carbs * 4
+    return {
+        'ids': np.arange(1, count + 1, dtype=np.int64),
+        'macros': np.column_stack([calories, protein, fat, carbs]).astype(np.float32),
+        'bonus': np.zeros(count, dtype=np.float32),
+        'carb_share': (carbs * 4 / calories).astype(np.float32),
+    }
+
+
+class PlanMealsTests(SimpleTestCase):
+    def test_four_weeks_over_100k_candidates(self):
+        candidates = synthetic_candidates(100_000)
+        started = time.perf_counter()
+        plan = plan_meals(candidates, FOUR_WEEKS, MEAL_TYPES, DAILY)
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(plan), len(FOUR_WEEKS) * len(MEAL_TYPES))
+
+        days = defaultdict(lambda: np.zeros(4))
+        for meal_date, _, recipe_id in plan:
+            days[meal_date] += candidates['macros'][recipe_id - 1]
+        miss = np.abs(np.array(list(days.values())) / [DAILY[name] for name in TARGETS] - 1)
+        self.assertLess(miss.max(), 0.05)
+        for meal_date, _, recipe_id in plan:
+            same_day = [r for d, _, r in plan if d == meal_date]
+            self.assertEqual(same_day.count(recipe_id), 1)
+
+    def test_bad_requests(self):
+        candidates = synthetic_candidates(100)
+        cases = [
+            (synthetic_candidates(0), MEAL_TYPES, DAILY),
+            (candidates, [], DAILY),
+            (candidates, MEAL_TYPES, {'protein': 120}),
+        ]
+        for candidates, meal_types, targets in cases:
+            with self.subTest(meal_types=meal_types, targets=targets), self.assertRaises(ValueError):
+                plan_meals(candidates, FOUR_WEEKS[:1], meal_types, targets)
+
+
+class GeneratePlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner-cook')
+        owner = User.objects.create_user('planner-owner')
+        for i in range(40):
+            Recipe.objects.create(
+                user=owner, title=f'Planner Dish {i}', description='', ingredients='1 cup rice', instructions='',
+                calories=300 + 10 * i, protein=10 + i, fat=5 + i % 10, carbs=40 + i,
+                dietary_type='vegan' if i % 2 else 'none', is_shared=True,
+            )
+
+    def test_plan_is_written_in_one_insert_and_respects_preference(self):
+        preference = DietaryPreference.objects.create(user=self.user, vegan=True)
+        with CaptureQueriesContext(connection) as queries:
+            meal_plan = generate_plan(self.user, 'Week', date(2024, 1, 1), date(2024, 1, 7), MEAL_TYPES, DAILY,
+                                      preference)
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT INTO "recipes_mealplanitem"')]
+        self.assertEqual(len(inserts), 1)
+        items = MealPlanItem.objects.filter(meal_plan=meal_plan)
+        self.assertEqual(items.count(), 7 * len(MEAL_TYPES))
+        self.assertEqual(set(items.values_list('recipe__dietary_type', flat=True)), {'vegan'})
+
+    def test_range_limits(self):
+        for start, end in ((date(2024, 1, 2), date(2024, 1, 1)), (date(2024, 1, 1), date(2024, 3, 31))):
+            with self.subTest(start=start, end=end), self.assertRaises(ValueError):
+                generate_plan(self.user, 'Too long', start, end, MEAL_TYPES, DAILY)
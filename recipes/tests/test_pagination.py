@@ -0,0 +1,76 @@
+"""Keyset cursors: round trips, and forged or reused cursors falling back to page 1."""
+import base64
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from recipes.pagination import DEFAULT_KEYS, InvalidCursor, encode_cursor, paginate
+
+
+def forged(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'pagination-tests'}})
+class CursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cursor-cook')
+        for i in range(30):
+            Recipe.objects.create(
+                user=cls.user, title=f'Paneer Dish {i}', description='', ingredients='200 g paneer', instructions='',
+                calories=300 + i, protein=20, fat=10, carbs=30, is_shared=True,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_next_and_prev_round_trip(self):
+        recipes = Recipe.objects.filter(user=self.user)
+        first = paginate(recipes, per_page=10)
+        second = paginate(recipes, first.next_cursor, per_page=10)
+        back = paginate(recipes, second.prev_cursor, per_page=10)
+        self.assertEqual([r.pk for r in back], [r.pk for r in first])
+        self.assertTrue(set(r.pk for r in second).isdisjoint(r.pk for r in first))
+
+    def test_cursor_for_other_keys_is_rejected(self):
+        cursor = encode_cursor([1.5, 10], 'next', ('search_rank', '-id'))
+        with self.assertRaises(InvalidCursor):
+            paginate(Recipe.objects.all(), cursor, keys=DEFAULT_KEYS)
+
+    def test_values_of_the_wrong_type_are_rejected(self):
+        for values in (['x', 'y'], [None, 1], [[1], 2], [{'dt': 5}, 1]):
+            with self.subTest(values=values):
+                cursor = forged({'k': list(DEFAULT_KEYS), 'v': values, 'd': 'next'})
+                with self.assertRaises(InvalidCursor):
+                    paginate(Recipe.objects.all(), cursor)
+
+    def test_forged_cursors_fall_back_to_the_first_page(self):
+        search_cursor = self.client.get('/api/search/', {'q': 'paneer', 'page_size': 5}).json()['next']
+        bad = forged({'v': ['x', 'y'], 'd': 'next'})
+        typed_bad = forged({'k': list(DEFAULT_KEYS), 'v': ['x', 'y'], 'd': 'next'})
+        requests = [
+            ('/api/search/', {'cursor': bad}),
+            ('/api/search/', {'cursor': typed_bad}),
+            ('/api/search/', {'q': 'paneer', 'cursor': typed_bad}),
+            ('/api/search/', {'cursor': search_cursor}),
+            ('/recipes/', {'cursor': typed_bad}),
+            ('/api/favorites/', {'cursor': typed_bad}),
+            ('/api/recipes/filter/', {'cursor': search_cursor}),
+        ]
+        for url, params in requests:
+            with self.subTest(url=url, params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+
+    def test_anonymous_shared_recipes_with_a_search_cursor(self):
+        self.client.logout()
+        page = self.client.get('/shared-recipes/', {'search': 'paneer', 'page_size': 5})
+        cursor = page.context['page'].next_cursor
+        response = self.client.get('/shared-recipes/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['recipes']), 20)
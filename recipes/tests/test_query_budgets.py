@@ -0,0 +1,195 @@
+"""Every route in recipes/urls.py against its @query_budget, on a seeded test database.
+
+The factories seed 2,000 users with 10,000 recipes, 30,000 reviews and two weeks of
+meal plans. A view that starts running a query per row (an N+1) goes over its budget,
+and one that starts scanning the catalogue goes over ``TIME_BUDGET_MS``; either fails
+the suite. Each route is requested in its own rolled-back transaction, with an
+isolated local-memory cache so cached pages and stat bundles never hide queries.
+"""
+import json
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from recipes import async_api_views, urls
+from recipes.factories import seed
+from recipes.models import MealPlan, MealPlanItem, Recipe, ShoppingList, ShoppingListItem
+from recipes.popularity import refresh_trending_scores
+from recipes.recommendations import build_index, get_index, save_index
+
+PASSWORD = 'budget-check-Pa55word'
+
+# Wall-clock budget per request on the seeded dataset. Every route takes well under 25 ms
+# on a developer machine, so this catches a view that starts scanning the catalogue,
+# with headroom for slow CI runners.
+TIME_BUDGET_MS = 250
+
+RECIPE_FORM = {
+    'title': 'Budget Check Dal', 'description': 'Weeknight dal',
+    'ingredients': '1 cup lentils\n1 tsp turmeric\n2 cloves garlic\n1 tbsp ghee',
+    'instructions': 'Simmer\nTemper\nServe', 'calories': 350, 'protein': 18, 'fat': 9,
+    'carbs': 48, 'dietary_type': 'vegetarian', 'is_shared': 'on',
+}
+
+
+def scenarios(fixture):
+    """Route name -> (method, url kwargs, data, who, expected status), or a list of them.
+
+    ``who`` is ``anonymous``, ``member`` (owns the seeded fixture rows) or ``staff``.
+    Views open to everyone are requested both anonymously and signed in, since the
+    session, user and dietary preference lookups count against the same budget.
+    """
+    member = fixture['member']
+    return {
+        'home': [('get', {}, None, 'anonymous', 200), ('get', {}, None, 'member', 200)],
+        'register': ('post', {}, {
+            'username': 'budget-check-new', 'email': 'new@example.com',
+            'password1': 'Tandoori-Onion-47', 'password2': 'Tandoori-Onion-47',
+        }, 'anonymous', 302),
+        'login': ('post', {}, {'username': member.username, 'password': PASSWORD}, 'anonymous', 302),
+        'logout': ('get', {}, None, 'member', 302),
+        'dashboard': ('get', {}, None, 'member', 200),
+        'nutritional_summary': ('get', {}, None, 'member', 200),
+        'my_recipes': ('get', {}, None, 'member', 200),
+        'add_recipe': ('post', {}, RECIPE_FORM, 'member', 302),
+        'view_recipe': [('get', {'pk': fixture['shared_recipe']}, None, 'anonymous', 200),
+                        ('get', {'pk': fixture['shared_recipe']}, None, 'member', 200)],
+        'edit_recipe': ('post', {'pk': fixture['own_recipe']}, RECIPE_FORM, 'member', 302),
+        'delete_recipe': ('post', {'pk': fixture['throwaway_recipe']}, None, 'member', 302),
+        'share_recipe': ('get', {'pk': fixture['shared_recipe']}, None, 'member', 200),
+        'shared_recipes': [('get', {}, None, 'anonymous', 200), ('get', {}, None, 'member', 200)],
+        'toggle_favorite': ('post', {'recipe_id': fixture['shared_recipe']}, None, 'member', 302),
+        'favorite_recipes': ('get', {}, None, 'member', 200),
+        'add_review': ('post', {'recipe_id': fixture['shared_recipe']}, {'rating': 4, 'comment': 'Good'}, 'member', 302),
+        'manage_dietary_preferences': ('post', {}, {'vegetarian': 'on'}, 'member', 302),
+        'meal_plans': ('get', {}, None, 'member', 200),
+        'create_meal_plan': ('post', {}, {'name': 'Budget plan'}, 'member', 302),
+        'generate_meal_plan': ('post', {}, {
+            'name': 'Generated plan', 'start_date': '2024-02-01', 'end_date': '2024-02-28',
+            'meal_types': ['breakfast', 'lunch', 'dinner', 'snack'], 'calories': 2000, 'protein': 120,
+        }, 'member', 302),
+        'view_meal_plan': ('get', {'pk': fixture['meal_plan']}, None, 'member', 200),
+        'add_meal_plan_item': ('post', {'meal_plan_id': fixture['meal_plan']}, {
+            'recipe_id': fixture['own_recipe'], 'meal_date': '2024-01-01', 'meal_type': 'lunch',
+        }, 'member', 302),
+        'delete_meal_plan_item': ('post', {'item_id': fixture['throwaway_meal_item']}, None, 'member', 302),
+        'generate_shopping_list': ('get', {'meal_plan_id': fixture['meal_plan']}, None, 'member', 302),
+        'shopping_lists': ('get', {}, None, 'member', 200),
+        'create_shopping_list': ('post', {}, {'name': 'Budget list'}, 'member', 302),
+        'view_shopping_list': ('get', {'pk': fixture['shopping_list']}, None, 'member', 200),
+        'add_shopping_item': ('post', {'shopping_list_id': fixture['shopping_list']},
+                              {'item_name': 'Rice', 'quantity': '1 kg'}, 'member', 302),
+        'delete_shopping_item': ('post', {'item_id': fixture['throwaway_list_item']}, None, 'member', 302),
+        'toggle_shopping_item': ('post', {'item_id': fixture['list_item']}, None, 'member', 302),
+        'api_favorites': ('get', {}, None, 'member', 200),
+        'api_recipe_details': ('get', {'recipe_id': fixture['shared_recipe']}, None, 'member', 200),
+        'api_user_stats': ('get', {}, None, 'member', 200),
+        'api_cache_stats': ('get', {}, None, 'staff', 200),
+        'api_search_recipes': ('get', {}, {'q': 'paneer'}, 'member', 200),
+        'api_filter_recipes': ('get', {}, {'calories_max': 500, 'protein_pct_min': 30, 'dietary_type': 'vegetarian'},
+                               'member', 200),
+        'api_trending': ('get', {}, None, 'member', 200),
+        'api_recommendations': ('get', {}, None, 'member', 200),
+        'api_toggle_favorite': ('post', {'recipe_id': fixture['shared_recipe']}, None, 'member', 200),
+        'api_add_review': ('post', {'recipe_id': fixture['shared_recipe']},
+                           json.dumps({'rating': 5, 'comment': 'Great'}), 'member', 200),
+        'api_meal_plan_nutrition': ('get', {'meal_plan_id': fixture['meal_plan']}, None, 'member', 200),
+    }
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budgets'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(users=2000, recipes_per_user=5, reviews_per_recipe=3, days_per_plan=14,
+                      username_prefix='budget-check-')
+        refresh_trending_scores()
+        # Build and load the recommendation index outside the measured requests, as the command would
+        index_path = os.path.join(cls.enterClassContext(tempfile.TemporaryDirectory()), 'recommendations.npz')
+        cls.enterClassContext(override_settings(RECOMMENDATIONS={'INDEX_PATH': index_path}))
+        save_index(build_index(), index_path)
+        get_index()
+
+        member = User.objects.get(pk=result.user_ids[0])
+        member.set_password(PASSWORD)
+        member.save(update_fields=['password'])
+        own_recipe = Recipe.objects.filter(user=member).order_by('id').first()
+        meal_plan = MealPlan.objects.filter(user=member).order_by('id').first()
+        shopping_list = ShoppingList.objects.filter(user=member).order_by('id').first()
+        cls.fixture = {
+            'member': member,
+            'staff': User.objects.create_user('budget-check-staff', password=PASSWORD, is_staff=True),
+            'own_recipe': own_recipe.pk,
+            'throwaway_recipe': Recipe.objects.create(
+                user=member, title='Throwaway', description='', ingredients='1 onion', instructions='',
+                calories=50, protein=1, fat=0, carbs=10,
+            ).pk,
+            # The most reviewed recipe someone else shared is the heaviest detail page
+            'shared_recipe': Recipe.objects.filter(is_shared=True).exclude(user=member)
+            .order_by('-review_count', 'id').first().pk,
+            'meal_plan': meal_plan.pk,
+            'throwaway_meal_item': MealPlanItem.objects.create(
+                meal_plan=meal_plan, recipe=own_recipe, meal_date='2024-01-02', meal_type='dinner',
+            ).pk,
+            'shopping_list': shopping_list.pk,
+            'list_item': ShoppingListItem.objects.filter(shopping_list=shopping_list).order_by('id').first().pk,
+            'throwaway_list_item': ShoppingListItem.objects.create(shopping_list=shopping_list, item_name='Salt').pk,
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, url, method, data):
+        if isinstance(data, str):
+            return self.client.post(url, data, content_type='application/json')
+        return getattr(self.client, method)(url, data)
+
+    def check_routes(self):
+        routes = scenarios(self.fixture)
+        names = [pattern.name for pattern in urls.urlpatterns]
+        self.assertEqual([name for name in names if name not in routes], [], 'routes without a budget scenario')
+        for name in names:
+            cases = routes[name] if isinstance(routes[name], list) else [routes[name]]
+            for method, kwargs, data, who, expected in cases:
+                with self.subTest(route=name, who=who):
+                    self.check_route(name, method, kwargs, data, who, expected)
+
+    def check_route(self, name, method, kwargs, data, who, expected):
+        url = reverse(name, kwargs=kwargs)
+        budget = getattr(resolve(url).func, 'query_budget', None)
+        self.assertIsNotNone(budget, f'{name} has no @query_budget')
+        with transaction.atomic():
+            if who != 'anonymous':
+                self.client.force_login(self.fixture[who])
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self.request(url, method, data)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        self.client.logout()
+        cache.clear()
+        self.assertEqual(response.status_code, expected)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{name} ran {len(queries)} queries, budget {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        self.assertLess(elapsed_ms, TIME_BUDGET_MS, f'{name} took {elapsed_ms:.0f} ms, budget {TIME_BUDGET_MS} ms')
+
+    def test_routes_within_budget(self):
+        self.check_routes()
+
+    @override_settings(ROOT_URLCONF='recipes.tests.async_urls')
+    def test_async_api_routes_within_budget(self):
+        self.assertEqual(resolve(reverse('api_trending')).func.__module__, async_api_views.__name__)
+        self.check_routes()
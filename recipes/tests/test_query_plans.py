@@ -0,0 +1,96 @@
+"""EXPLAIN QUERY PLAN regression tests for the hot queries in views.py and api_views.py.
+
+Each entry mirrors the queryset a view builds. A plan that scans a table without an
+index, or sorts through a temporary B-tree, means an index from the Meta.indexes
+audit is missing or no longer matches the query shape. Queries in SORTS_MATCHES are
+allowed to sort: they are driven by a selective lookup (full-text match, ingredient
+join) and only the matched rows are ordered.
+"""
+import re
+from datetime import date
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.models import (
+    Recipe, FavoriteRecipe, RecipeReview, MealPlan, MealPlanItem, ShoppingList, ShoppingListItem, DietaryPreference,
+)
+from recipes.pagination import DEFAULT_KEYS, _boundary_filter
+from recipes.allergens import exclude_unsafe
+from recipes.ingredients import with_ingredient
+from recipes.search import search_recipes
+from recipes.popularity import trending_recipes
+
+FULL_SCAN_RE = re.compile(r'^SCAN (?!.*\b(USING (COVERING )?INDEX|VIRTUAL TABLE)\b)')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+RATING_KEYS = ('-avg_rating', '-created_at', '-id')
+ALLERGY_PREFERENCE = DietaryPreference(nut_allergy=True, dairy_free=True, custom_restrictions='shellfish')
+
+SORTS_MATCHES = {'shared_recipes search', 'api_search_recipes by ingredient'}
+
+
+def after(queryset, keys, values):
+    return queryset.filter(_boundary_filter(keys, values, True)).order_by(*keys)
+
+
+def hot_queries(user_id=1, recipe_id=1, meal_plan_id=1, shopping_list_id=1):
+    now = timezone.now()
+    shared = Recipe.objects.filter(is_shared=True)
+    own = Recipe.objects.filter(user_id=user_id)
+    favorites = FavoriteRecipe.objects.filter(user_id=user_id).select_related('recipe')
+    return {
+        'home': shared.order_by('-created_at')[:6],
+        'home trending': trending_recipes(6).select_related('user'),
+        'api_trending': trending_recipes(10),
+        'refresh_trending favorites': FavoriteRecipe.objects.filter(created_at__gte=now, recipe__is_shared=True),
+        'refresh_trending reviews': RecipeReview.objects.filter(created_at__gte=now, recipe__is_shared=True),
+        'refresh_trending stale scores': shared.filter(trending_score__gt=0).values_list('id'),
+        'shared_recipes': shared.order_by(*DEFAULT_KEYS)[:21],
+        'shared_recipes next page': after(shared, DEFAULT_KEYS, [now, recipe_id])[:21],
+        'shared_recipes allergen-safe': exclude_unsafe(shared, ALLERGY_PREFERENCE).order_by(*DEFAULT_KEYS)[:21],
+        'api_filter_recipes by calories': shared.filter(calories__lte=500).order_by('calories', 'id')[:21],
+        'api_filter_recipes by protein share': shared.filter(protein_pct__gte=30, calories__lte=500).order_by('-protein_pct', '-id')[:21],
+        'api_filter_recipes by carb share': shared.filter(carbs_pct__lte=20).order_by('carbs_pct', 'id')[:21],
+        'api_filter_recipes dietary by calories': shared.filter(dietary_type='vegan', calories__range=(200, 400)).order_by('calories', 'id')[:21],
+        'shared_recipes dietary': shared.filter(dietary_type='vegan').order_by(*DEFAULT_KEYS)[:21],
+        'shared_recipes dietary next page': after(shared.filter(dietary_type='vegan'), DEFAULT_KEYS, [now, recipe_id])[:21],
+        'shared_recipes by rating': shared.filter(avg_rating__isnull=False).order_by(*RATING_KEYS)[:21],
+        'shared_recipes by rating next page': after(shared.filter(avg_rating__isnull=False), RATING_KEYS, [4.5, now, recipe_id])[:21],
+        'shared_recipes search': search_recipes(shared, 'paneer')[:21],
+        'api_search_recipes by ingredient': with_ingredient(shared, 'paneer').order_by(*DEFAULT_KEYS)[:21],
+        'api_recipe_details ingredients': Recipe(pk=recipe_id).recipe_ingredients.select_related('ingredient'),
+        'my_recipes': own.order_by(*DEFAULT_KEYS)[:21],
+        'my_recipes next page': after(own, DEFAULT_KEYS, [now, recipe_id])[:21],
+        'my_recipes dietary': own.filter(dietary_type='vegan').order_by(*DEFAULT_KEYS)[:21],
+        'favorite_recipes': favorites.order_by(*DEFAULT_KEYS)[:21],
+        'favorite_recipes next page': after(favorites, DEFAULT_KEYS, [now, recipe_id])[:21],
+        'view_recipe reviews': RecipeReview.objects.filter(recipe_id=recipe_id).select_related('reviewer'),
+        'view_recipe is_favorite': FavoriteRecipe.objects.filter(user_id=user_id, recipe_id=recipe_id),
+        'view_meal_plan items': MealPlanItem.objects.filter(meal_plan_id=meal_plan_id).order_by('meal_date', 'meal_type'),
+        'meal_plan day': MealPlanItem.objects.filter(meal_plan_id=meal_plan_id, meal_date=date.today()),
+        'view_shopping_list items': ShoppingListItem.objects.filter(shopping_list_id=shopping_list_id),
+        'dashboard recent meal plans': MealPlan.objects.filter(user_id=user_id).order_by('-created_at')[:5],
+        'dashboard recent shopping lists': ShoppingList.objects.filter(user_id=user_id).order_by('-created_at')[:5],
+    }
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'checks SQLite EXPLAIN QUERY PLAN output')
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in hot_queries().items():
+            with self.subTest(query=name):
+                plan = explain(queryset)
+                may_sort = name in SORTS_MATCHES
+                bad = [line for line in plan if FULL_SCAN_RE.search(line) or (TEMP_SORT_RE.search(line) and not may_sort)]
+                self.assertEqual(bad, [], f'{name} plan:\n' + '\n'.join(plan))
@@ -0,0 +1,77 @@
+"""Review aggregates on Recipe: incremental maintenance on every review write, and reconcile."""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from recipes.models import Recipe, RecipeReview
+from recipes.ratings import reconcile_rating_stats
+
+
+class RatingStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('rating-owner')
+        cls.reviewers = [User.objects.create_user(f'rating-reviewer-{i}') for i in range(3)]
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            user=self.owner, title='Rated Dal', description='', ingredients='1 cup lentils', instructions='',
+            calories=300, protein=15, fat=5, carbs=40, is_shared=True,
+        )
+
+    def review(self, reviewer, rating):
+        return RecipeReview.objects.create(recipe=self.recipe, reviewer=reviewer, rating=rating)
+
+    def assert_stats(self, rating_sum, review_count, avg_rating):
+        self.recipe.refresh_from_db()
+        self.assertEqual((self.recipe.rating_sum, self.recipe.review_count), (rating_sum, review_count))
+        if avg_rating is None:
+            self.assertIsNone(self.recipe.avg_rating)
+        else:
+            self.assertAlmostEqual(self.recipe.avg_rating, avg_rating)
+
+    def test_create_update_and_delete(self):
+        first = self.review(self.reviewers[0], 5)
+        self.review(self.reviewers[1], 2)
+        self.assert_stats(7, 2, 3.5)
+
+        first.rating = 3
+        first.save()
+        self.assert_stats(5, 2, 2.5)
+
+        # An instance that was never loaded has no stored rating to diff against
+        unloaded = RecipeReview(pk=first.pk, recipe=self.recipe, reviewer=self.reviewers[0], rating=4)
+        unloaded.save(update_fields=['rating'])
+        self.assert_stats(6, 2, 3.0)
+
+        RecipeReview.objects.get(pk=first.pk).delete()
+        self.assert_stats(2, 1, 2.0)
+        RecipeReview.objects.filter(recipe=self.recipe).get().delete()
+        self.assert_stats(0, 0, None)
+
+    def test_cascade_from_a_deleted_reviewer(self):
+        self.review(self.reviewers[0], 4)
+        self.review(self.reviewers[1], 2)
+        self.reviewers[0].delete()
+        self.assert_stats(2, 1, 2.0)
+
+    def test_delete_on_drifted_aggregates_recomputes(self):
+        review = self.review(self.reviewers[0], 5)
+        self.review(self.reviewers[1], 4)
+        Recipe.objects.filter(pk=self.recipe.pk).update(rating_sum=1, review_count=0, avg_rating=None)
+        review.delete()
+        self.assert_stats(4, 1, 4.0)
+
+    def test_reconcile_finds_every_kind_of_drift(self):
+        self.review(self.reviewers[0], 5)
+        self.review(self.reviewers[1], 3)
+        self.assertEqual(reconcile_rating_stats(), 0)
+        for drift in ({'rating_sum': 7}, {'review_count': 3}, {'avg_rating': 1.0}, {'avg_rating': None}):
+            with self.subTest(drift=drift):
+                Recipe.objects.filter(pk=self.recipe.pk).update(**drift)
+                self.assertEqual(reconcile_rating_stats(), 1)
+                self.assert_stats(8, 2, 4.0)
+
+    def test_reconcile_clears_the_average_of_unreviewed_recipes(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(avg_rating=4.5)
+        self.assertEqual(reconcile_rating_stats(Recipe.objects.filter(pk=self.recipe.pk)), 1)
+        self.assert_stats(0, 0, None)
@@ -0,0 +1,77 @@
+"""Recommendations come from the prebuilt index file and are never built on a request."""
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+
+from recipes import recommendations
+from recipes.models import DietaryPreference, FavoriteRecipe, Recipe
+from recipes.recommendations import build_index, recommend, save_index
+
+
+class RecommendationIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('rec-owner')
+        cls.user = User.objects.create_user('rec-cook')
+        for i, dietary_type in enumerate(['vegan', 'vegetarian', 'none'] * 3):
+            recipe = Recipe.objects.create(
+                user=owner, title=f'Rec Dish {i}', description='', ingredients='1 cup rice\n1 onion',
+                instructions='', calories=300 + i, protein=10, fat=5, carbs=40,
+                dietary_type=dietary_type, is_shared=True,
+            )
+            if i == 0:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+        DietaryPreference.objects.create(user=cls.user, vegan=True)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recommendations.npz')
+        self.enterContext(override_settings(RECOMMENDATIONS={'INDEX_PATH': self.path}))
+        self.enterContext(mock.patch.dict(recommendations._loaded, index=None, checked=0.0, mtime=None, warned=False))
+
+    def test_missing_index_gives_no_recommendations(self):
+        with mock.patch.object(recommendations, 'build_index') as build, \
+                self.assertLogs('recipes.recommendations', 'WARNING') as logs:
+            self.assertEqual(recommend(self.user), [])
+            self.assertEqual(recommend(self.user), [])
+        build.assert_not_called()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('build_recommendation_index', logs.output[0])
+
+        self.client.force_login(self.user)
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recommended_recipes'], [])
+
+    def test_dashboard_applies_the_loaded_preference(self):
+        save_index(build_index(), self.path)
+        self.client.force_login(self.user)
+        recommended = self.client.get('/dashboard/').context['recommended_recipes']
+        self.assertEqual(len(recommended), 2)
+        self.assertEqual({recipe.dietary_type for recipe in recommended}, {'vegan'})
+
+    def test_links_of_recipes_shared_after_the_recipe_read_are_dropped(self):
+        owner = User.objects.get(username='rec-owner')
+        # Unshared for now: shared between the recipe read and the link read below
+        late = Recipe.objects.create(
+            user=owner, title='Late Dish', description='', ingredients='1 cup rice', instructions='',
+            calories=300, protein=10, fat=5, carbs=40, dietary_type='vegan',
+        )
+        iterator = QuerySet.iterator
+        calls = []
+
+        def share_between_reads(queryset, *args, **kwargs):
+            yield from iterator(queryset, *args, **kwargs)
+            if not calls:
+                calls.append(queryset)
+                Recipe.objects.filter(pk=late.pk).update(is_shared=True)
+
+        with mock.patch.object(QuerySet, 'iterator', share_between_reads):
+            index = build_index()
+        self.assertNotIn(late.pk, index['ids'])
+        self.assertEqual(len(index['link_rows']), 9 * 2)
@@ -0,0 +1,61 @@
+"""Full-text recipe search on SQLite: matching, bm25 ranking, prefixes and trigger sync."""
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Value
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.search import build_fts_query, search_recipes
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 index is SQLite only')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('search-owner')
+        cls.recipes = {}
+        for key, title, description, ingredients in [
+            ('title', 'Paneer Tikka', 'Grilled and smoky', '200 g cottage cheese\n1 cup yogurt'),
+            ('description', 'Spinach Curry', 'Best with paneer cubes stirred in', '2 cups spinach'),
+            ('ingredients', 'Vegetable Pulao', 'One pot rice', '2 cups rice\n100 g paneer'),
+            ('other', 'Chitranna', 'Tangy lemon rice', '2 cups rice\n1 lemon'),
+        ]:
+            cls.recipes[key] = Recipe.objects.create(
+                user=owner, title=title, description=description, ingredients=ingredients, instructions='',
+                calories=300, protein=10, fat=5, carbs=40, is_shared=True,
+            )
+
+    def search(self, text):
+        return list(search_recipes(Recipe.objects.all(), text).values_list('title', flat=True))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('paneer'), ['Paneer Tikka', 'Spinach Curry', 'Vegetable Pulao'])
+
+    def test_every_word_must_match_and_the_last_is_a_prefix(self):
+        self.assertEqual(build_fts_query('Paneer, tik'), '"paneer" "tik"*')
+        self.assertEqual(build_fts_query(' !! '), '')
+        self.assertEqual(self.search('pan'), ['Paneer Tikka', 'Spinach Curry', 'Vegetable Pulao'])
+        self.assertEqual(self.search('rice lem'), ['Chitranna'])
+        self.assertEqual(self.search('pan lemon'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        recipe = self.recipes['other']
+        recipe.title = 'Lemon Quinoa'
+        recipe.save()
+        self.assertEqual(self.search('quinoa'), ['Lemon Quinoa'])
+        self.assertEqual(self.search('chitranna'), [])
+
+        Recipe.objects.filter(pk=self.recipes['title'].pk).update(description='Now with saffron')
+        self.assertEqual(self.search('saffron'), ['Paneer Tikka'])
+        self.assertEqual(self.search('smoky'), [])
+
+        self.recipes['ingredients'].delete()
+        self.assertEqual(self.search('paneer'), ['Paneer Tikka', 'Spinach Curry'])
+
+    def test_vendor_comes_from_the_queryset_database(self):
+        # A replica on another vendor gets the portable fallback, whatever the default database is
+        with mock.patch('recipes.search.connections', {'replica': mock.Mock(vendor='postgresql')}):
+            results = search_recipes(Recipe.objects.using('replica'), 'paneer')
+        self.assertIsInstance(results.query.annotations['search_rank'], Value)
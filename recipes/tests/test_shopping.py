@@ -0,0 +1,57 @@
+"""Shopping lists merge a meal plan's ingredients in a fixed number of queries."""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from recipes.models import MealPlan, MealPlanItem, Recipe
+from recipes.shopping import UNQUANTIFIED, generate_shopping_list, merge_meal_plan_ingredients
+
+MEAL_TYPES = [meal_type for meal_type, _ in MealPlanItem.MEAL_TYPES]
+
+
+class ShoppingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopping-cook')
+        cls.recipes = [
+            Recipe.objects.create(
+                user=cls.user, title=f'Shopping Dish {i}', description='', ingredients=ingredients,
+                instructions='', calories=400, protein=20, fat=10, carbs=50,
+            )
+            for i, ingredients in enumerate([
+                '2 onions\n1 cup rice\nSalt',
+                'Onions, to taste\n1/2 cup rice',
+                '1 large onion\n3 cloves garlic',
+            ])
+        ]
+
+    def plan(self, days):
+        meal_plan = MealPlan.objects.create(user=self.user, name=f'{days} days')
+        MealPlanItem.objects.bulk_create([
+            MealPlanItem(meal_plan=meal_plan, recipe=self.recipes[(day + n) % len(self.recipes)],
+                         meal_date=date(2024, 1, 1) + timedelta(days=day), meal_type=meal_type)
+            for day in range(days)
+            for n, meal_type in enumerate(MEAL_TYPES)
+        ])
+        return meal_plan
+
+    def test_unquantified_lines_are_kept_as_their_own_item(self):
+        meal_plan = MealPlan.objects.create(user=self.user, name='Mixed')
+        for recipe, meal_type in zip(self.recipes, MEAL_TYPES):
+            MealPlanItem.objects.create(meal_plan=meal_plan, recipe=recipe, meal_date=date(2024, 1, 1),
+                                        meal_type=meal_type)
+        self.assertEqual(merge_meal_plan_ingredients(meal_plan), [
+            ('Garlic', '3 clove'),
+            ('Onion', '3'),
+            ('Onion', UNQUANTIFIED),
+            ('Rice', '1.5 cup'),
+            ('Salt', UNQUANTIFIED),
+        ])
+
+    def test_query_count_does_not_grow_with_the_plan(self):
+        for days in (1, 7, 28):
+            meal_plan = self.plan(days)
+            with self.subTest(days=days), self.assertNumQueries(5):
+                shopping_list = generate_shopping_list(meal_plan)
+            self.assertEqual(shopping_list.items.count(), 5)
@@ -0,0 +1,44 @@
+"""Cached user stat bundles are dropped once the owner's rows change and the change commits."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import MealPlan, Recipe, ShoppingList
+from recipes.stats import get_user_stats, stats_key
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'stats-tests'}})
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stats-cook')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_follow_creates_and_deletes_after_commit(self):
+        self.assertEqual(get_user_stats(self.user.id)['total_meal_plans'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            meal_plan = MealPlan.objects.create(user=self.user, name='Week')
+            self.assertIsNotNone(cache.get(stats_key(self.user.id)), 'dropped before commit')
+        self.assertIsNone(cache.get(stats_key(self.user.id)))
+        self.assertEqual(get_user_stats(self.user.id)['total_meal_plans'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meal_plan.delete()
+        self.assertEqual(get_user_stats(self.user.id)['total_meal_plans'], 0)
+
+    def test_updates_keep_the_bundle(self):
+        shopping_list = ShoppingList.objects.create(user=self.user, name='Groceries')
+        Recipe.objects.create(
+            user=self.user, title='Stats Dal', description='', ingredients='1 cup lentils', instructions='',
+            calories=300, protein=15, fat=5, carbs=40,
+        )
+        self.assertEqual(get_user_stats(self.user.id)['total_recipes'], 1)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            shopping_list.name = 'Weekly groceries'
+            shopping_list.save()
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_stats(self.user.id)['total_shopping_lists'], 1)
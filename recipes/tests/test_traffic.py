@@ -0,0 +1,34 @@
+"""Traffic recordings keep the parameters replay needs and redact the rest."""
+from urllib.parse import parse_qs
+
+from django.test import SimpleTestCase
+from django.test.client import RequestFactory
+
+from recipeapp.traffic import REDACTED, _values, build_environs, sanitize
+
+
+class RecordingTests(SimpleTestCase):
+    def test_listing_and_form_params_are_kept(self):
+        request = RequestFactory().get('/api/recipes/filter/', {
+            'calories_max': '500', 'protein_pct_min': '30', 'cursor': 'abc', 'limit': '5', 'format': 'ndjson',
+            'sort': 'protein', 'rating': '4_plus', 'reviews': 'yes', 'q': 'paneer',
+        })
+        query = sanitize(_values(request.GET))
+        self.assertEqual(query.pop('q'), REDACTED)
+        self.assertNotIn(REDACTED, query.values())
+
+    def test_multi_valued_params_survive_replay(self):
+        request = RequestFactory().post('/meal-plans/generate/', {
+            'name': 'Week', 'start_date': '2024-02-01', 'end_date': '2024-02-28',
+            'meal_types': ['breakfast', 'dinner'], 'password': 'secret',
+        })
+        data = sanitize(_values(request.POST))
+        self.assertEqual(data, {
+            'name': REDACTED, 'start_date': '2024-02-01', 'end_date': '2024-02-28', 'meal_types': ['breakfast', 'dinner'],
+        })
+
+        entry = {'url_name': 'generate_meal_plan', 'method': 'POST', 'kwargs': {}, 'user': 'anonymous', 'data': data}
+        [(_, environ)] = build_environs([entry], {})
+        body = parse_qs(environ['wsgi.input'].read(int(environ['CONTENT_LENGTH'])).decode())
+        self.assertEqual(body['meal_types'], ['breakfast', 'dinner'])
+        self.assertEqual(body['name'], ['replay'])
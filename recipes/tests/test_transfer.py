@@ -0,0 +1,57 @@
+"""Recipe import and export: a lossless round trip and validation of every imported row."""
+import io
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from recipes.transfer import RECIPE_FIELDS, export_rows, import_recipes, read_rows, write_rows
+
+VALID = {
+    'title': 'Imported Dal', 'description': 'Yellow lentils', 'ingredients': '1 cup lentils\n1 onion',
+    'instructions': 'Simmer.', 'calories': 320, 'protein': 18.5, 'fat': 6, 'carbs': 45,
+    'dietary_type': 'vegan', 'is_shared': True,
+}
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'transfer-tests'}})
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('transfer-cook')
+
+    def rows(self, *rows):
+        return list(enumerate(rows, 1))
+
+    def test_export_then_import_round_trip(self):
+        for i, dietary_type in enumerate(['none', 'vegan', 'gluten_free']):
+            Recipe.objects.create(user=self.user, **{
+                **VALID, 'title': f'Exported {i}, "quoted"', 'dietary_type': dietary_type, 'is_shared': bool(i % 2),
+            })
+        original = list(Recipe.objects.order_by('title').values_list(*RECIPE_FIELDS, 'allergens', 'protein_pct'))
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                out = io.StringIO()
+                self.assertEqual(write_rows(export_rows(Recipe.objects.all()), out, fmt), 3)
+                Recipe.objects.all().delete()
+                result = import_recipes(read_rows(io.StringIO(out.getvalue()), fmt))
+                self.assertEqual((result.created, result.errors), (3, []))
+                imported = Recipe.objects.filter(user=self.user).order_by('title')
+                self.assertEqual(list(imported.values_list(*RECIPE_FIELDS, 'allergens', 'protein_pct')), original)
+                self.assertEqual(imported.filter(recipe_ingredients__ingredient__name='onion').count(), 3)
+
+    def test_invalid_rows_are_reported_and_not_imported(self):
+        result = import_recipes(self.rows(
+            {**VALID, 'calories': -5},
+            {**VALID, 'protein': -1},
+            {**VALID, 'dietary_type': 'carnivore'},
+            {**VALID, 'title': ''},
+            VALID,
+        ), default_username=self.user.username)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _ in result.errors], [1, 2, 3, 4])
+        self.assertIn('calories:', result.errors[0][1])
+        self.assertIn('protein:', result.errors[1][1])
+        self.assertIn('dietary_type:', result.errors[2][1])
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Imported Dal'])
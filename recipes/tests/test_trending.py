@@ -0,0 +1,46 @@
+"""Trending refreshes only invalidate the catalogue cache when the shown list changes."""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.catalogue import catalogue_state
+from recipes.models import FavoriteRecipe, Recipe
+from recipes.popularity import refresh_trending_scores, trending_recipes
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'trending-tests'}})
+class TrendingRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('trend-owner')
+        cls.fans = [User.objects.create_user(f'trend-fan-{i}') for i in range(3)]
+        cls.recipes = [
+            Recipe.objects.create(
+                user=owner, title=f'Trend Dish {i}', description='', ingredients='1 onion', instructions='',
+                calories=200, protein=5, fat=5, carbs=30, is_shared=True,
+            )
+            for i in range(3)
+        ]
+        for recipe, fans in zip(cls.recipes, (3, 2, 1)):
+            for fan in cls.fans[:fans]:
+                FavoriteRecipe.objects.create(user=fan, recipe=recipe)
+
+    def test_decay_alone_keeps_the_cached_pages(self):
+        now = timezone.now()
+        refresh_trending_scores(now=now)
+        version = catalogue_state()['version']
+        refresh_trending_scores(now=now + timedelta(hours=6))
+        self.assertEqual(catalogue_state()['version'], version)
+
+    def test_a_new_order_invalidates_them(self):
+        refresh_trending_scores()
+        version = catalogue_state()['version']
+        last = self.recipes[-1]
+        for fan in self.fans[1:]:
+            FavoriteRecipe.objects.create(user=fan, recipe=last)
+        refresh_trending_scores()
+        self.assertEqual(trending_recipes(1).get(), last)
+        self.assertNotEqual(catalogue_state()['version'], version)
@@ -0,0 +1,186 @@
+"""Streaming bulk import and export of recipes as JSONL or CSV.
+
+Rows flow through generators one batch at a time, so memory stays bounded by the batch
+size plus the ``(user, title)`` key map used to spot duplicates. Each row is cleaned
+with the field rules of ``RecipeForm`` and then ``Recipe.full_clean``, as a form save
+would, and each batch is written with ``bulk_create`` (and ``bulk_update`` for replaced
+duplicates) in its own transaction. bulk writes skip
+model signals and ``Recipe.save``, so the derived columns, structured ingredient rows,
+user stats and catalogue version they maintain are updated explicitly.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .batching import chunked
+from .catalogue import bump_catalogue_version
+from .forms import RecipeForm
+from .ingredients import build_recipe_ingredients, sync_recipe_ingredients
+from .models import Recipe, RecipeIngredient
+from .stats import invalidate_user_stats
+
+RECIPE_FIELDS = list(RecipeForm.Meta.fields)
+EXPORT_FIELDS = ['username', *RECIPE_FIELDS]
+FORMATS = ('jsonl', 'csv')
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+
+def detect_format(path, default='jsonl'):
+    for fmt in FORMATS:
+        if path.endswith(f'.{fmt}'):
+            return fmt
+    return default
+
+
+def read_rows(lines, fmt):
+    """Yield ``(line_number, row_dict)`` from an iterable of text lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValidationError(f'Invalid JSON: {e}')
+            continue
+        yield number, row if isinstance(row, dict) else ValidationError('Expected a JSON object')
+
+
+def clean_row(row, fields):
+    """Clean one row as RecipeForm would: its field rules, then the model's own validation."""
+    data, errors = {}, {}
+    for name, form_field in fields.items():
+        try:
+            data[name] = form_field.clean(row.get(name))
+        except ValidationError as e:
+            errors[name] = e.messages
+    if not errors:
+        # Field validators (e.g. non-negative macros) live on the model, not the form fields
+        try:
+            Recipe(**data).full_clean(exclude=['user'], validate_unique=False)
+        except ValidationError as e:
+            errors = e.message_dict
+    if errors:
+        raise ValidationError([f'{name}: {message}' for name, messages in errors.items() for message in messages])
+    return data
+
+
+def import_recipes(rows, default_username=None, on_duplicate='skip', batch_size=2000, progress=None):
+    """Import ``(line_number, row)`` pairs; see the module docstring for the approach.
+
+    Rows are matched to existing recipes on ``(user, title)``; duplicates are skipped or,
+    with ``on_duplicate='update'``, replace the stored recipe in place so its id,
+    reviews and favorites are kept.
+    """
+    fields = RecipeForm().fields
+    result = ImportResult()
+    user_ids = {}
+    loaded_users = set()
+    keys = {}
+    touched_users = set()
+    catalogue_changed = False
+
+    for batch in chunked(rows, batch_size):
+        cleaned = []
+        for number, row in batch:
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                cleaned.append((number, row.get('username') or default_username, clean_row(row, fields)))
+            except ValidationError as e:
+                result.errors.append((number, '; '.join(e.messages)))
+
+        usernames = {username for _, username, _ in cleaned if username and username not in user_ids}
+        user_ids.update(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        new_users = {user_ids[name] for _, name, _ in cleaned if name in user_ids} - loaded_users
+        keys.update(
+            ((user_id, title), pk)
+            for pk, user_id, title in Recipe.objects.filter(user_id__in=new_users).values_list('id', 'user_id', 'title')
+        )
+        loaded_users |= new_users
+
+        pending, to_update = {}, {}
+        for number, username, data in cleaned:
+            user_id = user_ids.get(username)
+            if user_id is None:
+                result.errors.append((number, f'Unknown user {username!r}' if username else 'No username'))
+                continue
+            key = (user_id, data['title'])
+            if key in pending:
+                target = pending[key]
+            elif key in to_update:
+                target = to_update[key]
+            elif key in keys:
+                target = Recipe(pk=keys[key], user_id=user_id)
+            else:
+                pending[key] = Recipe(user_id=user_id, **data)
+                continue
+            if on_duplicate != 'update':
+                result.skipped += 1
+                continue
+            if target.pk is not None and key not in to_update:
+                to_update[key] = target
+                result.updated += 1
+            for name, value in data.items():
+                setattr(target, name, value)
+
+        for recipe in (*pending.values(), *to_update.values()):
+            recipe.set_derived_fields()
+        with transaction.atomic():
+            created = Recipe.objects.bulk_create(pending.values())
+            RecipeIngredient.objects.bulk_create(build_recipe_ingredients(created), batch_size=batch_size)
+            if to_update:
+                now = timezone.now()
+                for recipe in to_update.values():
+                    recipe.updated_at = now
+                Recipe.objects.bulk_update(to_update.values(), [*RECIPE_FIELDS, *Recipe.DERIVED_FIELDS, 'updated_at'], batch_size=500)
+                sync_recipe_ingredients(to_update.values())
+        keys.update(((recipe.user_id, recipe.title), recipe.pk) for recipe in created)
+        result.created += len(created)
+        touched_users.update(recipe.user_id for recipe in created)
+        catalogue_changed = catalogue_changed or bool(to_update) or any(recipe.is_shared for recipe in created)
+        if progress:
+            progress(result)
+
+    for user_id in touched_users:
+        invalidate_user_stats(user_id)
+    if catalogue_changed:
+        bump_catalogue_version()
+    return result
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Yield export dicts for a Recipe queryset, streaming it from the database."""
+    rows = queryset.order_by('id').values_list('user__username', *RECIPE_FIELDS)
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_FIELDS, values))
+
+
+def write_rows(rows, out, fmt):
+    """Write export dicts to a text stream; returns the number written."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+        return count
+    for count, row in enumerate(rows, 1):
+        out.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return count
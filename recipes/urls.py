@@ -1,5 +1,9 @@
 from django.urls import path
-from . import views, api_views
+from django.conf import settings
+
+from . import views, api_views, async_api_views
+
+api = async_api_views if settings.ASYNC_API_VIEWS else api_views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -30,6 +34,7 @@ urlpatterns = [
     # Meal Plans
     path('meal-plans/', views.meal_plans, name='meal_plans'),
     path('meal-plans/create/', views.create_meal_plan, name='create_meal_plan'),
+    path('meal-plans/generate/', views.generate_meal_plan, name='generate_meal_plan'),
     path('meal-plans/<int:pk>/', views.view_meal_plan, name='view_meal_plan'),
     path('meal-plans/<int:meal_plan_id>/add-item/', views.add_meal_plan_item, name='add_meal_plan_item'),
     path('meal-plan-items/<int:item_id>/delete/', views.delete_meal_plan_item, name='delete_meal_plan_item'),
@@ -44,11 +49,15 @@ urlpatterns = [
     path('shopping-list-items/<int:item_id>/delete/', views.delete_shopping_item, name='delete_shopping_item'),
     path('shopping-list-items/<int:item_id>/toggle/', views.toggle_shopping_item, name='toggle_shopping_item'),
     
-    path('api/favorites/', api_views.api_favorite_recipes, name='api_favorites'),
-    path('api/recipes/<int:recipe_id>/', api_views.api_recipe_details, name='api_recipe_details'),
-    path('api/stats/', api_views.api_user_stats, name='api_user_stats'),
-    path('api/search/', api_views.api_search_recipes, name='api_search_recipes'),
-    path('api/recipes/<int:recipe_id>/favorite/', api_views.api_toggle_favorite, name='api_toggle_favorite'),
-    path('api/recipes/<int:recipe_id>/review/', api_views.api_add_review, name='api_add_review'),
-    path('api/meal-plans/<int:meal_plan_id>/nutrition/', api_views.api_meal_plan_nutrition, name='api_meal_plan_nutrition'),
+    path('api/favorites/', api.api_favorite_recipes, name='api_favorites'),
+    path('api/recipes/<int:recipe_id>/', api.api_recipe_details, name='api_recipe_details'),
+    path('api/stats/', api.api_user_stats, name='api_user_stats'),
+    path('api/stats/cache/', api.api_cache_stats, name='api_cache_stats'),
+    path('api/search/', api.api_search_recipes, name='api_search_recipes'),
+    path('api/recipes/filter/', api.api_filter_recipes, name='api_filter_recipes'),
+    path('api/trending/', api.api_trending_recipes, name='api_trending'),
+    path('api/recommendations/', api.api_recommendations, name='api_recommendations'),
+    path('api/recipes/<int:recipe_id>/favorite/', api.api_toggle_favorite, name='api_toggle_favorite'),
+    path('api/recipes/<int:recipe_id>/review/', api.api_add_review, name='api_add_review'),
+    path('api/meal-plans/<int:meal_plan_id>/nutrition/', api.api_meal_plan_nutrition, name='api_meal_plan_nutrition'),
 ]
@@ -2,20 +2,38 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q, Avg, Count
+from django.utils import timezone
+from recipeapp.profiling import query_budget
+from recipeapp.replicas import read_replica
 from .models import Recipe, MealPlan, MealPlanItem, ShoppingList, ShoppingListItem, FavoriteRecipe, DietaryPreference, RecipeReview
-from .forms import RegisterForm, LoginForm, RecipeForm, MealPlanForm, ShoppingListForm, ShoppingListItemForm
-from datetime import datetime
+from .search import search_recipes, SEARCH_ORDERING
+from .allergens import exclude_unsafe, preference_allergens, user_preference
+from .shopping import generate_shopping_list
+from .stats import get_user_stats
+from .favorites import toggle_favorite_state
+from .popularity import trending_recipes, HOME_TRENDING
+from .recommendations import recommend
+from .meal_planner import generate_plan, TARGETS
+from .catalogue import catalogue_page
+from .facets import facet_counts, facet_links, selected_facets, CATALOGUE_FACETS
+from .nutrition import meal_plan_totals, meal_plan_daily_totals, recipe_library_summary, dietary_histogram
+from .pagination import paginate_request, page_links, DEFAULT_KEYS
+from .forms import RegisterForm, LoginForm, RecipeForm, MealPlanForm, GenerateMealPlanForm, ShoppingListForm, ShoppingListItemForm
+from datetime import datetime, timedelta
 import urllib.parse
 
+@query_budget(4)
+@catalogue_page
 def home(request):
-    shared_recipes = Recipe.objects.filter(is_shared=True).order_by('-created_at')[:6]
+    shared_recipes = Recipe.objects.filter(is_shared=True).select_related('user').order_by('-created_at')[:6]
     context = {
         'shared_recipes': shared_recipes,
+        'trending_recipes': trending_recipes(HOME_TRENDING).select_related('user'),
     }
     return render(request, 'recipes/home.html', context)
 
 
+@query_budget(11)
 def register(request):
     if request.method == 'POST':
         form = RegisterForm(request.POST)
@@ -28,6 +46,7 @@ def register(request):
     return render(request, 'recipes/register.html', {'form': form})
 
 
+@query_budget(9)
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request.POST)
@@ -45,11 +64,13 @@ def login_view(request):
     return render(request, 'recipes/login.html', {'form': form})
 
 
+@query_budget(4)
 def logout_view(request):
     logout(request)
     return redirect('home')
 
 
+@query_budget(3)
 @login_required
 def my_recipes(request):
     recipes = Recipe.objects.filter(user=request.user)
@@ -58,14 +79,17 @@ def my_recipes(request):
     if dietary_filter:
         recipes = recipes.filter(dietary_type=dietary_filter)
     
+    page = paginate_request(request, recipes)
     context = {
-        'recipes': recipes,
+        'recipes': page.object_list,
         'dietary_choices': Recipe.DIETARY_CHOICES,
         'current_filter': dietary_filter,
+        **page_links(request, page),
     }
     return render(request, 'recipes/my_recipes.html', context)
 
 
+@query_budget(9)
 @login_required
 def add_recipe(request):
     if request.method == 'POST':
@@ -80,6 +104,7 @@ def add_recipe(request):
     return render(request, 'recipes/add_recipe.html', {'form': form})
 
 
+@query_budget(10)
 @login_required
 def edit_recipe(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk, user=request.user)
@@ -93,6 +118,7 @@ def edit_recipe(request, pk):
     return render(request, 'recipes/edit_recipe.html', {'form': form, 'recipe': recipe})
 
 
+@query_budget(8)
 @login_required
 @require_http_methods(["POST"])
 def delete_recipe(request, pk):
@@ -101,24 +127,27 @@ def delete_recipe(request, pk):
     return redirect('my_recipes')
 
 
+@query_budget(3)
 @login_required
 def favorite_recipes(request):
     favorites = FavoriteRecipe.objects.filter(user=request.user).select_related('recipe')
-    recipes = [fav.recipe for fav in favorites]
     dietary_filter = request.GET.get('dietary_type')
     
     if dietary_filter:
-        recipes = [r for r in recipes if r.dietary_type == dietary_filter]
+        favorites = favorites.filter(recipe__dietary_type=dietary_filter)
     
+    page = paginate_request(request, favorites)
     context = {
-        'recipes': recipes,
+        'recipes': [fav.recipe for fav in page],
         'dietary_choices': Recipe.DIETARY_CHOICES,
         'current_filter': dietary_filter,
         'is_favorites': True,
+        **page_links(request, page),
     }
     return render(request, 'recipes/my_recipes.html', context)
 
 
+@query_budget(9)
 @login_required
 @require_http_methods(["POST"])
 def toggle_favorite(request, recipe_id):
@@ -126,44 +155,60 @@ def toggle_favorite(request, recipe_id):
     if not recipe.is_shared and recipe.user != request.user:
         return redirect('home')
     
-    favorite, created = FavoriteRecipe.objects.get_or_create(user=request.user, recipe=recipe)
-    if not created:
-        favorite.delete()
+    toggle_favorite_state(request.user.id, recipe.pk)
     
     return redirect('view_recipe', pk=recipe_id)
 
 
+@query_budget(5)
+@read_replica
+@catalogue_page
 def shared_recipes(request):
     recipes = Recipe.objects.filter(is_shared=True)
-    recipes = recipes.annotate(
-        avg_rating=Avg('reviews__rating'),
-        review_count=Count('reviews')
-    )
-    dietary_filter = request.GET.get('dietary_type')
     search_query = request.GET.get('search', '')
+    sort = request.GET.get('sort', '')
     
-    if dietary_filter:
-        recipes = recipes.filter(dietary_type=dietary_filter)
+    keys = DEFAULT_KEYS
     
     if search_query:
-        recipes = recipes.filter(Q(title__icontains=search_query) | Q(description__icontains=search_query))
+        recipes = search_recipes(recipes, search_query)
+        keys = SEARCH_ORDERING
+    
+    if sort == 'rating':
+        # Unrated recipes have no position in a rating order, so they are left out
+        recipes = recipes.filter(avg_rating__isnull=False)
+        keys = ('-avg_rating', '-created_at', '-id')
+    
+    # Signed-in users do not see recipes with anything their dietary preferences exclude
+    dietary_pref = user_preference(request.user)
+    recipes = exclude_unsafe(recipes, dietary_pref)
+    
+    # Dietary type, calorie, rating and review counts for this listing, in one query
+    selected = selected_facets(request.GET, CATALOGUE_FACETS)
+    counts, total = facet_counts(recipes, CATALOGUE_FACETS, selected)
     
+    page = paginate_request(request, recipes.filter(*selected.values()).select_related('user'), keys)
     context = {
-        'recipes': recipes,
-        'dietary_choices': Recipe.DIETARY_CHOICES,
-        'current_filter': dietary_filter,
+        'recipes': page.object_list,
+        'facets': facet_links(request, counts),
+        'total_recipes': total,
         'search_query': search_query,
+        'current_sort': sort,
+        'excluded_allergens': preference_allergens(dietary_pref),
+        **page_links(request, page),
     }
     return render(request, 'recipes/shared_recipes.html', context)
 
 
+@query_budget(5)
+@read_replica
 def view_recipe(request, pk):
-    recipe = get_object_or_404(Recipe, pk=pk)
+    recipe = get_object_or_404(Recipe.objects.select_related('user'), pk=pk)
     if not recipe.is_shared and recipe.user != request.user:
         return redirect('home')
     
     reviews = RecipeReview.objects.filter(recipe=recipe).select_related('reviewer')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+    avg_rating = recipe.avg_rating
     is_favorite = False
     
     if request.user.is_authenticated:
@@ -178,6 +223,7 @@ def view_recipe(request, pk):
     return render(request, 'recipes/view_recipe.html', context)
 
 
+@query_budget(12)
 @login_required
 def add_review(request, recipe_id):
     recipe = get_object_or_404(Recipe, pk=recipe_id)
@@ -203,6 +249,7 @@ def add_review(request, recipe_id):
     return render(request, 'recipes/add_review.html', context)
 
 
+@query_budget(7)
 @login_required
 def manage_dietary_preferences(request):
     dietary_pref, created = DietaryPreference.objects.get_or_create(user=request.user)
@@ -222,36 +269,17 @@ def manage_dietary_preferences(request):
     return render(request, 'recipes/manage_dietary_preferences.html', context)
 
 
+@query_budget(8)
 @login_required
 def generate_shopping_list_from_meal_plan(request, meal_plan_id):
     meal_plan = get_object_or_404(MealPlan, pk=meal_plan_id, user=request.user)
     
-    meal_items = MealPlanItem.objects.filter(meal_plan=meal_plan)
-    
-    shopping_list = ShoppingList.objects.create(
-        user=request.user,
-        name=f"Shopping List for {meal_plan.name}",
-        meal_plan=meal_plan
-    )
-    
-    ingredient_set = set()
-    for item in meal_items:
-        ingredients = item.recipe.ingredients.split('\n')
-        for ingredient in ingredients:
-            ingredient = ingredient.strip()
-            if ingredient:
-                ingredient_set.add(ingredient)
-    
-    for ingredient in sorted(ingredient_set):
-        ShoppingListItem.objects.create(
-            shopping_list=shopping_list,
-            item_name=ingredient,
-            quantity='1'
-        )
+    shopping_list = generate_shopping_list(meal_plan)
     
     return redirect('view_shopping_list', pk=shopping_list.id)
 
 
+@query_budget(3)
 @login_required
 def meal_plans(request):
     meal_plans = MealPlan.objects.filter(user=request.user)
@@ -259,6 +287,7 @@ def meal_plans(request):
     return render(request, 'recipes/meal_plans.html', context)
 
 
+@query_budget(3)
 @login_required
 def create_meal_plan(request):
     if request.method == 'POST':
@@ -273,32 +302,54 @@ def create_meal_plan(request):
     return render(request, 'recipes/create_meal_plan.html', {'form': form})
 
 
+@query_budget(8)
+@login_required
+def generate_meal_plan(request):
+    dietary_pref = user_preference(request.user)
+    if request.method == 'POST':
+        form = GenerateMealPlanForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                meal_plan = generate_plan(
+                    request.user, data['name'], data['start_date'], data['end_date'], data['meal_types'],
+                    {name: data[name] for name in TARGETS}, dietary_pref,
+                )
+            except ValueError as e:
+                form.add_error(None, str(e))
+            else:
+                return redirect('view_meal_plan', pk=meal_plan.pk)
+    else:
+        today = timezone.localdate()
+        form = GenerateMealPlanForm(initial={'start_date': today, 'end_date': today + timedelta(days=27)})
+    context = {'form': form, 'excluded_allergens': preference_allergens(dietary_pref)}
+    return render(request, 'recipes/generate_meal_plan.html', context)
+
+
+@query_budget(6)
 @login_required
 def view_meal_plan(request, pk):
     meal_plan = get_object_or_404(MealPlan, pk=pk, user=request.user)
-    items = MealPlanItem.objects.filter(meal_plan=meal_plan).order_by('meal_date', 'meal_type')
-    
-    total_calories = sum(item.recipe.calories for item in items)
-    total_protein = sum(item.recipe.protein for item in items)
-    total_fat = sum(item.recipe.fat for item in items)
-    total_carbs = sum(item.recipe.carbs for item in items)
+    items = MealPlanItem.objects.filter(meal_plan=meal_plan).select_related('recipe').order_by('meal_date', 'meal_type')
+    totals = meal_plan_totals(meal_plan)
     
     context = {
         'meal_plan': meal_plan,
         'items': items,
         'meal_type_choices': MealPlanItem.MEAL_TYPES,
-        'total_calories': total_calories,
-        'total_protein': total_protein,
-        'total_fat': total_fat,
-        'total_carbs': total_carbs,
+        'total_calories': totals['calories'],
+        'total_protein': totals['protein'],
+        'total_fat': totals['fat'],
+        'total_carbs': totals['carbs'],
+        'daily_totals': meal_plan_daily_totals(meal_plan),
     }
     return render(request, 'recipes/view_meal_plan.html', context)
 
 
+@query_budget(5)
 @login_required
 def add_meal_plan_item(request, meal_plan_id):
     meal_plan = get_object_or_404(MealPlan, pk=meal_plan_id, user=request.user)
-    recipes = Recipe.objects.filter(user=request.user)
     
     if request.method == 'POST':
         recipe_id = request.POST.get('recipe_id')
@@ -310,23 +361,28 @@ def add_meal_plan_item(request, meal_plan_id):
         item.save()
         return redirect('view_meal_plan', pk=meal_plan_id)
     
+    # The picker leaves out recipes with anything the user's dietary preferences exclude
+    dietary_pref = user_preference(request.user)
     context = {
         'meal_plan': meal_plan,
-        'recipes': recipes,
+        'recipes': exclude_unsafe(Recipe.objects.filter(user=request.user), dietary_pref),
         'meal_type_choices': MealPlanItem.MEAL_TYPES,
+        'excluded_allergens': preference_allergens(dietary_pref),
     }
     return render(request, 'recipes/add_meal_plan_item.html', context)
 
 
+@query_budget(4)
 @login_required
 @require_http_methods(["POST"])
 def delete_meal_plan_item(request, item_id):
-    item = get_object_or_404(MealPlanItem, pk=item_id)
-    meal_plan_id = item.meal_plan.id
+    item = get_object_or_404(MealPlanItem, pk=item_id, meal_plan__user=request.user)
+    meal_plan_id = item.meal_plan_id
     item.delete()
     return redirect('view_meal_plan', pk=meal_plan_id)
 
 
+@query_budget(3)
 @login_required
 def shopping_lists(request):
     shopping_lists = ShoppingList.objects.filter(user=request.user)
@@ -334,6 +390,7 @@ def shopping_lists(request):
     return render(request, 'recipes/shopping_lists.html', context)
 
 
+@query_budget(3)
 @login_required
 def create_shopping_list(request):
     if request.method == 'POST':
@@ -348,6 +405,7 @@ def create_shopping_list(request):
     return render(request, 'recipes/create_shopping_list.html', {'form': form})
 
 
+@query_budget(4)
 @login_required
 def view_shopping_list(request, pk):
     shopping_list = get_object_or_404(ShoppingList, pk=pk, user=request.user)
@@ -359,6 +417,7 @@ def view_shopping_list(request, pk):
     return render(request, 'recipes/view_shopping_list.html', context)
 
 
+@query_budget(4)
 @login_required
 def add_shopping_item(request, shopping_list_id):
     shopping_list = get_object_or_404(ShoppingList, pk=shopping_list_id, user=request.user)
@@ -380,35 +439,34 @@ def add_shopping_item(request, shopping_list_id):
     return render(request, 'recipes/add_shopping_item.html', context)
 
 
+@query_budget(4)
 @login_required
 @require_http_methods(["POST"])
 def delete_shopping_item(request, item_id):
-    item = get_object_or_404(ShoppingListItem, pk=item_id)
-    shopping_list_id = item.shopping_list.id
+    item = get_object_or_404(ShoppingListItem, pk=item_id, shopping_list__user=request.user)
+    shopping_list_id = item.shopping_list_id
     item.delete()
     return redirect('view_shopping_list', pk=shopping_list_id)
 
 
+@query_budget(4)
 @login_required
 @require_http_methods(["POST"])
 def toggle_shopping_item(request, item_id):
-    item = get_object_or_404(ShoppingListItem, pk=item_id)
+    item = get_object_or_404(ShoppingListItem, pk=item_id, shopping_list__user=request.user)
     item.is_checked = not item.is_checked
-    item.save()
-    return redirect('view_shopping_list', pk=item.shopping_list.id)
+    item.save(update_fields=['is_checked'])
+    return redirect('view_shopping_list', pk=item.shopping_list_id)
 
 
+@query_budget(11)
 @login_required
 def dashboard(request):
-    # Get user's recipes
-    total_recipes = Recipe.objects.filter(user=request.user).count()
-    
-    # Get favorite recipes
-    favorite_count = FavoriteRecipe.objects.filter(user=request.user).count()
+    # Recipe, favorite and meal plan counts (cached, see recipes.stats)
+    stats = get_user_stats(request.user.id)
     
     # Get meal plan stats
     recent_meal_plans = MealPlan.objects.filter(user=request.user).order_by('-created_at')[:5]
-    total_meal_plans = recent_meal_plans.count()
     
     # Get shopping list stats
     recent_shopping_lists = ShoppingList.objects.filter(user=request.user).order_by('-created_at')[:5]
@@ -416,59 +474,50 @@ def dashboard(request):
     # Calculate nutrition stats from recent meal plans
     nutrition_stats = {'calories': 0, 'protein': 0, 'fat': 0, 'carbs': 0}
     for meal_plan in recent_meal_plans[:1]:  # Latest meal plan
-        items = MealPlanItem.objects.filter(meal_plan=meal_plan)
-        nutrition_stats['calories'] = sum(item.recipe.calories for item in items)
-        nutrition_stats['protein'] = sum(item.recipe.protein for item in items)
-        nutrition_stats['fat'] = sum(item.recipe.fat for item in items)
-        nutrition_stats['carbs'] = sum(item.recipe.carbs for item in items)
+        nutrition_stats = meal_plan_totals(meal_plan)
     
     # Get user's dietary preferences
     dietary_pref = DietaryPreference.objects.filter(user=request.user).first()
     
+    # Shared recipes picked from those preferences and the user's favorites and reviews
+    recommended = [recipe for recipe, _ in recommend(request.user, 4, preference=dietary_pref, load_preference=False)]
+    
     context = {
-        'total_recipes': total_recipes,
-        'favorite_count': favorite_count,
-        'total_meal_plans': total_meal_plans,
+        'total_recipes': stats['total_recipes'],
+        'favorite_count': stats['favorite_count'],
+        'total_meal_plans': stats['total_meal_plans'],
         'recent_meal_plans': recent_meal_plans,
         'recent_shopping_lists': recent_shopping_lists,
         'nutrition_stats': nutrition_stats,
         'dietary_preference': dietary_pref,
+        'recommended_recipes': recommended,
     }
     return render(request, 'recipes/dashboard.html', context)
 
 
+@query_budget(4)
+@read_replica
 @login_required
 def nutritional_summary(request):
-    # Get all recipes with their nutritional information
     recipes = Recipe.objects.filter(user=request.user)
-    
-    total_recipes = recipes.count()
-    avg_calories = sum(r.calories for r in recipes) / total_recipes if total_recipes > 0 else 0
-    avg_protein = sum(r.protein for r in recipes) / total_recipes if total_recipes > 0 else 0
-    avg_fat = sum(r.fat for r in recipes) / total_recipes if total_recipes > 0 else 0
-    avg_carbs = sum(r.carbs for r in recipes) / total_recipes if total_recipes > 0 else 0
-    
-    # Dietary breakdown
-    dietary_stats = {}
-    for diet_type, diet_label in Recipe.DIETARY_CHOICES:
-        count = recipes.filter(dietary_type=diet_type).count()
-        dietary_stats[diet_label] = count
+    summary = recipe_library_summary(recipes)
     
     context = {
-        'total_recipes': total_recipes,
-        'avg_calories': round(avg_calories, 1),
-        'avg_protein': round(avg_protein, 1),
-        'avg_fat': round(avg_fat, 1),
-        'avg_carbs': round(avg_carbs, 1),
-        'dietary_stats': dietary_stats,
+        'total_recipes': summary['total_recipes'],
+        'avg_calories': round(summary['calories'], 1),
+        'avg_protein': round(summary['protein'], 1),
+        'avg_fat': round(summary['fat'], 1),
+        'avg_carbs': round(summary['carbs'], 1),
+        'dietary_stats': dietary_histogram(recipes),
     }
     return render(request, 'recipes/nutritional_summary.html', context)
 
 
+@query_budget(3)
 @login_required
 def share_recipe(request, pk):
     """Handle recipe sharing via email or social media"""
-    recipe = get_object_or_404(Recipe, pk=pk)
+    recipe = get_object_or_404(Recipe.objects.select_related('user'), pk=pk)
     if not recipe.is_shared and recipe.user != request.user:
         return redirect('home')
     